@@ -0,0 +1,114 @@
+"""
+Query plans of the per-user contact lookups before and after the composite indexes.
+
+Seeds a scratch schema (``bench_contacts`` by default) of the configured PostgreSQL
+database with ``--rows`` contacts spread over ``--users`` users, then prints
+``EXPLAIN (ANALYZE, BUFFERS)`` for ``get_contacts`` and ``find_contact_by_*``:
+
+* ``before``: the tables with their primary keys only, i.e. without any index or unique
+  constraint led by ``user_id``;
+* ``after``: with all of them, as in ``src/database/models.py`` (migration ``fa4c0d36be7d``
+  and the later per-user constraints and indexes).
+
+The schema is dropped at the end.
+
+Run from the project root::
+
+    python -m benchmarks.bench_contact_indexes --rows 1000000 --users 1000
+"""
+import argparse
+import time
+
+from sqlalchemy import UniqueConstraint, and_, select, text
+from sqlalchemy.schema import AddConstraint, CreateIndex, DropConstraint, DropIndex
+
+from src.database.db import engine
+from src.database.models import Base, Contact
+
+
+def leads_with_user_id(columns) -> bool:
+    return getattr(list(columns)[0], "name", None) == "user_id"
+
+
+def queries(user_id: int) -> dict:
+    # Ті самі вирази, що й у src/repository/contacts.py
+    return {
+        "get_contacts": select(Contact).filter(Contact.user_id == user_id).order_by(Contact.id).offset(500).limit(100),
+        "find_contact_by_first_name": select(Contact).filter(
+            and_(Contact.first_name == 'first_42', Contact.user_id == user_id)),
+        "find_contact_by_last_name": select(Contact).filter(
+            and_(Contact.last_name == 'last_42', Contact.user_id == user_id)),
+        "find_contact_by_email": select(Contact).filter(
+            and_(Contact.email == f'contact_{user_id * 1000 + 42}@example.com', Contact.user_id == user_id)),
+    }
+
+
+def explain(conn, user_id: int) -> None:
+    for name, stmt in queries(user_id).items():
+        sql = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+        plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}")).scalars().all()
+        print(f"--- {name}")
+        print("\n".join(plan))
+
+
+def seed(conn, rows: int, users: int) -> None:
+    conn.execute(text(
+        "INSERT INTO users (id, username, email, password, confirmed) "
+        "SELECT g, 'user_' || g, 'user_' || g || '@example.com', 'x', true FROM generate_series(1, :users) g"
+    ), {"users": users})
+    conn.execute(text(
+        "INSERT INTO contacts (first_name, last_name, email, contact_number, contact_number_digits, birthday, user_id) "
+        "SELECT 'first_' || (g % 997), 'last_' || (g % 991), 'contact_' || g || '@example.com', "
+        "lpad(g::text, 10, '0'), lpad(g::text, 10, '0'), date '1970-01-01' + (g % 18000), (g % :users) + 1 "
+        "FROM generate_series(1, :rows) g"
+    ), {"rows": rows, "users": users})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--schema", default="bench_contacts")
+    args = parser.parse_args()
+
+    # Усе, що починається з user_id, інакше «до» вже має придатний індекс і порівняння нічого не показує
+    indexes = [index for index in Contact.__table__.indexes if leads_with_user_id(index.expressions)]
+    constraints = [constraint for constraint in Contact.__table__.constraints
+                   if isinstance(constraint, UniqueConstraint) and leads_with_user_id(constraint.columns)]
+    with engine.begin() as conn:
+        # Розширення для індексу нечіткого пошуку живуть у public, як після міграцій
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public"))
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gin SCHEMA public"))
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {args.schema} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {args.schema}"))
+        # public лишається в search_path, інакше не видно класу операторів gin_trgm_ops
+        conn.execute(text(f"SET search_path TO {args.schema}, public"))
+        try:
+            Base.metadata.create_all(conn)
+            for index in indexes:
+                conn.execute(DropIndex(index))
+            for constraint in constraints:
+                conn.execute(DropConstraint(constraint))
+
+            start = time.perf_counter()
+            seed(conn, args.rows, args.users)
+            conn.execute(text("ANALYZE"))
+            print(f"seeded {args.rows} contacts for {args.users} users in {time.perf_counter() - start:.1f}s")
+
+            user_id = args.users // 2
+            print("\n=== before")
+            explain(conn, user_id)
+
+            for constraint in constraints:
+                conn.execute(AddConstraint(constraint))
+            for index in indexes:
+                conn.execute(CreateIndex(index))
+            conn.execute(text("ANALYZE"))
+            print("\n=== after")
+            explain(conn, user_id)
+        finally:
+            conn.execute(text(f"DROP SCHEMA {args.schema} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
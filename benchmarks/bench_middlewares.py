@@ -0,0 +1,156 @@
+"""
+Throughput of the middleware stack and cost of the User-Agent ban check.
+
+The stack section sends ``--requests`` requests straight to the ASGI app, without a server, through:
+
+* ``BaseHTTPMiddleware``: the previous middlewares, with the ban and allow lists as plain lists
+  of addresses and a ``re.search`` per ban pattern;
+* ``pure ASGI``: the middlewares of ``middlewares.py``.
+
+Then, for ``--patterns`` literal patterns, it compares the time per checked User-Agent of:
+
+* ``re.search``: one search per pattern, which is what ``UserAgentBanMiddleware`` did before;
+  past 512 patterns it also thrashes the ``re`` module cache, so it runs only ``--legacy-checks``;
+* ``matcher``: ``UserAgentMatcher``, the single compiled trie-shaped expression, without its cache;
+* ``cached``: ``UserAgentMatcher`` with a repeating User-Agent, as in real traffic.
+
+Run from the project root::
+
+    python -m benchmarks.bench_middlewares --requests 5000 --patterns 10 100 1000 5000 --checks 10000 --legacy-checks 100
+"""
+import argparse
+import asyncio
+import re
+import time
+from ipaddress import ip_address
+
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from middlewares import (USER_AGENT_BAN, BlackListMiddleware, CustomHeaderMiddleware, UserAgentBanMiddleware,
+                         UserAgentMatcher, WhiteListMiddleware)
+
+BROWSER_UA = "Mozilla/5.0 (X11; Linux x86_64) Chrome/124.0"
+CLIENT = ("172.16.0.0", 50000)
+LEGACY_BANNED_IPS = [ip_address("192.168.1.1"), ip_address("192.168.1.2"), ip_address("127.0.0.1")]
+LEGACY_ALLOWED_IPS = [ip_address('192.168.1.0'), ip_address('172.16.0.0'), ip_address("127.0.0.1")]
+
+
+# Попередня реалізація на BaseHTTPMiddleware - база для порівняння швидкодії
+class LegacyCustomHeaderMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        response.headers["X-Process-Time"] = str(time.time() - start_time)
+        response.headers['Custom'] = 'Example'
+        return response
+
+
+class LegacyBlackListMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if ip_address(request.client.host) in LEGACY_BANNED_IPS:
+            return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
+        return await call_next(request)
+
+
+class LegacyWhiteListMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if ip_address(request.client.host) not in LEGACY_ALLOWED_IPS:
+            return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Not allowed IP address"})
+        return await call_next(request)
+
+
+class LegacyUserAgentBanMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        user_agent = request.headers.get("user-agent")
+        for ban_pattern in USER_AGENT_BAN:
+            if re.search(ban_pattern, user_agent):
+                return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
+        return await call_next(request)
+
+
+def make_app(*layers):
+    app = FastAPI()
+
+    @app.get("/")
+    def read_root():
+        return PlainTextResponse("Hello World")
+
+    for layer in reversed(layers):
+        app = layer(app)
+    return app
+
+
+async def call(app) -> int:
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": "/", "raw_path": b"/", "root_path": "", "query_string": b"",
+             "headers": [(b"host", b"testserver"), (b"user-agent", BROWSER_UA.encode())],
+             "client": CLIENT, "server": ("testserver", 80)}
+    messages = []
+    incoming = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if incoming:
+            return incoming.pop()
+        # Як і сервер, тримаємо receive до розриву з'єднання
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+async def stack_throughput(label: str, app, requests: int) -> None:
+    for _ in range(50):
+        await call(app)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app)
+    print(f"{label:>24}: {requests / (time.perf_counter() - start):10.0f} req/s")
+
+
+def measure(label: str, checks: int, check) -> None:
+    start = time.perf_counter()
+    for number in range(checks):
+        check(number)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>24}: {elapsed / checks * 1e6:10.2f} us/check")
+
+
+def user_agent_checks(patterns: int, checks: int, legacy_checks: int) -> None:
+    ban = [f"scanner-{number:05d}" for number in range(patterns)]
+
+    def search(number):
+        user_agent = f"{BROWSER_UA} {number}"
+        return any(re.search(pattern, user_agent) for pattern in ban)
+
+    uncached = UserAgentMatcher(ban, cache_size=1)
+    cached = UserAgentMatcher(ban, cache_size=1024)
+    measure(f"re.search, {patterns}", legacy_checks, search)
+    # Різні рядки, щоб кеш вердиктів не спрацьовував
+    measure(f"matcher, {patterns}", checks, lambda number: uncached(f"{BROWSER_UA} {number}"))
+    measure(f"cached, {patterns}", checks, lambda number: cached(BROWSER_UA))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--patterns", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--checks", type=int, default=10000)
+    parser.add_argument("--legacy-checks", type=int, default=100)
+    args = parser.parse_args()
+
+    asyncio.run(stack_throughput("BaseHTTPMiddleware", make_app(
+        LegacyCustomHeaderMiddleware, LegacyBlackListMiddleware,
+        LegacyWhiteListMiddleware, LegacyUserAgentBanMiddleware), args.requests))
+    asyncio.run(stack_throughput("pure ASGI", make_app(
+        CustomHeaderMiddleware, BlackListMiddleware, WhiteListMiddleware, UserAgentBanMiddleware), args.requests))
+    for patterns in args.patterns:
+        user_agent_checks(patterns, args.checks, args.legacy_checks)
+
+
+if __name__ == "__main__":
+    main()
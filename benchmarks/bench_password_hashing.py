@@ -0,0 +1,63 @@
+"""
+Login throughput (bcrypt verifications per second) against the size of the hashing pool.
+
+Each round starts ``--logins`` concurrent verifications through ``PasswordHasher`` and,
+for comparison, the same number of verifications inline on the event loop, which is what
+``/api/auth/login`` did before. A ticker task measures how long the event loop was
+blocked meanwhile.
+
+Run from the project root::
+
+    python -m benchmarks.bench_password_hashing --rounds 12 --logins 64 --pools 1 2 4 8
+"""
+import argparse
+import asyncio
+import time
+
+from passlib.context import CryptContext
+
+from src.services.hashing import PasswordHasher
+
+
+async def loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    # Найбільша затримка таймера = найдовше блокування event loop
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def measure(label: str, logins: int, verify) -> None:
+    stop = asyncio.Event()
+    lag = asyncio.create_task(loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(verify() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    print(f"{label:>12}: {logins / elapsed:8.1f} logins/s, max loop stall {await lag * 1000:8.1f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--pools", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.rounds)
+    hashed = context.hash("password")
+
+    async def inline():
+        return context.verify("password", hashed)
+
+    await measure("inline", args.logins, inline)
+    for workers in args.pools:
+        hasher = PasswordHasher(context, workers=workers, max_pending=args.logins)
+        await measure(f"pool={workers}", args.logins, lambda: hasher.verify("password", hashed))
+        hasher.executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+import os
+import socket
+
+import redis.asyncio as redis
+
+from src.conf.config import settings
+from src.services.email import EMAIL_KINDS, SMTPPool, conf, render_email
+from src.services.mail_templates import mail_templates
+from src.services.outbox import MailOutbox, MailWorker
+
+
+async def main():
+    """
+    Run a mail worker: drain the outbox filled by the web workers and send the letters through
+    pooled SMTP connections. Start as many workers as needed, e.g. ``python mail_worker.py``.
+
+    :return: None
+    """
+    # XREADGROUP чекає нових листів довше за socket_timeout клієнта кешу, тому окремий клієнт
+    client = redis.Redis(host=settings.REDIS_DOMAIN, port=settings.REDIS_PORT, db=0,
+                         socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT)
+    mail_templates.load(template_name for _, template_name in EMAIL_KINDS.values())
+    pool = SMTPPool(conf, settings.MAIL_POOL_SIZE)
+    worker = MailWorker(MailOutbox(client, settings.MAIL_OUTBOX_STREAM, settings.MAIL_OUTBOX_MAXLEN),
+                        render_email, pool.send, f"{socket.gethostname()}-{os.getpid()}", settings.MAIL_BATCH_SIZE,
+                        settings.MAIL_MAX_ATTEMPTS, settings.MAIL_RETRY_BASE_DELAY, settings.MAIL_RETRY_MAX_DELAY)
+    try:
+        await worker.run()
+    finally:
+        await pool.close()
+        await client.aclose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -1,11 +1,21 @@
+import asyncio
 from pathlib import Path
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from middlewares import CustomHeaderMiddleware
 from fastapi_limiter import FastAPILimiter
 from src.conf.config import settings
-from src.routes import contacts, auth, users
-from middlewares import (BlackListMiddleware, CustomCORSMiddleware,
+from src.database.db import AsyncSessionLocal
+from src.repository import contacts as repository_contacts
+from src.repository import users as repository_users
+from src.routes import contacts, auth, users, metrics, avatars
+from src.services.avatars import avatar_pipeline
+from src.services.birthdays import birthday_digest
+from src.services.cache import pubsub_client, redis_client, user_cache
+from src.services.gravatar import default_avatars
+from src.services.hashing import password_hasher
+from src.services.thumbnails import thumbnail_store
+from middlewares import (ALLOWED_IPS, BANNED_IPS, BlackListMiddleware, CustomCORSMiddleware,
                          CustomHeaderMiddleware, UserAgentBanMiddleware,
                          WhiteListMiddleware)
 
@@ -16,7 +26,9 @@ app = FastAPI()
 
 app.include_router(auth.router, prefix='/api')
 app.include_router(users.router, prefix='/api')
+app.include_router(avatars.router, prefix='/api')
 app.include_router(contacts.router, prefix='/api')
+app.include_router(metrics.router, prefix='/api')
 app.add_middleware(CustomHeaderMiddleware)
 # app.add_middleware(BlackListMiddleware)
 # app.add_middleware(CustomCORSMiddleware)
@@ -40,6 +52,33 @@ async def startup():
     """
     r = await redis.Redis(host=settings.REDIS_DOMAIN, port=settings.REDIS_PORT, db=0, encoding="utf-8", decode_responses=True)
     await FastAPILimiter.init(r)
+    app.state.user_cache_listener = asyncio.create_task(user_cache.listen(pubsub_client))
+    app.state.ip_list_watchers = [asyncio.create_task(ip_list.watch(redis_client, settings.IP_LISTS_RELOAD_INTERVAL))
+                                  for ip_list in (BANNED_IPS, ALLOWED_IPS)]
+    app.state.birthday_digest_job = asyncio.create_task(birthday_digest.schedule(
+        AsyncSessionLocal,
+        lambda day, db: repository_contacts.build_birthday_digests(day, db, settings.BIRTHDAY_DIGEST_BATCH_SIZE),
+        settings.BIRTHDAY_DIGEST_RETRY_INTERVAL))
+    app.state.default_avatars_job = asyncio.create_task(default_avatars.schedule(
+        AsyncSessionLocal, repository_users.resolve_default_avatars))
+    # Каталоги мініатюр створюються тут, а не під час імпорту; перший запит не чекає на сканування диска
+    await asyncio.to_thread(thumbnail_store.open)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """
+    Stop the background tasks started in startup.
+
+    :return: None
+    """
+    app.state.user_cache_listener.cancel()
+    for watcher in app.state.ip_list_watchers:
+        watcher.cancel()
+    app.state.birthday_digest_job.cancel()
+    app.state.default_avatars_job.cancel()
+    password_hasher.executor.shutdown(wait=False)
+    await avatar_pipeline.close(settings.AVATAR_SHUTDOWN_TIMEOUT)
 
 @app.get("/")
 def read_root():
@@ -1,72 +1,183 @@
 import re
 import time
 from ipaddress import ip_address
-from typing import Callable
 
-from fastapi import Request, status
+from fastapi import status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-
-BANNED_IPS = [ip_address("192.168.1.1"), ip_address("192.168.1.2"), ip_address("127.0.0.1")]
-ALLOWED_IPS = [ip_address('192.168.1.0'), ip_address('172.16.0.0'), ip_address("127.0.0.1")]
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import settings
+from src.services.cache import LRUCache
+from src.services.ip_lists import IPList
+
+# Вбудовані адреси доповнюються мережами з файлу та множини в Redis, див. IPList.reload
+BANNED_IPS = IPList("blacklist", ["192.168.1.1", "192.168.1.2", "127.0.0.1"],
+                    settings.IP_BLACKLIST_FILE, settings.IP_BLACKLIST_REDIS_KEY)
+ALLOWED_IPS = IPList("whitelist", ['192.168.1.0', '172.16.0.0', "127.0.0.1"],
+                     settings.IP_WHITELIST_FILE, settings.IP_WHITELIST_REDIS_KEY)
 USER_AGENT_BAN = [r"Gecko", r"Python-urllib"]
+REGEX_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+DEFAULT_REGEX_FLAGS = re.compile("").flags
+
+
+def client_ip(scope: Scope):
+    """
+    IP address of the client of an ASGI connection.
+
+    :param scope: Scope: ASGI connection scope.
+    :return: IPv4Address | IPv6Address | None: Client address, None if unknown or not an IP.
+    """
+    client = scope.get("client")
+    try:
+        return ip_address(client[0]) if client else None
+    except ValueError:
+        return None
+
+
+def literal_trie_pattern(words: list[str]) -> str:
+    """
+    Regular expression matching any of the literal words, shaped as a prefix trie.
+
+    Python's ``re`` tries every branch of a flat alternation at every position, while a
+    trie shares common prefixes, so thousands of words cost about as much as a few.
+
+    >>> literal_trie_pattern(["Googlebot", "Go", "curl"])
+    '(?:Go|curl)'
+    >>> literal_trie_pattern(["curl", "crawler", "Gecko"])
+    '(?:Gecko|c(?:rawler|url))'
+
+    :param words: list[str]: Literal words.
+    :return: str: Regular expression source.
+    """
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        # Коротше слово вже знайдене - довші з тим самим префіксом нічого не додають
+        if "" in node:
+            return ""
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items())]
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+class UserAgentMatcher:
+    """
+    Single-pass matcher of User-Agent strings against ban patterns.
+
+    Literal patterns are merged into one trie-shaped alternation, the remaining regular
+    expressions are appended to it, and the whole set is compiled once. Expressions with groups
+    or global inline flags would change meaning inside the alternation (backreferences are
+    renumbered, ``(?i)`` must start the expression), so they are compiled and searched on their
+    own after the combined pass. Verdicts are memoized per distinct User-Agent in a bounded LRU,
+    since real traffic repeats a small set of them.
+
+    >>> matcher = UserAgentMatcher(["Gecko", r"Python-urllib/\\d", "(?i)wget", r"(b)\\1"], cache_size=16)
+    >>> matcher("Mozilla/5.0 Gecko/20100101"), matcher("Python-urllib/3.11"), matcher("curl/8.0")
+    (True, True, False)
+    >>> matcher("WGET/1.21"), matcher("bb"), matcher("ab")
+    (True, True, False)
+    """
+
+    def __init__(self, patterns: list[str], cache_size: int):
+        literals = [pattern for pattern in patterns if not REGEX_METACHARACTERS.intersection(pattern)]
+        expressions = []
+        self.separate = []
+        for pattern in patterns:
+            if not REGEX_METACHARACTERS.intersection(pattern):
+                continue
+            # Некоректний шаблон падає тут, під час запуску, а не на першому запиті
+            compiled = re.compile(pattern)
+            if compiled.groups or compiled.flags != DEFAULT_REGEX_FLAGS:
+                self.separate.append(compiled)
+            else:
+                expressions.append(f"(?:{pattern})")
+        if literals:
+            expressions.insert(0, literal_trie_pattern(literals))
+        self.pattern = re.compile("|".join(expressions)) if expressions else None
+        self.cache = LRUCache(cache_size)
+
+    def search(self, user_agent: str) -> bool:
+        """
+        Whether a User-Agent matches any ban pattern, without the verdict cache.
+
+        :param user_agent: str: User-Agent header value.
+        :return: bool: True if the User-Agent is banned.
+        """
+        if self.pattern is not None and self.pattern.search(user_agent) is not None:
+            return True
+        return any(pattern.search(user_agent) is not None for pattern in self.separate)
+
+    def __call__(self, user_agent: str) -> bool:
+        banned = self.cache.get(user_agent)
+        if banned is None:
+            banned = self.search(user_agent)
+            self.cache.set(user_agent, banned)
+        return banned
+
+
+class CustomHeaderMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
 
-
-class CustomHeaderMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super(CustomHeaderMiddleware, self).__init__(app)
-
-    async def dispatch(self, request: Request, call_next):
         start_time = time.time()
 
-        response = await call_next(request)
-
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
-
-        response.headers['Custom'] = 'Example'
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                process_time = time.time() - start_time
+                headers = MutableHeaders(scope=message)
+                headers["X-Process-Time"] = str(process_time)
+                headers['Custom'] = 'Example'
+            await send(message)
 
-        return response
+        await self.app(scope, receive, send_with_headers)
 
 
-class BlackListMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
+class BlackListMiddleware:
+    def __init__(self, app: ASGIApp, networks: IPList = BANNED_IPS):
+        self.app = app
+        self.networks = networks
 
-    async def dispatch(self, request: Request, call_next: Callable):
-        ip = ip_address(request.client.host)
-        if ip in BANNED_IPS:
-            return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
-        response = await call_next(request)
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and client_ip(scope) in self.networks:
+            response = JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
+            return await response(scope, receive, send)
+        await self.app(scope, receive, send)
 
 
-class WhiteListMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
+class WhiteListMiddleware:
+    def __init__(self, app: ASGIApp, networks: IPList = ALLOWED_IPS):
+        self.app = app
+        self.networks = networks
 
-    async def dispatch(self, request: Request, call_next: Callable):
-        ip = ip_address(request.client.host)
-        if ip not in ALLOWED_IPS:
-            return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Not allowed IP address"})
-        response = await call_next(request)
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and client_ip(scope) not in self.networks:
+            response = JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Not allowed IP address"})
+            return await response(scope, receive, send)
+        await self.app(scope, receive, send)
 
 
-class UserAgentBanMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
+class UserAgentBanMiddleware:
+    def __init__(self, app: ASGIApp, patterns: list[str] = USER_AGENT_BAN):
+        self.app = app
+        self.matcher = UserAgentMatcher(patterns, settings.USER_AGENT_CACHE_SIZE)
 
-    async def dispatch(self, request: Request, call_next: Callable):
-        print(f"Request.headers: {request.headers}")
-        user_agent = request.headers.get("user-agent")
-        print(f"User Agent: {user_agent}")
-        for ban_pattern in USER_AGENT_BAN:
-            if re.search(ban_pattern, user_agent):
-                return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
-        response = await call_next(request)
-        return response
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and self.matcher(Headers(scope=scope).get("user-agent", "")):
+            response = JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "You are banned"})
+            return await response(scope, receive, send)
+        await self.app(scope, receive, send)
 
 
 class CustomCORSMiddleware(CORSMiddleware):
@@ -77,4 +188,4 @@ class CustomCORSMiddleware(CORSMiddleware):
             allow_credentials=allow_credentials,
             allow_methods=allow_methods,
             allow_headers=allow_headers
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,29 @@
+"""Birthday month-day index
+
+Revision ID: 21af367c1425
+Revises: 0b126d00c504
+Create Date: 2026-10-17 10:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '21af367c1425'
+down_revision: Union[str, None] = '0b126d00c504'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Вираз має збігатися з models.birthday_month_day, інакше планувальник не використає індекс
+    op.create_index('ix_contacts_user_id_birthday_month_day', 'contacts',
+                    ['user_id', sa.text('(EXTRACT(month FROM birthday) * 100 + EXTRACT(day FROM birthday))')],
+                    unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_birthday_month_day', table_name='contacts')
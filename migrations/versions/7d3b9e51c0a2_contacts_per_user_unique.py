@@ -0,0 +1,34 @@
+"""Contacts per-user unique email and contact number
+
+Revision ID: 7d3b9e51c0a2
+Revises: fa4c0d36be7d
+Create Date: 2026-10-17 15:42:06.183254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3b9e51c0a2'
+down_revision: Union[str, None] = 'fa4c0d36be7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_constraint('contacts_email_key', 'contacts', type_='unique')
+    op.drop_constraint('contacts_contact_number_key', 'contacts', type_='unique')
+    op.drop_index('ix_contacts_user_id_email', table_name='contacts')
+    op.create_unique_constraint('uq_contacts_user_id_email', 'contacts', ['user_id', 'email'])
+    op.create_unique_constraint('uq_contacts_user_id_contact_number', 'contacts', ['user_id', 'contact_number'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_contacts_user_id_contact_number', 'contacts', type_='unique')
+    op.drop_constraint('uq_contacts_user_id_email', 'contacts', type_='unique')
+    op.create_index('ix_contacts_user_id_email', 'contacts', ['user_id', 'email'], unique=False)
+    op.create_unique_constraint('contacts_contact_number_key', 'contacts', ['contact_number'])
+    op.create_unique_constraint('contacts_email_key', 'contacts', ['email'])
@@ -0,0 +1,50 @@
+"""Contacts normalized contact number digits
+
+Revision ID: c41f8a2d6e97
+Revises: 7d3b9e51c0a2
+Create Date: 2026-10-17 16:58:31.402115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f8a2d6e97'
+down_revision: Union[str, None] = '7d3b9e51c0a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Той самий номер в одного користувача у різних форматах, напр. "(555) 123-4567" і "555-123-4567"
+DUPLICATES_QUERY = """
+SELECT user_id, regexp_replace(contact_number, '[^0-9]', '', 'g') AS digits,
+       array_agg(id ORDER BY id) AS contact_ids
+FROM contacts
+GROUP BY user_id, digits
+HAVING count(*) > 1
+"""
+
+
+def upgrade() -> None:
+    if not op.get_context().as_sql:
+        duplicates = op.get_bind().execute(sa.text(DUPLICATES_QUERY)).fetchall()
+        if duplicates:
+            # Контакти не видаляються автоматично: дублікати можуть відрізнятися іменем, email тощо
+            raise RuntimeError(f"{len(duplicates)} groups of contacts share a contact number within a user, "
+                               f"so uq_contacts_user_id_contact_number_digits cannot be created. "
+                               f"Merge or delete the duplicates listed by:\n{DUPLICATES_QUERY}\n"
+                               f"and run the migration again.")
+    op.add_column('contacts', sa.Column('contact_number_digits', sa.String(length=20), nullable=True))
+    op.execute("UPDATE contacts SET contact_number_digits = regexp_replace(contact_number, '[^0-9]', '', 'g')")
+    op.alter_column('contacts', 'contact_number_digits', nullable=False)
+    op.drop_constraint('uq_contacts_user_id_contact_number', 'contacts', type_='unique')
+    op.create_unique_constraint('uq_contacts_user_id_contact_number_digits', 'contacts',
+                                ['user_id', 'contact_number_digits'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_contacts_user_id_contact_number_digits', 'contacts', type_='unique')
+    op.create_unique_constraint('uq_contacts_user_id_contact_number', 'contacts', ['user_id', 'contact_number'])
+    op.drop_column('contacts', 'contact_number_digits')
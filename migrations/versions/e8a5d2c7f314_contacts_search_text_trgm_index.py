@@ -0,0 +1,33 @@
+"""Contacts search text trigram index
+
+Revision ID: e8a5d2c7f314
+Revises: c41f8a2d6e97
+Create Date: 2026-10-17 18:21:47.930561
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8a5d2c7f314'
+down_revision: Union[str, None] = 'c41f8a2d6e97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+    # Вираз має збігатися з contact_search_text у src/database/models.py
+    op.create_index('ix_contacts_user_id_search_text_trgm', 'contacts',
+                    [sa.text('user_id'),
+                     sa.text("(first_name || ' ' || last_name || ' ' || email || ' ' || contact_number_digits "
+                             "|| ' ' || coalesce(additional_information, '')) gin_trgm_ops")],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_contacts_user_id_search_text_trgm', table_name='contacts')
@@ -1,17 +1,83 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from src.conf.config import settings
+from src.database.pool import InstrumentedQueuePool, instrument_pool, pool_metrics
 
-SQLALCHEMY_DATABASE_URL = settings.SQLALCHEMY_DATABASE_URL
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Драйвери для асинхронного (застосунок) та синхронного (alembic, тести) підключення
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+SYNC_DRIVERS = {"postgresql": "postgresql+psycopg2", "sqlite": "sqlite+pysqlite"}
 
+
+def with_driver(url: str, drivers: dict[str, str]) -> str:
+    """
+    Replace the DBAPI driver of a database URL according to its backend.
+
+    :param url: str: Database URL, e.g. ``postgresql+asyncpg://...``.
+    :param drivers: dict[str, str]: Mapping of backend name to full driver name.
+    :return: str: The same URL with the driver swapped.
+    """
+    url = make_url(url)
+    drivername = drivers.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+SQLALCHEMY_DATABASE_URL = with_driver(settings.SQLALCHEMY_DATABASE_URL, ASYNC_DRIVERS)
+SQLALCHEMY_SYNC_DATABASE_URL = with_driver(settings.SQLALCHEMY_DATABASE_URL, SYNC_DRIVERS)
+
+
+def pool_options(url: str) -> dict:
+    """
+    Build the connection pool keyword arguments for ``create_async_engine`` from settings.
+
+    SQLite keeps the driver's default pool, the options below only make sense for a server database.
+
+    :param url: str: Database URL the engine is created for.
+    :return: dict: Keyword arguments for the engine.
+    """
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+
+async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL, **pool_options(SQLALCHEMY_DATABASE_URL))
+instrument_pool(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Синхронний шлях лишається для alembic та SQLite тестів
+engine = create_engine(SQLALCHEMY_SYNC_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def get_pool_stats() -> dict:
+    """
+    Statistics of the application connection pool: checked-out count, checkout wait histogram,
+    timeouts and connection churn.
+
+    :return: dict: Pool statistics.
+    """
+    return pool_metrics.snapshot(async_engine.pool)
+
+
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+
+def get_session_factory() -> async_sessionmaker:
+    """
+    Session factory for handlers that use the database after the response has started,
+    e.g. streaming responses: the session of get_db is closed by then.
+
+    :return: async_sessionmaker: Factory of application sessions.
+    """
+    return AsyncSessionLocal
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Date, DateTime, func, ForeignKey, Boolean
+from sqlalchemy import (Column, Integer, String, Date, DateTime, func, ForeignKey, Boolean, Index, UniqueConstraint,
+                        extract, literal_column)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -10,16 +11,39 @@ Base = declarative_base()
 
 class Contact(Base):
     __tablename__ = 'contacts'
+    __table_args__ = (
+        Index('ix_contacts_user_id_last_name_first_name', 'user_id', 'last_name', 'first_name'),
+        # Унікальність у межах користувача; індекси обмежень покривають і пошук за email
+        UniqueConstraint('user_id', 'email', name='uq_contacts_user_id_email'),
+        UniqueConstraint('user_id', 'contact_number_digits', name='uq_contacts_user_id_contact_number_digits'),
+        Index('ix_contacts_user_id_id', 'user_id', 'id'),
+    )
 
     id = Column(Integer, primary_key=True)
     first_name = Column(String(15), nullable=False)
     last_name = Column(String(15), nullable=False)
-    email = Column(String, nullable=False, unique=True)
-    contact_number = Column(String(20), nullable=False, unique=True)
+    email = Column(String, nullable=False)
+    contact_number = Column(String(20), nullable=False)
+    # Лише цифри номера: за ними перевіряється унікальність і шукається контакт
+    contact_number_digits = Column(String(20), nullable=False)
     birthday = Column(Date, nullable=False)
     additional_information = Column(String(250), nullable=True)
     user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), default=None)
-    user = relationship('User', backref="contacts")
+    user = relationship('User', backref="contacts", lazy="joined")
+
+
+# День народження як число MMDD; 100 - літерал, щоб вираз у запиті збігався з виразом індексу
+birthday_month_day = extract('month', Contact.birthday) * literal_column("100") + extract('day', Contact.birthday)
+Index('ix_contacts_user_id_birthday_month_day', Contact.user_id, birthday_month_day)
+
+# Текст для нечіткого пошуку; лише оператор || та coalesce, щоб вираз був IMMUTABLE і годився для індексу
+contact_search_text = (Contact.first_name + literal_column("' '") + Contact.last_name + literal_column("' '")
+                       + Contact.email + literal_column("' '") + Contact.contact_number_digits + literal_column("' '")
+                       + func.coalesce(Contact.additional_information, literal_column("''")))
+# GIN з pg_trgm для % / <% / ILIKE, user_id у тому ж індексі завдяки btree_gin
+Index('ix_contacts_user_id_search_text_trgm', Contact.user_id, contact_search_text.label('search_text'),
+      postgresql_using='gin', postgresql_ops={'search_text': 'gin_trgm_ops'})
+
 
 class User(Base):
     __tablename__ = "users"
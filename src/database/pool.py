@@ -0,0 +1,118 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+
+# Межі гістограми очікування з'єднання, мс
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class PoolMetrics:
+    """
+    Counters describing how a connection pool is used: checkout wait time,
+    checkout timeouts and connection churn (opened / closed / invalidated).
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Reset all counters to zero.
+
+        :return: None
+        """
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+
+    def observe_wait(self, seconds: float) -> None:
+        """
+        Record the time a caller waited for a connection from the pool.
+
+        :param seconds: float: Wait time in seconds.
+        :return: None
+        """
+        with self._lock:
+            self.wait_histogram[bisect_left(WAIT_BUCKETS_MS, seconds * 1000)] += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, pool: Pool | None = None) -> dict:
+        """
+        Return the current counters, together with the live state of ``pool`` if given.
+
+        :param pool: Pool | None: Pool to read checked-out / idle / overflow counts from.
+        :return: dict: Pool statistics.
+        """
+        with self._lock:
+            waits = sum(self.wait_histogram)
+            bounds = [f"le_{bound}ms" for bound in WAIT_BUCKETS_MS] + ["inf"]
+            stats = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "closes": self.closes,
+                "invalidations": self.invalidations,
+                "wait": {
+                    "count": waits,
+                    "avg_ms": round(self.wait_total / waits * 1000, 3) if waits else 0.0,
+                    "max_ms": round(self.wait_max * 1000, 3),
+                    "histogram": dict(zip(bounds, self.wait_histogram)),
+                },
+            }
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            stats.update(size=pool.size(), checked_out=pool.checkedout(), idle=pool.checkedin(),
+                         overflow=max(pool.overflow(), 0), max_connections=pool.size() + pool._max_overflow)
+        return stats
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool that records checkout wait time and timeouts in ``pool_metrics``.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            with pool_metrics._lock:
+                pool_metrics.timeouts += 1
+            raise
+        pool_metrics.observe_wait(time.perf_counter() - start)
+        return connection
+
+
+def _increment(name: str):
+    def listener(*args) -> None:
+        with pool_metrics._lock:
+            setattr(pool_metrics, name, getattr(pool_metrics, name) + 1)
+    return listener
+
+
+def instrument_pool(target) -> None:
+    """
+    Attach churn counters (connect / close / invalidate / checkout / checkin) to an engine or pool.
+
+    :param target: Engine or Pool to listen on.
+    :return: None
+    """
+    event.listen(target, "connect", _increment("connects"))
+    event.listen(target, "close", _increment("closes"))
+    event.listen(target, "invalidate", _increment("invalidations"))
+    event.listen(target, "checkout", _increment("checkouts"))
+    event.listen(target, "checkin", _increment("checkins"))
@@ -1,187 +1,576 @@
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from typing import AsyncIterator, Sequence
+
 from fastapi import HTTPException
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy import Integer, Select, and_, case, cast, func, literal, literal_column, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from src.schemas.schemas import ContactModel
-from src.database.models import Contact, User    
+from src.schemas.schemas import ContactModel, phone_digits
+from src.services.autocomplete import Suggestion, contact_index
+from src.services.birthdays import SortKey, birthday_digest
+from src.services.cache import contacts_cache
+from src.database.models import Contact, User, birthday_month_day, contact_search_text
+
+# INSERT ... ON CONFLICT DO NOTHING залежить від діалекту
+DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+# Унікальні обмеження контактів: назва в PostgreSQL, стовпець у повідомленні SQLite
+UNIQUE_CONFLICTS = (
+    (("uq_contacts_user_id_email", "contacts.email"), "Contact with the mentioned email already exists."),
+    (("uq_contacts_user_id_contact_number_digits", "contacts.contact_number_digits"),
+     "Contact with the mentioned contact number already exists."),
+)
+UPCOMING_BIRTHDAYS_DAYS = 7
+EXPORT_COLUMNS = ("id", "first_name", "last_name", "email", "contact_number", "birthday", "additional_information")
+
+def keyset_page(stmt: Select, limit: int | None, after_id: int | None) -> Select:
+    """
+    Order a contact query by id and, if ``after_id`` is given, continue after that id (keyset paging).
+
+    :param stmt: Select: Query filtered by user.
+    :param limit: int | None: Page size, None for no limit.
+    :param after_id: int | None: Id of the last contact of the previous page.
+    :return: Select: Paged query.
+    """
+    if after_id is not None:
+        stmt = stmt.filter(Contact.id > after_id)
+    return stmt.order_by(Contact.id).limit(limit)
+
 
 # Список контактів
-async def get_contacts(skip: int, limit: int, user: User, db: Session) -> list[Contact]:
+async def get_contacts(skip: int, limit: int, user: User, db: AsyncSession,
+                       after_id: int | None = None) -> list[Contact]:
     """
     The get_contacts function returns a list of contacts.
-        
+        With after_id the page starts right after that contact (index seek on (user_id, id))
+        and skip is ignored.
     
     :param limit: int: Limit the number of contacts returned
     :param offset: int: Specify the number of records to skip
-    :param db: Session: Pass in the database connection to the function
+    :param db: AsyncSession: Pass in the database connection to the function
     :param user: User: Filter the contacts by user
+    :param after_id: int | None: Id of the last contact of the previous page
     :return: A list of contact
     :doc-author: Trelent
     """
 
-    return db.query(Contact).filter(Contact.user_id == user.id).offset(skip).limit(limit).all()
+    stmt = keyset_page(select(Contact).filter(Contact.user_id == user.id), limit, after_id)
+    if after_id is None:
+        stmt = stmt.offset(skip)
+    contacts = await db.execute(stmt)
+    return contacts.scalars().all()
+
+
+def contact_values(body: ContactModel) -> dict:
+    """
+    Column values of a contact, including the normalized phone number.
+
+    :param body: ContactModel: Contact data.
+    :return: dict: Values for INSERT or UPDATE.
+    """
+    return body.model_dump() | {"contact_number_digits": phone_digits(body.contact_number)}
+
+
+def suggestion_of(contact: Contact) -> Suggestion:
+    """
+    Autocomplete entry of a contact.
+
+    :param contact: Contact: Contact object.
+    :return: Suggestion: Fields shown in autocomplete.
+    """
+    return Suggestion(contact.id, contact.first_name, contact.last_name, contact.email)
+
+
+@asynccontextmanager
+async def unique_violations(db: AsyncSession):
+    """
+    Turn a violation of the per-user unique email or contact number of a contact into 409.
+
+    :param db: AsyncSession: Database session object, rolled back on a violation.
+    :return: None
+    :raises: HTTPException: If the statement hit a unique constraint of contacts.
+    """
+    try:
+        yield
+    except IntegrityError as err:
+        await db.rollback()
+        message = str(err.orig)
+        for markers, detail in UNIQUE_CONFLICTS:
+            if any(marker in message for marker in markers):
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail) from err
+        raise
+
+
+async def stream_contacts(user_id: int, db: AsyncSession, batch_size: int) -> AsyncIterator[Sequence[tuple]]:
+    """
+    Stream plain column rows of all contacts of a user through a server-side cursor.
+
+    :param user_id: int: Owner of the contacts.
+    :param db: AsyncSession: Database session object.
+    :param batch_size: int: Number of rows fetched at a time.
+    :return: AsyncIterator[Sequence[tuple]]: Batches of rows in EXPORT_COLUMNS order, ordered by id.
+    """
+    stmt = (select(*(getattr(Contact, column) for column in EXPORT_COLUMNS))
+            .filter(Contact.user_id == user_id)
+            .order_by(Contact.id)
+            .execution_options(yield_per=batch_size))
+    result = await db.stream(stmt)
+    async for rows in result.partitions():
+        yield rows
 
 
-async def get_contact(contact_id: int, user: User, db: Session) -> Contact:
+async def get_contact(contact_id: int, user: User, db: AsyncSession) -> Contact:
 
     """
     Retrieve a single contact by ID.
 
     :param contact_id: int: ID of the contact to retrieve.
     :param user: User: User object to filter contacts.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: Contact: Retrieved contact object.
     """
 
-    return db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    stmt = select(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id))
+    contact = await db.execute(stmt)
+    return contact.scalar_one_or_none()
 
 
-async def create_contact(body: ContactModel, user: User, db: Session) -> Contact:
+async def create_contact(body: ContactModel, user: User, db: AsyncSession) -> Contact:
     contact = Contact(first_name=body.first_name,
                       last_name=body.last_name,
                       email=body.email,
                       contact_number=body.contact_number,
+                      contact_number_digits=phone_digits(body.contact_number),
                       birthday=body.birthday,
                       additional_information=body.additional_information,
                       user_id=user.id
                       )
     """
     Create a new contact.
+        Uniqueness of email and contact number is checked by the database on insert.
 
     :param body: ContactModel: Contact data to create.
     :param user: User: User object to associate with the contact.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: Contact: Created contact object.
+    :raises: HTTPException: If the user already has a contact with this email or contact number.
     """
 
     db.add(contact)
-    db.commit()
-    db.refresh(contact)
+    async with unique_violations(db):
+        await db.commit()
+    # Власник уже відомий - без повторного SELECT для відповіді
+    set_committed_value(contact, "user", user)
+    contact_index.add(user.id, suggestion_of(contact))
+    await sync_birthday_digest(contact, await contacts_cache.bump(user.id))
     return contact
 
 
-async def update_contact(contact_id: int, body: ContactModel, user: User, db: Session) -> Contact | None:
+async def bulk_create_contacts(contacts: list[ContactModel], user: User, db: AsyncSession) -> list[bool]:
+    """
+    Insert many contacts with one multi-row ``INSERT ... ON CONFLICT DO NOTHING`` and commit.
+
+    :param contacts: list[ContactModel]: Contacts to create.
+    :param user: User: User object to associate with the contacts.
+    :param db: AsyncSession: Database session object.
+    :return: list[bool]: For every contact, whether it was inserted (False for a duplicate email or number).
+    """
+    insert = DIALECT_INSERTS[db.get_bind().dialect.name]
+    stmt = (insert(Contact)
+            .values([contact_values(contact) | {"user_id": user.id} for contact in contacts])
+            .on_conflict_do_nothing()
+            .returning(Contact.email, Contact.contact_number))
+    result = await db.execute(stmt)
+    inserted = Counter(tuple(row) for row in result.all())
+    await db.commit()
+    contact_index.drop(user.id)
+    # Дайджест днів народження стає застарілим і перебудовується при читанні
+    await contacts_cache.bump(user.id)
+
+    # Дублікати в межах одного insert: вставляється перший з них
+    created = []
+    for contact in contacts:
+        key = (contact.email, contact.contact_number)
+        created.append(inserted[key] > 0)
+        inserted[key] -= 1
+    return created
+
+
+async def update_contact(contact_id: int, body: ContactModel, user: User, db: AsyncSession) -> Contact | None:
 
     """
-    Update an existing contact.
+    Update an existing contact with a single ``UPDATE ... RETURNING``.
+        Uniqueness of email and contact number is checked by the database, so keeping
+        the contact's own email or number is not a conflict.
 
     :param contact_id: int: ID of the contact to update.
     :param body: ContactModel: Contact data to update.
     :param user: User: User object to authorize the update.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: Contact | None: Updated contact object if successful, None if contact not found.
+    :raises: HTTPException: If another contact of the user has this email or contact number.
     """
 
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    stmt = (update(Contact)
+            .filter(and_(Contact.id == contact_id, Contact.user_id == user.id))
+            .values(**contact_values(body))
+            .returning(Contact))
+    async with unique_violations(db):
+        result = await db.execute(stmt)
+        contact = result.scalar_one_or_none()
+        await db.commit()
     if contact:
-        contact.first_name = body.first_name
-        contact.last_name = body.last_name
-        contact.email = body.email
-        contact.contact_number = body.contact_number
-        contact.birthday = body.birthday
-        contact.additional_information = body.additional_information
-        db.commit()
+        set_committed_value(contact, "user", user)
+        contact_index.add(user.id, suggestion_of(contact))
+        await sync_birthday_digest(contact, await contacts_cache.bump(user.id))
     return contact
 
 
-async def remove_contact(contact_id: int, user: User, db: Session) -> Contact | None:
+async def remove_contact(contact_id: int, user: User, db: AsyncSession) -> Contact | None:
 
     """
     Remove a contact.
 
     :param contact_id: int: ID of the contact to remove.
     :param user: User: User object to authorize the removal.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: Contact | None: Removed contact object if successful, None if contact not found.
     """
 
-    contact = db.query(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id)).first()
+    stmt = select(Contact).filter(and_(Contact.id == contact_id, Contact.user_id == user.id))
+    result = await db.execute(stmt)
+    contact = result.scalar_one_or_none()
     if contact:
-        db.delete(contact)
-        db.commit()
+        await db.delete(contact)
+        await db.commit()
+        contact_index.remove(user.id, contact_id)
+        await sync_birthday_digest(contact, await contacts_cache.bump(user.id), removed=True)
     return contact
 
 # Пошук контакту за ім'ям
-async def find_contact_by_first_name(first_name: str, user: User, db: Session) -> list[Contact]:
+async def find_contact_by_first_name(first_name: str, user: User, db: AsyncSession,
+                                     limit: int | None = None, after_id: int | None = None) -> list[Contact]:
     """
     Search contacts by first name.
     :param first_name: str: First name to search for.
     :param user: User: User object to filter contacts.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
+    :param limit: int | None: Maximum number of contacts to retrieve.
+    :param after_id: int | None: Id of the last contact of the previous page.
     :return: List[Contact]: List of contacts matching the first name.
-    :raises: HTTPException: If no contacts are found matching the first name.
     """
-    contacts = db.query(Contact).filter(and_(Contact.first_name == first_name, Contact.user_id == user.id)).all()
-    if not contacts:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contacts not found")
-    else:
-        return contacts
+    stmt = select(Contact).filter(and_(Contact.first_name == first_name, Contact.user_id == user.id))
+    stmt = keyset_page(stmt, limit, after_id)
+    result = await db.execute(stmt)
+    return result.scalars().all()
 
 # Пошук контакту за прізвищем
-async def find_contact_by_last_name(contact_last_name: str, user: User, db: Session) -> list[Contact]:
+async def find_contact_by_last_name(contact_last_name: str, user: User, db: AsyncSession,
+                                    limit: int | None = None, after_id: int | None = None) -> list[Contact]:
 
     """
     Search contacts by last name.
 
     :param contact_last_name: str: Last name to search for.
     :param user: User: User object to filter contacts.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
+    :param limit: int | None: Maximum number of contacts to retrieve.
+    :param after_id: int | None: Id of the last contact of the previous page.
     :return: list[Contact]: List of contacts matching the last name.
-    :raises: HTTPException: If no contacts are found matching the last name.
     """
 
-    contact = db.query(Contact).filter(and_(Contact.last_name == contact_last_name, Contact.user_id == user.id)).all()
-    if not contact:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
-    else:
-        return contact
+    stmt = select(Contact).filter(and_(Contact.last_name == contact_last_name, Contact.user_id == user.id))
+    stmt = keyset_page(stmt, limit, after_id)
+    result = await db.execute(stmt)
+    return result.scalars().all()
 
 # Пошук контакту за адресою електронної пошти
-async def find_contact_by_email(contact_email: str, user: User, db: Session) -> list[Contact]:
+async def find_contact_by_email(contact_email: str, user: User, db: AsyncSession,
+                                limit: int | None = None, after_id: int | None = None) -> list[Contact]:
 
     """
     Search contacts by email address.
 
     :param contact_email: str: Email address to search for.
     :param user: User: User object to filter contacts.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
+    :param limit: int | None: Maximum number of contacts to retrieve.
+    :param after_id: int | None: Id of the last contact of the previous page.
     :return: list[Contact]: List of contacts matching the email address.
-    :raises: HTTPException: If no contacts are found matching the email address.
     """
 
-    contact = db.query(Contact).filter(and_(Contact.email == contact_email, Contact.user_id == user.id)).first()
-    if not contact:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+    stmt = select(Contact).filter(and_(Contact.email == contact_email, Contact.user_id == user.id))
+    stmt = keyset_page(stmt, limit, after_id)
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+# Пошук контакту за номером телефону
+async def find_contact_by_contact_number(contact_number: str, user: User, db: AsyncSession,
+                                         limit: int | None = None, after_id: int | None = None) -> list[Contact]:
+
+    """
+    Search contacts by phone number in any format, e.g. ``(555) 123-4567`` or ``5551234567``.
+
+    :param contact_number: str: Phone number to search for.
+    :param user: User: User object to filter contacts.
+    :param db: AsyncSession: Database session object.
+    :param limit: int | None: Maximum number of contacts to retrieve.
+    :param after_id: int | None: Id of the last contact of the previous page.
+    :return: list[Contact]: List of contacts with this phone number.
+    """
+
+    stmt = select(Contact).filter(and_(Contact.contact_number_digits == phone_digits(contact_number),
+                                       Contact.user_id == user.id))
+    stmt = keyset_page(stmt, limit, after_id)
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+async def autocomplete_suggestions(user_id: int, db: AsyncSession) -> list[Suggestion]:
+    """
+    Autocomplete entries of all contacts of a user, to build the in-process prefix index.
+
+    :param user_id: int: Owner of the contacts.
+    :param db: AsyncSession: Database session object.
+    :return: list[Suggestion]: Id, names and email of every contact.
+    """
+    stmt = select(Contact.id, Contact.first_name, Contact.last_name, Contact.email).filter(Contact.user_id == user_id)
+    result = await db.execute(stmt)
+    return [Suggestion(*row) for row in result.all()]
+
+
+async def autocomplete_contacts(prefix: str, user: User, db: AsyncSession, limit: int) -> list[Suggestion]:
+    """
+    Contacts whose first name, last name or email starts with ``prefix``, straight from the database.
+        Used when the in-process index is disabled.
+
+    :param prefix: str: Typed text.
+    :param user: User: User object to filter contacts.
+    :param db: AsyncSession: Database session object.
+    :param limit: int: Maximum number of contacts.
+    :return: list[Suggestion]: Matching contacts.
+    """
+    pattern = like_pattern(prefix)[1:]
+    stmt = (select(Contact.id, Contact.first_name, Contact.last_name, Contact.email)
+            .filter(Contact.user_id == user.id,
+                    or_(*(column.ilike(pattern, escape="\\")
+                          for column in (Contact.first_name, Contact.last_name, Contact.email))))
+            .order_by(Contact.first_name, Contact.last_name, Contact.id)
+            .limit(limit))
+    result = await db.execute(stmt)
+    return [Suggestion(*row) for row in result.all()]
+
+
+def like_pattern(query: str) -> str:
+    """
+    ``LIKE`` pattern matching ``query`` anywhere, with its wildcards escaped.
+
+    >>> like_pattern("50%_off")
+    '%50\\\\%\\\\_off%'
+
+    :param query: str: Search text.
+    :return: str: Pattern for ``LIKE ... ESCAPE '\\'``.
+    """
+    return "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+# Нечіткий пошук по всіх полях контакту
+async def search_contacts(query: str, user: User, db: AsyncSession, limit: int,
+                          after: tuple[int, int] | None = None) -> list[tuple[Contact, int]]:
+    """
+    Ranked fuzzy search over name, email, phone digits and additional information.
+        On PostgreSQL a contact matches if it contains the query or a word similar to it
+        (pg_trgm ``<%``), ranked by word similarity; both conditions use the trigram GIN index.
+        Other databases only match substrings and rank all matches equally.
+
+    :param query: str: Search text.
+    :param user: User: User object to filter contacts.
+    :param db: AsyncSession: Database session object.
+    :param limit: int: Maximum number of contacts to retrieve.
+    :param after: tuple[int, int] | None: (rank, id) of the last contact of the previous page.
+    :return: list[tuple[Contact, int]]: Contacts with their rank (word similarity x 1000), best first.
+    """
+    substring = contact_search_text.ilike(like_pattern(query), escape="\\")
+    if db.get_bind().dialect.name == "postgresql":
+        matches = or_(substring, literal(query).op("<%")(contact_search_text.self_group()))
+        rank = cast(func.word_similarity(query, contact_search_text) * literal_column("1000"), Integer)
     else:
-        return contact
+        matches = substring
+        rank = literal(0, Integer)
+
+    stmt = (select(Contact, rank.label("rank"))
+            .filter(Contact.user_id == user.id, matches)
+            .order_by(rank.desc(), Contact.id)
+            .limit(limit))
+    if after is not None:
+        stmt = stmt.filter(or_(rank < after[0], and_(rank == after[0], Contact.id > after[1])))
+    result = await db.execute(stmt)
+    return [(contact, contact_rank) for contact, contact_rank in result.all()]
+
+
+def month_day(day: date) -> int:
+    """
+    Day of the year as the number MMDD, like birthday_month_day in SQL.
+
+    >>> month_day(date(1990, 2, 20))
+    220
+
+    :param day: date: Date.
+    :return: int: MMDD.
+    """
+    return day.month * 100 + day.day
+
+
+def birthday_window(current_date: date, to_date: date):
+    """
+    SQL condition for a birthday in the window (current_date, to_date].
+
+    :param current_date: date: Start date of the date range (excluded).
+    :param to_date: date: End date of the date range.
+    :return: ColumnElement: Filter on birthday_month_day.
+    """
+    start, end = month_day(current_date), month_day(to_date)
+
+    # Вікно (start, end] за MMDD; якщо воно переходить через Новий рік - грудень OR січень
+    if start <= end:
+        return and_(birthday_month_day > start, birthday_month_day <= end)
+    return or_(birthday_month_day > start, birthday_month_day <= end)
 
-async def upcoming_birthdays(current_date, to_date, skip: int, limit: int, user: User, db: Session) -> list[Contact]:
+
+def birthday_in_window(birthday: date, current_date: date, to_date: date) -> bool:
+    """
+    Python counterpart of birthday_window.
+
+    >>> birthday_in_window(date(1990, 1, 2), date(2026, 12, 28), date(2027, 1, 4))
+    True
+
+    :param birthday: date: Birthday of a contact.
+    :param current_date: date: Start date of the date range (excluded).
+    :param to_date: date: End date of the date range.
+    :return: bool: Whether the next birthday falls in the window.
+    """
+    start, end, key = month_day(current_date), month_day(to_date), month_day(birthday)
+    if start <= end:
+        return start < key <= end
+    return key > start or key <= end
+
+
+def birthday_sort_key(contact: Contact, current_date) -> tuple[int, int, int]:
+    """
+    Sort key of a contact in :func:`upcoming_birthdays`, used as its keyset cursor.
+
+    :param contact: Contact: Contact returned by upcoming_birthdays.
+    :param current_date: datetime: Start date of the date range.
+    :return: tuple[int, int, int]: (passed new year, MMDD of the birthday, contact id).
+    """
+    key = contact.birthday.month * 100 + contact.birthday.day
+    return int(key <= current_date.month * 100 + current_date.day), key, contact.id
+
+
+async def upcoming_birthdays(current_date, to_date, skip: int, limit: int | None, user: User, db: AsyncSession,
+                             after: tuple[int, int, int] | None = None) -> list[Contact]:
 
     """
     Retrieve contacts with upcoming birthdays within a specified date range.
+        The range may cross the new year; contacts are ordered by the nearest birthday
+        and skip/limit are applied after filtering. With after (see birthday_sort_key)
+        the page continues after that contact and skip is ignored.
 
     :param current_date: datetime: Start date of the date range.
     :param to_date: datetime: End date of the date range.
     :param skip: int: Number of contacts to skip.
-    :param limit: int: Maximum number of contacts to retrieve.
+    :param limit: int | None: Maximum number of contacts to retrieve, None for all.
     :param user: User: User object to filter contacts.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
+    :param after: tuple[int, int, int] | None: Sort key of the last contact of the previous page.
     :return: list[Contact]: List of contacts with upcoming birthdays within the date range.
     """
 
-    contacts = db.query(Contact).filter(Contact.user_id == user.id).offset(skip).limit(limit).all()
+    start = current_date.month * 100 + current_date.day
+    passed_new_year = case((birthday_month_day > start, 0), else_=1)
+    stmt = (select(Contact)
+            .filter(Contact.user_id == user.id, birthday_window(current_date, to_date))
+            .order_by(passed_new_year, birthday_month_day, Contact.id)
+            .limit(limit))
+    if after is not None:
+        stmt = stmt.filter(tuple_(passed_new_year, birthday_month_day, Contact.id) > tuple_(*after))
+    else:
+        stmt = stmt.offset(skip)
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
 
-    upcoming = []
+async def sync_birthday_digest(contact: Contact, version: int | None, removed: bool = False) -> None:
+    """
+    Apply a created, updated or removed contact to today's birthday digest of its owner.
 
-    # Пошук в контактах по дням народження
-    for contact in contacts:
+    :param contact: Contact: Changed contact, with its owner loaded.
+    :param version: int | None: Contacts version after the change, None if Redis is unavailable.
+    :param removed: bool: Whether the contact was removed.
+    :return: None
+    """
+    if version is None:
+        return
+    current_date = date.today()
+    to_date = current_date + timedelta(days=UPCOMING_BIRTHDAYS_DAYS)
+    value = b""
+    if not removed and birthday_in_window(contact.birthday, current_date, to_date):
+        value = birthday_digest.entry(birthday_sort_key(contact, current_date), contact)
+    await birthday_digest.put(contact.user_id, current_date, version, contact.id, value)
+
+
+async def rebuild_birthday_digest(user: User, current_date: date, to_date: date,
+                                  db: AsyncSession) -> list[tuple[SortKey, bytes]] | None:
+    """
+    Build the birthday digest of one user from the database.
+
+    :param user: User: Owner of the contacts.
+    :param current_date: date: Start date of the date range.
+    :param to_date: date: End date of the date range.
+    :param db: AsyncSession: Database session object.
+    :return: list[tuple[SortKey, bytes]] | None: Digest entries, None if Redis is unavailable.
+    """
+    # Версію читаємо до контактів - зміни між ними лишать дайджест застарілим, а не втраченим
+    version = await contacts_cache.version(user.id)
+    if version is None:
+        return None
+    contacts = await upcoming_birthdays(current_date, to_date, 0, None, user, db)
+    return await birthday_digest.store(user.id, current_date, version,
+                                       [(birthday_sort_key(contact, current_date), contact) for contact in contacts])
 
-        contact_birthday = (contact.birthday.month, contact.birthday.day)
-        current_date = (current_date.month, current_date.day)
-        to_date = (to_date.month, to_date.day)
 
-        if current_date < contact_birthday <= to_date:
-            upcoming.append(contact)
+async def build_birthday_digests(current_date: date, db: AsyncSession, batch_size: int) -> int:
+    """
+    Build the birthday digests of all users with contacts, a batch of users per query.
 
-    return upcoming
\ No newline at end of file
+    :param current_date: date: Start date of the date range.
+    :param db: AsyncSession: Database session object.
+    :param batch_size: int: Number of users per query.
+    :return: int: Number of digests built.
+    """
+    to_date = current_date + timedelta(days=UPCOMING_BIRTHDAYS_DAYS)
+    built, after_id = 0, 0
+    while True:
+        result = await db.execute(select(Contact.user_id).distinct()
+                                  .filter(Contact.user_id > after_id)
+                                  .order_by(Contact.user_id)
+                                  .limit(batch_size))
+        user_ids = result.scalars().all()
+        if not user_ids:
+            return built
+        versions = await birthday_digest.versions(user_ids)
+        result = await db.execute(select(Contact)
+                                  .filter(Contact.user_id.in_(user_ids), birthday_window(current_date, to_date)))
+        contacts = defaultdict(list)
+        for contact in result.scalars().all():
+            contacts[contact.user_id].append((birthday_sort_key(contact, current_date), contact))
+        for user_id, version in versions.items():
+            await birthday_digest.store(user_id, current_date, version, contacts[user_id])
+        built += len(versions)
+        after_id = user_ids[-1]
+        # Пам'ять сесії не росте з кількістю користувачів
+        db.expunge_all()
@@ -1,86 +1,116 @@
-from libgravatar import Gravatar
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User
+from src.services.cache import contacts_cache, user_cache
+from src.services.gravatar import default_avatars, gravatar_url
 from src.schemas.users import UserModel
 
 
-async def get_user_by_email(email: str, db: Session) -> User:
+async def get_user_by_email(email: str, db: AsyncSession) -> User:
 
     """
     Retrieve a user by email.
 
     :param email: str: Email of the user to retrieve.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: User: Retrieved user object.
     """
 
-    return db.query(User).filter(User.email == email).first()
+    stmt = select(User).filter(User.email == email)
+    user = await db.execute(stmt)
+    return user.scalar_one_or_none()
 
 
 # Створюємо нового 
-async def create_user(body: UserModel, db: Session) -> User:
+async def create_user(body: UserModel, db: AsyncSession) -> User:
 
 
     """
     Create a new user.
+        The default avatar is set later by a background job, see resolve_default_avatars.
 
     :param body: UserModel: User data to create.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: User: Created user object.
     """
 
-    avatar = None
-    try:
-        g = Gravatar(body.email)
-        avatar = g.get_image()
-    except Exception as e:
-        print(e)
-    new_user = User(**body.dict(), avatar=avatar)
+    new_user = User(**body.model_dump())
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    # id та created_at повертаються самим INSERT (RETURNING), refresh не потрібен
+    await db.commit()
+    default_avatars.wake()
     return new_user
 
-async def confirmed_email(email: str, db: Session) -> None:
+
+async def resolve_default_avatars(db: AsyncSession, batch_size: int) -> int:
+    """
+    Set the Gravatar URL as the avatar of users that have none, with one UPDATE per batch.
+
+    :param db: AsyncSession: Database session object.
+    :param batch_size: int: Maximum number of users.
+    :return: int: Number of updated users.
+    """
+    # Інші воркери пропускають рядки, які вже обробляє цей
+    stmt = (select(User.id, User.email).filter(User.avatar.is_(None)).order_by(User.id).limit(batch_size)
+            .with_for_update(skip_locked=True))
+    users = (await db.execute(stmt)).all()
+    if not users:
+        await db.rollback()
+        return 0
+    # Умова avatar IS NULL не дає затерти аватар, завантажений тим часом
+    stmt = update(User).filter(User.avatar.is_(None)).execution_options(synchronize_session=None)
+    await db.execute(stmt, [{"id": user_id, "avatar": gravatar_url(email)} for user_id, email in users])
+    await db.commit()
+    for user_id, email in users:
+        await user_cache.invalidate(email)
+        await contacts_cache.bump(user_id)
+    return len(users)
+
+async def confirmed_email(email: str, db: AsyncSession) -> None:
 
     """
     Confirm user's email.
 
     :param email: str: Email address of the user.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: None
     """
 
     user = await get_user_by_email(email, db)
     user.confirmed = True
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
 
 
-async def update_token(user: User, token: str | None, db: Session) -> None:
+async def update_token(user: User, token: str | None, db: AsyncSession) -> None:
 
     """
     Update user's authentication token.
 
     :param user: User: User object to update.
     :param token: str | None: Authentication token to set.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: None
     """
 
     user.refresh_token = token
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(user.email)
 
-async def update_avatar(email, url: str, db: Session) -> User:
+async def update_avatar(email, url: str, db: AsyncSession) -> User:
     """
     Update user's avatar URL.
 
     :param email: str: Email address of the user.
     :param url: str: New avatar URL to set.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: User: Updated user object.
     """
     user = await get_user_by_email(email, db)
     user.avatar = url
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
+    # Відповіді з контактами містять аватар власника
+    await contacts_cache.bump(user.id)
     return user
\ No newline at end of file
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Security, BackgroundTasks, Request
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
 from src.repository import users as repository_users
@@ -14,7 +14,7 @@ security = HTTPBearer()
 
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Request, db: Session = Depends(get_db)):
+async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_db)):
 
 
     """
@@ -23,7 +23,7 @@ async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Re
     :param body: UserModel: User data for registration.
     :param background_tasks: BackgroundTasks: Background tasks for sending email confirmation.
     :param request: Request: Incoming HTTP request.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: UserResponse: User data and confirmation message.
     :raises: HTTPException: If account with provided email already exists.
     """
@@ -31,20 +31,20 @@ async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Re
     exist_user = await repository_users.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.get_password_hash(body.password)
     new_user = await repository_users.create_user(body, db)
     background_tasks.add_task(send_email, new_user.email, new_user.username, request.base_url)
     return {"user": new_user, "detail": "User successfully created. Check your email for confirmation."}
 
 
 @router.post("/login", response_model=TokenModel, status_code=status.HTTP_200_OK)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
 
     """
     Log in an existing user and issue access and refresh tokens.
 
     :param body: OAuth2PasswordRequestForm: Username and password for login.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: TokenModel: Access and refresh tokens.
     :raises: HTTPException: If provided credentials are invalid or email is not confirmed.
     """
@@ -54,7 +54,7 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
-    if not auth_service.verify_password(body.password, user.password):
+    if not await auth_service.verify_password(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
     # Generate JWT
     access_token = await auth_service.create_access_token(data={"sub": user.email})
@@ -63,13 +63,13 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @router.get('/refresh_token', response_model=TokenModel)
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: AsyncSession = Depends(get_db)):
 
     """
     Refresh access token using refresh token.
 
     :param credentials: HTTPAuthorizationCredentials: HTTP Bearer token credentials.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: TokenModel: New access and refresh tokens.
     :raises: HTTPException: If refresh token is invalid.
     """
@@ -82,13 +82,13 @@ async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(sec
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid refresh token")
 
 @router.get('/confirmed_email/{token}')
-async def confirmed_email(token: str, db: Session = Depends(get_db)):
+async def confirmed_email(token: str, db: AsyncSession = Depends(get_db)):
 
     """
     Confirm user's email using confirmation token.
 
     :param token: str: Email confirmation token.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: dict: Confirmation message.
     :raises: HTTPException: If verification fails.
     """
@@ -104,7 +104,7 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):
 
 @router.post('/request_email')
 async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request,
-                        db: Session = Depends(get_db)):
+                        db: AsyncSession = Depends(get_db)):
     
     """
     Request email confirmation.
@@ -112,7 +112,7 @@ async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, r
     :param body: RequestEmail: Email address for confirmation.
     :param background_tasks: BackgroundTasks: Background tasks for sending email confirmation.
     :param request: Request: Incoming HTTP request.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :return: dict: Confirmation message.
     """
 
@@ -0,0 +1,36 @@
+import asyncio
+
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from fastapi.responses import FileResponse
+
+from src.services.cache import etag_matches
+from src.services.thumbnails import MEDIA_TYPE, thumbnail_store
+
+router = APIRouter(prefix='/avatars', tags=["avatars"])
+
+# Адреса залежить від вмісту, тож файл за нею ніколи не змінюється
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.get("/{key}/{size}.webp")
+async def get_avatar(key: str, size: int, if_none_match: str | None = Header(None)):
+    """
+    Serve an avatar thumbnail.
+        Thumbnails are addressed by the hash of the uploaded image, so they are cached by clients
+        and proxies for a year; a matching If-None-Match gets 304 without touching the disk.
+
+    :param key: str: Content key of the image.
+    :param size: int: Thumbnail size in pixels.
+    :param if_none_match: str | None: ETag of the client copy.
+    :return: FileResponse: WebP thumbnail.
+    :raises: HTTPException: If the image or the size is unknown.
+    """
+    etag = thumbnail_store.etag(key, size)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    # Витіснену мініатюру буде згенеровано наново - це робота для потоку
+    path = await asyncio.to_thread(thumbnail_store.get, key, size)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Avatar not found")
+    return FileResponse(path, media_type=MEDIA_TYPE, headers=headers)
@@ -1,121 +1,229 @@
 from datetime import date, timedelta
-from fastapi import APIRouter, HTTPException, Depends, status, Query, Path, UploadFile, File
+from typing import Awaitable, Callable
+from urllib.parse import urlencode
+from fastapi import APIRouter, HTTPException, Depends, status, Query, Path, UploadFile, File, Request, Response
+from fastapi.responses import StreamingResponse
 import pathlib
-from sqlalchemy.orm import Session
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from src.database.db import get_db
-from src.database.models import Contact, User
+from src.conf.config import settings
+from src.database.db import get_db, get_session_factory
+from src.database.models import User
 from src.repository import contacts as repository_contacts
-from src.schemas.schemas import ContactModel, ContactResponse
+from src.schemas.schemas import ContactImportReport, ContactModel, ContactResponse, ContactSuggestion
 from src.services.auth import auth_service
+from src.services.autocomplete import contact_index
+from src.services.birthdays import birthday_digest
+from src.services.cache import contacts_cache, etag_matches
+from src.services.contacts_export import EXPORT_MEDIA_TYPES, export_contacts
+from src.services.contacts_import import import_contacts, import_format
+from src.services.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor, set_next_cursor
 import uuid
 
 router = APIRouter(prefix='/contacts')
 
+CONTACT_ADAPTER = TypeAdapter(ContactResponse)
+CONTACTS_ADAPTER = TypeAdapter(list[ContactResponse])
+
+
+def json_body(adapter: TypeAdapter, value) -> bytes:
+    """
+    Serialize ORM objects like the response model of the route would.
+
+    :param adapter: TypeAdapter: Adapter of the response model.
+    :param value: Contact or list of contacts.
+    :return: bytes: JSON body.
+    """
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def request_key(request: Request, *extra) -> str:
+    """
+    Cache key of a read: path, query parameters in a stable order and extra values.
+
+    :param request: Request: Incoming request.
+    :param extra: Values the response depends on besides the URL, e.g. the current date.
+    :return: str: Cache key.
+    """
+    query = urlencode(sorted(request.query_params.multi_items()))
+    return "?".join([request.url.path, query, *map(str, extra)])
+
+
+async def cached_read(request: Request, user: User, key: str,
+                      produce: Callable[[], Awaitable[tuple[bytes, str | None]]]) -> Response:
+    """
+    Serve a contacts read with an ETag of the user's contacts version.
+        A matching If-None-Match gets 304 without touching the database, otherwise the body is
+        taken from Redis or produced and cached. Without Redis the body is produced every time
+        and sent without an ETag.
+
+    :param request: Request: Incoming request.
+    :param user: User: Owner of the contacts.
+    :param key: str: Cache key from request_key.
+    :param produce: Callable: Reads the database, returns the JSON body and the next page cursor.
+    :return: Response: JSON, or 304 Not Modified.
+    """
+    version = await contacts_cache.version(user.id)
+    headers = {}
+    if version is None:
+        body, cursor = await produce()
+    else:
+        headers = {"ETag": contacts_cache.etag(user.id, version, key), "Cache-Control": "private, no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        cached = await contacts_cache.get(user.id, version, key)
+        if cached is not None:
+            # Курсор наступної сторінки зберігається першим рядком
+            cursor, body = cached.split(b"\n", 1)
+            cursor = cursor.decode() or None
+        else:
+            body, cursor = await produce()
+            await contacts_cache.set(user.id, version, key, (cursor or "").encode() + b"\n" + body)
+    if cursor is not None:
+        headers[NEXT_CURSOR_HEADER] = cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
 # Список всіх контактів
 @router.get("/", response_model=list[ContactResponse], tags=['Contacts'])
-async def get_contacts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db),
-    current_user: User = Depends(auth_service.get_current_user)):
+async def get_contacts(request: Request, skip: int = 0, limit: int = 100, cursor: str = Query(None),
+    db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
     """
     Retrieve a list of contacts.
+        A full page carries the X-Next-Cursor header; pass it back as cursor to get the next
+        page by an index seek instead of skip. Responses carry an ETag; send it back in
+        If-None-Match to get 304 Not Modified while the contacts are unchanged.
 
-    :param skip: int: Number of records to skip.
+    :param request: Request: Incoming request.
+    :param skip: int: Number of records to skip (ignored with cursor).
     :param limit: int: Maximum number of contacts to retrieve.
-    :param db: Session: Database session object.
+    :param cursor: str: Opaque cursor from the X-Next-Cursor header of the previous page.
+    :param db: AsyncSession: Database session object.
     :param current_user: User: Current authenticated user.
     :return: list[ContactResponse]: List of contacts.
     """
-    contacts = await repository_contacts.get_contacts(skip, limit, current_user, db)
-    return contacts
+    after_id = decode_cursor(cursor, 1)[0] if cursor else None
+
+    async def produce():
+        contacts = await repository_contacts.get_contacts(skip, limit, current_user, db, after_id)
+        return (json_body(CONTACTS_ADAPTER, contacts),
+                next_cursor(contacts, limit, lambda contact: (contact.id,)))
+
+    return await cached_read(request, current_user, request_key(request), produce)
 
 # Контакт за ідентифікатором
 @router.get("/{contact_id}", response_model=ContactResponse, tags=['Contacts'])
-async def get_contact(contact_id: int = Path(ge=1), db: Session = Depends(get_db), 
+async def get_contact(request: Request, contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_user)):
 
     """
     Retrieve a contact by its identifier.
+        Responses carry an ETag for conditional requests with If-None-Match.
 
+    :param request: Request: Incoming request.
     :param contact_id: int: Identifier of the contact.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :param current_user: User: Current authenticated user.
     :return: ContactResponse: Retrieved contact.
     :raises: HTTPException: If contact with provided ID is not found.
     """
-    contact = await repository_contacts.get_contact(contact_id, current_user, db)
+    async def produce():
+        contact = await repository_contacts.get_contact(contact_id, current_user, db)
 
-    # Перевіряємо чи існує контакт
-    if not contact:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
-    return contact
+        # Перевіряємо чи існує контакт
+        if not contact:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
+        return json_body(CONTACT_ADAPTER, contact), None
+
+    return await cached_read(request, current_user, request_key(request), produce)
 
 # Створення нового контакту
 @router.post("/", response_model=ContactResponse, tags=['Contacts'], status_code=status.HTTP_201_CREATED)
-async def create_contact(body: ContactModel, db: Session = Depends(get_db),
+async def create_contact(body: ContactModel, db: AsyncSession = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_user)):
     """
     Create a new contact.
 
     :param body: ContactModel: Contact data for creation.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :param current_user: User: Current authenticated user.
     :return: ContactResponse: Created contact.
     :raises: HTTPException: If a contact with the same email or contact number already exists.
     """
 
-    contact_email = db.query(Contact).filter_by(email=body.email, user=current_user).first()
-    contact_number = db.query(Contact).filter_by(contact_number=body.contact_number).first()
-    
-    # Перевіряємо існування контакту з наданною поштою
-    if contact_email:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Contact with the mentioned email already exists.")
-    # Перевіряємо існування контакту з наданним телефоним номером
-    if contact_number:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Contact with the mentioned contact number already exists.")
-    return await repository_contacts.create_contact(body, db)
+    return await repository_contacts.create_contact(body, current_user, db)
+
+# Масовий імпорт контактів з CSV або JSONL
+@router.post("/import/", response_model=ContactImportReport, tags=['Contacts'])
+async def import_contacts_file(file: UploadFile = File(...), db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Import contacts from a CSV file with a header row or a JSONL file with one contact per line.
+        Rows are validated like in create_contact and inserted in batches; rows with an existing
+        email or contact number are skipped. The report lists invalid and skipped rows.
+
+    :param file: UploadFile: .csv or .jsonl file.
+    :param db: AsyncSession: Database session object.
+    :param current_user: User: Current authenticated user.
+    :return: ContactImportReport: Number of imported rows and per-row errors.
+    :raises: HTTPException: If the file format is not supported.
+    """
+    file_format = import_format(file.filename, file.content_type)
+    return await import_contacts(file.file, file_format, current_user, db,
+                                 settings.CONTACT_IMPORT_BATCH_SIZE, settings.CONTACT_IMPORT_MAX_ERRORS)
+
+# Потокове вивантаження всіх контактів
+@router.get("/export/", tags=['Contacts'], response_class=StreamingResponse)
+async def export_contacts_file(file_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    session_factory: async_sessionmaker = Depends(get_session_factory),
+    current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Export all contacts of the current user as CSV or NDJSON.
+        Rows are streamed from a server-side cursor as they are fetched, so memory use does not
+        grow with the number of contacts.
+
+    :param file_format: str: csv or ndjson.
+    :param session_factory: async_sessionmaker: Factory of the session used while streaming.
+    :param current_user: User: Current authenticated user.
+    :return: StreamingResponse: Contacts file.
+    """
+    return StreamingResponse(
+        export_contacts(session_factory, current_user.id, file_format, settings.CONTACT_EXPORT_BATCH_SIZE),
+        media_type=EXPORT_MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{file_format}"'})
 
 # Оновлення існуючого контакту
 @router.put("/{contact_id}", response_model=ContactResponse, tags=['Contacts'])
-async def update_contact(body: ContactModel, contact_id: int = Path(ge=1), db: Session = Depends(get_db)):
+async def update_contact(body: ContactModel, contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(auth_service.get_current_user)):
 
     """
     Update an existing contact.
 
     :param body: ContactModel: Contact data for update.
     :param contact_id: int: Identifier of the contact to update.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
+    :param current_user: User: Current authenticated user.
     :return: ContactResponse: Updated contact.
     :raises: HTTPException: If contact with provided ID is not found or a contact with the same email or contact number already exists.
     """
 
-    contact = db.query(Contact).filter(Contact.id == contact_id).first()
-
+    contact = await repository_contacts.update_contact(contact_id, body, current_user, db)
     if contact is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Contact not found")
-
-    contact_email = db.query(Contact).filter_by(email=body.email).first()
-    contact_number = db.query(Contact).filter_by(contact_number=body.contact_number).first()
-
-    if contact_email:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Contact with the mentioned email already exists.")
-
-    if contact_number:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Contact with the mentioned contact number already exists.")
-    contact = await repository_contacts.update_contact(contact_id, body, db)
-
     return contact
 
 
 # Видалення контакту
 @router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT, tags=['Contacts'])
-async def remove_contact(contact_id: int = Path(ge=1), db: Session = Depends(get_db),
+async def remove_contact(contact_id: int = Path(ge=1), db: AsyncSession = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_user)):
 
     """
     Remove a contact.
 
     :param contact_id: int: Identifier of the contact to remove.
-    :param db: Session: Database session object.
+    :param db: AsyncSession: Database session object.
     :param current_user: User: Current authenticated user.
     :return: None
     :raises: HTTPException: If contact with provided ID is not found.
@@ -131,57 +239,152 @@ async def remove_contact(contact_id: int = Path(ge=1), db: Session = Depends(get
 
 # Пошук контакту
 @router.get("/search/", response_model=list[ContactResponse], tags=['Contacts'])
-async def find_contact(contact_first_name: str = Query(None),
+async def find_contact(response: Response,
+                       contact_first_name: str = Query(None),
                        contact_last_name: str = Query(None),
                        contact_email: str = Query(None),
-                       db: Session = Depends(get_db),
+                       contact_number: str = Query(None),
+                       limit: int = Query(None, ge=1),
+                       cursor: str = Query(None),
+                       db: AsyncSession = Depends(get_db),
                        current_user: User = Depends(auth_service.get_current_user)):
     
     """
-    Search contacts by first name, last name, or email.
+    Search contacts by first name, last name, email or phone number (in any format).
+        Without limit all matches are returned; with limit a full page carries the X-Next-Cursor header.
+        No matches give an empty list.
 
+    :param response: Response: Response object for the pagination header.
     :param contact_first_name: str: First name of the contact.
     :param contact_last_name: str: Last name of the contact.
     :param contact_email: str: Email of the contact.
-    :param db: Session: Database session object.
+    :param contact_number: str: Phone number of the contact.
+    :param limit: int: Maximum number of contacts to retrieve.
+    :param cursor: str: Opaque cursor from the X-Next-Cursor header of the previous page.
+    :param db: AsyncSession: Database session object.
     :param current_user: User: Current authenticated user.
     :return: list[ContactResponse]: List of matching contacts.
     :raises: HTTPException: If no search parameters are provided.
     """
 
+    after_id = decode_cursor(cursor, 1)[0] if cursor else None
+
     # Перевіряємо чи існує контакт з данним ім'ям
     if contact_first_name:
-        return await repository_contacts.find_contact_by_first_name(contact_first_name, current_user, db)
+        contacts = await repository_contacts.find_contact_by_first_name(contact_first_name, current_user, db,
+                                                                        limit, after_id)
      # Перевіряємо чи існує контакт з данним призвіщем
     elif contact_last_name:
-        return await repository_contacts.find_contact_by_last_name(contact_last_name, current_user, db)
+        contacts = await repository_contacts.find_contact_by_last_name(contact_last_name, current_user, db,
+                                                                       limit, after_id)
     # Перевіряємо чи існує контакт з данною поштою
     elif contact_email:
-        return await repository_contacts.find_contact_by_email(contact_email, current_user, db)
+        contacts = await repository_contacts.find_contact_by_email(contact_email, current_user, db,
+                                                                   limit, after_id)
+    # Перевіряємо чи існує контакт з данним номером телефону
+    elif contact_number:
+        contacts = await repository_contacts.find_contact_by_contact_number(contact_number, current_user, db,
+                                                                            limit, after_id)
     else:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="You must provide at least one parameter")
+    if limit:
+        set_next_cursor(response, contacts, limit, lambda contact: (contact.id,))
+    return contacts
+
+
+# Нечіткий пошук з ранжуванням
+@router.get("/search/fuzzy/", response_model=list[ContactResponse], tags=['Contacts'])
+async def fuzzy_search_contacts(response: Response,
+                                q: str = Query(min_length=1, max_length=100),
+                                limit: int = Query(20, ge=1, le=100),
+                                cursor: str = Query(None),
+                                db: AsyncSession = Depends(get_db),
+                                current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Fuzzy search across name, email, phone number and additional information, best matches first.
+        A full page carries the X-Next-Cursor header for the next page.
+
+    :param response: Response: Response object for the pagination header.
+    :param q: str: Search text.
+    :param limit: int: Maximum number of contacts to retrieve.
+    :param cursor: str: Opaque cursor from the X-Next-Cursor header of the previous page.
+    :param db: AsyncSession: Database session object.
+    :param current_user: User: Current authenticated user.
+    :return: list[ContactResponse]: Matching contacts.
+    """
+    after = tuple(decode_cursor(cursor, 2)) if cursor else None
+    ranked = await repository_contacts.search_contacts(q, current_user, db, limit, after)
+    set_next_cursor(response, ranked, limit, lambda row: (row[1], row[0].id))
+    return [contact for contact, _ in ranked]
+
+
+# Автодоповнення за початком імені, прізвища або пошти
+@router.get("/autocomplete/", response_model=list[ContactSuggestion], tags=['Contacts'])
+async def autocomplete_contacts(q: str = Query(min_length=1, max_length=100),
+                                limit: int = Query(10, ge=1, le=50),
+                                db: AsyncSession = Depends(get_db),
+                                current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Suggest contacts whose first name, last name, full name or email starts with the typed text.
+        Served from an in-process prefix index of the user, built on first use.
+
+    :param q: str: Typed text.
+    :param limit: int: Maximum number of suggestions.
+    :param db: AsyncSession: Database session object.
+    :param current_user: User: Current authenticated user.
+    :return: list[ContactSuggestion]: Matching contacts.
+    """
+    if not settings.AUTOCOMPLETE_ENABLED:
+        suggestions = await repository_contacts.autocomplete_contacts(q, current_user, db, limit)
+    else:
+        index = await contact_index.get(current_user.id,
+                                        lambda: repository_contacts.autocomplete_suggestions(current_user.id, db))
+        suggestions = index.search(q, limit)
+    return [suggestion._asdict() for suggestion in suggestions]
 
 
 # Отримання списку контактів з днями народження на найближчі 7 днів
 @router.get("/birthdays/", response_model=list[ContactResponse], tags=['Birthdays'])
-async def get_upcoming_birthdays(skip: int = 0, limit: int = 100,db: Session = Depends(get_db),
-    current_user: User = Depends(auth_service.get_current_user)):
+async def get_upcoming_birthdays(request: Request, skip: int = 0, limit: int = 100, cursor: str = Query(None),
+    db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
 
     """
     Get a list of contacts with upcoming birthdays within the next 7 days.
+        Served from the daily birthday digest of the user, which is rebuilt from the database
+        when missing. A full page carries the X-Next-Cursor header for the next page. Responses
+        carry an ETag for conditional requests with If-None-Match; it changes with the contacts
+        and the date.
 
-    :param skip: int: Number of records to skip.
+    :param request: Request: Incoming request.
+    :param skip: int: Number of records to skip (ignored with cursor).
     :param limit: int: Maximum number of contacts to retrieve.
-    :param db: Session: Database session object.
+    :param cursor: str: Opaque cursor from the X-Next-Cursor header of the previous page.
+    :param db: AsyncSession: Database session object.
     :param current_user: User: Current authenticated user.
     :return: list[ContactResponse]: List of contacts with upcoming birthdays.
     """
 
     current_date = date.today()
-    to_date = current_date + timedelta(days=7)
-
-    birthdays = await repository_contacts.upcoming_birthdays(current_date, to_date, skip, limit, current_user, db)
-    return birthdays
+    to_date = current_date + timedelta(days=repository_contacts.UPCOMING_BIRTHDAYS_DAYS)
+
+    after = tuple(decode_cursor(cursor, 3)) if cursor else None
+
+    async def produce():
+        digest = await birthday_digest.get(current_user.id, current_date)
+        if digest is None:
+            digest = await repository_contacts.rebuild_birthday_digest(current_user, current_date, to_date, db)
+        if digest is not None:
+            page = birthday_digest.page(digest, skip, limit, after)
+            return b"[" + b",".join(body for _, body in page) + b"]", next_cursor(page, limit, lambda entry: entry[0])
+
+        # Без Redis - сторінка напряму з БД
+        birthdays = await repository_contacts.upcoming_birthdays(current_date, to_date, skip, limit, current_user,
+                                                                 db, after)
+        return (json_body(CONTACTS_ADAPTER, birthdays),
+                next_cursor(birthdays, limit,
+                            lambda contact: repository_contacts.birthday_sort_key(contact, current_date)))
+
+    return await cached_read(request, current_user, request_key(request, current_date), produce)
 
 MAX_FILE_SIZE = 1_000_000
 
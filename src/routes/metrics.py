@@ -0,0 +1,109 @@
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Security, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from redis.exceptions import RedisError
+
+from middlewares import ALLOWED_IPS, BANNED_IPS
+from src.conf.config import settings
+from src.database.db import get_pool_stats
+from src.services.avatars import avatar_pipeline
+from src.services.autocomplete import contact_index
+from src.services.birthdays import birthday_digest
+from src.services.cache import contacts_cache, token_cache, user_cache
+from src.services.gravatar import default_avatars
+from src.services.hashing import password_hasher
+from src.services.outbox import mail_outbox
+from src.services.thumbnails import thumbnail_store
+
+security = HTTPBearer(auto_error=False)
+
+
+async def verify_metrics_token(credentials: HTTPAuthorizationCredentials | None = Security(security)) -> None:
+    """
+    Let through only requests bearing ``METRICS_TOKEN``; without the setting the metrics are closed.
+
+    :param credentials: HTTPAuthorizationCredentials | None: HTTP Bearer token credentials.
+    :return: None
+    :raises: HTTPException: 403 if no metrics token is configured, 401 if the token is missing or wrong.
+    """
+    if not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Metrics are disabled")
+    # Порівняння за сталий час, щоб токен не підбирали за часом відповіді
+    if credentials is None or not secrets.compare_digest(credentials.credentials.encode(),
+                                                         settings.METRICS_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+router = APIRouter(prefix='/metrics', tags=["Metrics"], dependencies=[Depends(verify_metrics_token)])
+
+
+@router.get("/pool")
+async def pool_stats():
+    """
+    Connection pool statistics of this worker: checked-out connections, checkout wait
+    histogram, timeouts and connection churn.
+
+    :return: dict: Pool statistics.
+    """
+    return get_pool_stats()
+
+
+@router.get("/cache")
+async def cache_stats():
+    """
+    Hit/miss counters of the per-worker user LRU, the Redis user cache, the verified token cache,
+    the contact autocomplete index, the cached contact read responses, the birthday digests and
+    the avatar thumbnails on disk.
+
+    :return: dict: Cache statistics.
+    """
+    return {"users": user_cache.stats(), "tokens": token_cache.stats(), "autocomplete": contact_index.stats(),
+            "contacts": contacts_cache.stats(), "birthdays": birthday_digest.stats(),
+            "thumbnails": thumbnail_store.stats()}
+
+
+@router.get("/hashing")
+async def hashing_stats():
+    """
+    Password hashing pool of this worker: size, running and queued calls, rejections.
+
+    :return: dict: Hasher statistics.
+    """
+    return password_hasher.stats()
+
+
+@router.get("/avatars")
+async def avatar_stats():
+    """
+    Avatar upload pool of this worker (size, uploads in progress, failures and rejections) and
+    the default avatars it resolved.
+
+    :return: dict: Avatar statistics.
+    """
+    return {"uploads": avatar_pipeline.stats(), "defaults": default_avatars.stats()}
+
+
+@router.get("/ip-lists")
+async def ip_list_stats():
+    """
+    Size and last reload time of the IP deny and allow lists of this worker.
+
+    :return: dict: IP list statistics.
+    """
+    return {"blacklist": BANNED_IPS.stats(), "whitelist": ALLOWED_IPS.stats()}
+
+
+@router.get("/mail")
+async def mail_stats():
+    """
+    Number of letters queued in the mail outbox, waiting for a retry and given up.
+
+    :return: dict: Outbox statistics.
+    :raises: HTTPException: If Redis is unavailable.
+    """
+    try:
+        return await mail_outbox.stats()
+    except RedisError:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Mail outbox unavailable")
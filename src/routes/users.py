@@ -1,24 +1,17 @@
-import cloudinary
-import cloudinary.uploader
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status
 from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from src.conf.config import settings
-from src.database.db import get_db
+from src.database.db import get_session_factory
 from src.database.models import User
 from src.repository import users as repository_users
 from src.schemas.schemas import PasswordResetRequest, PasswordReset
 from src.schemas.users import UserResponse
 from src.services.auth import auth_service
+from src.services.avatars import avatar_pipeline
 
 router = APIRouter(prefix='/users', tags=["users"])
 
-cloudinary.config(cloud_name=settings.CLOUDINARY_NAME,
-                  api_key=settings.CLOUDINARY_API_KEY,
-                  api_secret=settings.CLOUDINARY_API_SECRET,
-                  secure=True)
-
 
 @router.get('/me', response_model=UserResponse, dependencies=[Depends(RateLimiter(times=1, seconds=20))])
 async def get_my_user(my_user: User = Depends(auth_service.get_current_user)):
@@ -33,24 +26,27 @@ async def get_my_user(my_user: User = Depends(auth_service.get_current_user)):
     return my_user
 
 
-@router.patch('/avatar', response_model=UserResponse, dependencies=[Depends(RateLimiter(times=1, seconds=20))])
+@router.patch('/avatar', response_model=UserResponse, status_code=status.HTTP_202_ACCEPTED,
+              dependencies=[Depends(RateLimiter(times=1, seconds=20))])
 async def upload_avatar(file: UploadFile = File(),
                         user: User = Depends(auth_service.get_current_user),
-                        db: AsyncSession = Depends(get_db)):
+                        session_factory: async_sessionmaker = Depends(get_session_factory)):
     """
-    Upload a new avatar for the authenticated user.
+    Accept a new avatar for the authenticated user.
+        The image is stored in the background; the user's avatar URL changes once it is stored.
 
     :param file: UploadFile: Avatar image file to upload.
     :param user: User: Current authenticated user.
-    :param db: AsyncSession: Async database session object.
-    :return: UserResponse: Details of the user after updating the avatar.
+    :param session_factory: async_sessionmaker: Factory of the session used after the response.
+    :return: UserResponse: Details of the user with the current avatar.
     """
 
-    public_id = f"Application/{user.email}"
-    image = cloudinary.uploader.upload(file.file, public_id=public_id, overwrite=True)
-    print(image)
-    image_url = cloudinary.CloudinaryImage(public_id).build_url(width=250, height=250, crop=True,
-                                                                version=image.get('version'))
-    user = await repository_users.update_avatar_url(user.email, image_url, db)
-    return user
+    email = user.email
+
+    async def save_avatar(url: str) -> None:
+        # Сесія запиту на цей момент уже закрита
+        async with session_factory() as db:
+            await repository_users.update_avatar(email, url, db)
 
+    await avatar_pipeline.submit(file, f"Application/{email}", save_avatar)
+    return {"user": user, "detail": "Avatar upload accepted"}
@@ -2,21 +2,35 @@ from datetime import date, datetime
 from fastapi import HTTPException, status
 from typing import Optional
 from pydantic import BaseModel, Field, EmailStr, field_validator
-from src.schemas.users import UserResponse
+from src.schemas.users import UserDb
+
+def phone_digits(value: str) -> str:
+    """
+    Normalized form of a phone number: its digits only.
+
+    >>> phone_digits("(555) 123-4567")
+    '5551234567'
+
+    :param value: str: Phone number as entered.
+    :return: str: Digits of the number.
+    """
+    return ''.join(filter(str.isdigit, value))
+
 
 class ContactModel(BaseModel):
     first_name: str = Field(max_length=15)
     last_name: str = Field(max_length=15)
     email: EmailStr
-    contact_number: str
+    # Обмеження відповідають довжині колонок - задовгий рядок не повинен падати в базі
+    contact_number: str = Field(max_length=20)
     birthday: date
-    additional_information: str = Optional[str]
+    additional_information: Optional[str] = Field(default=None, max_length=250)
 
     @field_validator('contact_number')
     @classmethod
     def validate_contact_number(cls, value: str) -> str:
     # Удаление всех символов, не являющихся цифрами
-        cleaned_number = ''.join(filter(str.isdigit, value))
+        cleaned_number = phone_digits(value)
     
         # Проверка длины номера контакта
         if len(cleaned_number) != 10:
@@ -34,11 +48,30 @@ class ContactModel(BaseModel):
 
 class ContactResponse(ContactModel):
     id: int
-    user: UserResponse | None
+    user: UserDb | None
 
     class Config:
         from_attributes = True
 
+class ContactSuggestion(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+
+
+class ContactImportError(BaseModel):
+    row: int
+    detail: str
+
+
+class ContactImportReport(BaseModel):
+    total: int
+    imported: int
+    failed: int
+    errors: list[ContactImportError]
+
+
 class PasswordResetRequest(BaseModel):
     email: str
 
@@ -13,7 +13,7 @@ class UserDb(BaseModel):
     username: str
     email: str
     created_at: datetime
-    avatar: str
+    avatar: str | None = None
 
     class Config:
         from_attributes = True
@@ -2,54 +2,68 @@ from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from src.database.db import get_db
 from src.repository import users as repository_users
 from src.conf.config import settings
-
-import redis
+from src.services.cache import token_cache, user_cache
+from src.services.hashing import password_hasher, pwd_context
 
 
 class Auth:
-    now_utc = datetime.now(timezone.utc)
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context = pwd_context
     SECRET_KEY = settings.SECRET_KEY
     ALGORITHM = settings.ALGORITHM
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    r = redis.Redis(host=settings.REDIS_DOMAIN, port=settings.REDIS_PORT, db=0)
 
-    def verify_password(self, plain_password, hashed_password):
-        return self.pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, plain_password, hashed_password):
+        return await password_hasher.verify(plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
-        return self.pwd_context.hash(password)
+    async def get_password_hash(self, password: str):
+        return await password_hasher.hash(password)
 
     async def create_access_token(self, data: dict, expires_delta: Optional[float] = None):
         to_encode = data.copy()
+        now_utc = datetime.now(timezone.utc)
         if expires_delta:
-            expire = self.now_utc + timedelta(seconds=expires_delta)
+            expire = now_utc + timedelta(seconds=expires_delta)
         else:
-            expire = self.now_utc + timedelta(minutes=15)
-        to_encode.update({"iat": self.now_utc, "exp": expire, "scope": "access_token"})
+            expire = now_utc + timedelta(minutes=15)
+        to_encode.update({"iat": now_utc, "exp": expire, "scope": "access_token"})
         encoded_access_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
         return encoded_access_token
 
     async def create_refresh_token(self, data: dict, expires_delta: Optional[float] = None):
         to_encode = data.copy()
+        now_utc = datetime.now(timezone.utc)
         if expires_delta:
-            expire = self.now_utc + timedelta(seconds=expires_delta)
+            expire = now_utc + timedelta(seconds=expires_delta)
         else:
-            expire = self.now_utc + timedelta(days=7)
-        to_encode.update({"iat": self.now_utc, "exp": expire, "scope": "refresh_token"})
+            expire = now_utc + timedelta(days=7)
+        to_encode.update({"iat": now_utc, "exp": expire, "scope": "refresh_token"})
         encoded_refresh_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
         return encoded_refresh_token
 
+    def decode_token(self, token: str) -> dict:
+        """
+        Verify a JWT and return its claims. Verification runs once per token per worker,
+        repeated requests with the same token are served from ``token_cache`` until ``exp``.
+
+        :param token: str: Encoded JWT.
+        :return: dict: Verified claims.
+        :raises: JWTError: If the signature or the claims are invalid.
+        """
+        payload = token_cache.get(token)
+        if payload is None:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            token_cache.set(token, payload)
+        return payload
+
     async def decode_refresh_token(self, refresh_token: str):
         try:
-            payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(refresh_token)
             if payload['scope'] == 'refresh_token':
                 email = payload['sub']
                 return email
@@ -57,7 +71,7 @@ class Auth:
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -66,7 +80,7 @@ class Auth:
 
         try:
             # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_token(token)
             if payload['scope'] == 'access_token':
                 email = payload["sub"]
                 if email is None:
@@ -76,9 +90,13 @@ class Auth:
         except JWTError as e:
             raise credentials_exception
 
-        user = await repository_users.get_user_by_email(email, db)
+        # Спершу кеш, щоб автентифікація не ходила в таблицю users на кожен запит
+        user = await user_cache.get(email)
         if user is None:
-            raise credentials_exception
+            user = await repository_users.get_user_by_email(email, db)
+            if user is None:
+                raise credentials_exception
+            await user_cache.set(user)
         return user
     
     def create_email_token(self, data: dict):
@@ -0,0 +1,227 @@
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Awaitable, Callable, Iterable, NamedTuple
+
+from src.conf.config import settings
+
+
+class Suggestion(NamedTuple):
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+
+
+def normalize(text: str) -> str:
+    """
+    Normalized form of a name, email or typed prefix.
+
+    >>> normalize("  Wade   WILSON ")
+    'wade wilson'
+
+    :param text: str: Text to normalize.
+    :return: str: Case-folded text with single spaces.
+    """
+    return " ".join(text.casefold().split())
+
+
+class ContactPrefixIndex:
+    """
+    Prefix index over the contacts of one user: a sorted array of (term, id) pairs searched
+    with bisect. Terms are the first name, last name, full name and email of every contact.
+
+    >>> index = ContactPrefixIndex([Suggestion(1, "Wade", "Wilson", "wade@example.com"),
+    ...                             Suggestion(2, "Vanessa", "Carlysle", "vanessa@example.com")])
+    >>> [suggestion.id for suggestion in index.search("wa")], [s.id for s in index.search("CARL")]
+    ([1], [2])
+    >>> index.remove(1); index.search("wade")
+    []
+    """
+
+    def __init__(self, suggestions: Iterable[Suggestion] = ()):
+        self.contacts: dict[int, Suggestion] = {suggestion.id: suggestion for suggestion in suggestions}
+        self.terms: list[tuple[str, int]] = sorted((term, contact_id)
+                                                   for contact_id, suggestion in self.contacts.items()
+                                                   for term in self.terms_of(suggestion))
+
+    def __len__(self) -> int:
+        return len(self.contacts)
+
+    @staticmethod
+    def terms_of(suggestion: Suggestion) -> set[str]:
+        """
+        Indexed terms of a contact.
+
+        :param suggestion: Suggestion: Contact fields.
+        :return: set[str]: Normalized first name, last name, full name and email.
+        """
+        first_name, last_name = normalize(suggestion.first_name), normalize(suggestion.last_name)
+        return {first_name, last_name, f"{first_name} {last_name}", normalize(suggestion.email)}
+
+    def add(self, suggestion: Suggestion) -> None:
+        """
+        Add a contact, replacing its previous version.
+
+        :param suggestion: Suggestion: Contact fields.
+        :return: None
+        """
+        self.remove(suggestion.id)
+        self.contacts[suggestion.id] = suggestion
+        for term in self.terms_of(suggestion):
+            insort(self.terms, (term, suggestion.id))
+
+    def remove(self, contact_id: int) -> None:
+        """
+        Remove a contact if present.
+
+        :param contact_id: int: Contact id.
+        :return: None
+        """
+        suggestion = self.contacts.pop(contact_id, None)
+        if suggestion is None:
+            return
+        for term in self.terms_of(suggestion):
+            position = bisect_left(self.terms, (term, contact_id))
+            if position < len(self.terms) and self.terms[position] == (term, contact_id):
+                del self.terms[position]
+
+    def search(self, prefix: str, limit: int = 10) -> list[Suggestion]:
+        """
+        Contacts with a term starting with ``prefix``, in term order.
+
+        :param prefix: str: Typed text.
+        :param limit: int: Maximum number of contacts.
+        :return: list[Suggestion]: Matching contacts.
+        """
+        prefix = normalize(prefix)
+        found: dict[int, Suggestion] = {}
+        position = bisect_left(self.terms, (prefix,))
+        while position < len(self.terms) and len(found) < limit:
+            term, contact_id = self.terms[position]
+            if not term.startswith(prefix):
+                break
+            found.setdefault(contact_id, self.contacts[contact_id])
+            position += 1
+        return list(found.values())
+
+
+class AutocompleteIndex:
+    """
+    Per-worker prefix indexes of recently active users.
+
+    A user's index is built on first use from a loader and then kept up to date by the contacts
+    repository. Whole indexes are evicted least recently used first once the total number of
+    indexed contacts exceeds ``max_contacts``, and expire after ``ttl`` seconds so changes made
+    through other workers show up.
+    """
+
+    def __init__(self, max_contacts: int, ttl: float, clock=time.monotonic):
+        self.max_contacts = max_contacts
+        self.ttl = ttl
+        self.clock = clock
+        self._indexes: OrderedDict[int, tuple[float, ContactPrefixIndex]] = OrderedDict()
+        # Прапорці побудов, що тривають, по користувачах; True - контакти змінились під час побудови
+        self._building: dict[int, list[list[bool]]] = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _changed(self, user_id: int) -> None:
+        for changed in self._building.get(user_id, ()):
+            changed[0] = True
+
+    def _cached(self, user_id: int) -> ContactPrefixIndex | None:
+        entry = self._indexes.get(user_id)
+        if entry is not None and entry[0] <= self.clock():
+            self.drop(user_id)
+            entry = None
+        return entry[1] if entry is not None else None
+
+    async def get(self, user_id: int, load: Callable[[], Awaitable[Iterable[Suggestion]]]) -> ContactPrefixIndex:
+        """
+        Index of a user, built with ``load`` if it is not cached.
+
+        :param user_id: int: Owner of the contacts.
+        :param load: Callable[[], Awaitable[Iterable[Suggestion]]]: Reads all contacts of the user.
+        :return: ContactPrefixIndex: Index of the user.
+        """
+        index = self._cached(user_id)
+        if index is not None:
+            self._indexes.move_to_end(user_id)
+            self.hits += 1
+            return index
+        self.misses += 1
+        changed = [False]
+        self._building.setdefault(user_id, []).append(changed)
+        try:
+            index = ContactPrefixIndex(await load())
+        finally:
+            builds = [build for build in self._building[user_id] if build is not changed]
+            if builds:
+                self._building[user_id] = builds
+            else:
+                del self._building[user_id]
+        # Зміни під час читання могли не потрапити у вибірку - такий індекс не кешуємо
+        if not changed[0] and user_id not in self._indexes and len(index) <= self.max_contacts:
+            self._indexes[user_id] = (self.clock() + self.ttl, index)
+            self.size += len(index)
+            while self.size > self.max_contacts:
+                self.drop(next(iter(self._indexes)))
+                self.evictions += 1
+        return index
+
+    def drop(self, user_id: int) -> None:
+        """
+        Forget the index of a user; it is rebuilt on next use.
+
+        :param user_id: int: Owner of the contacts.
+        :return: None
+        """
+        self._changed(user_id)
+        entry = self._indexes.pop(user_id, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def add(self, user_id: int, suggestion: Suggestion) -> None:
+        """
+        Add or update a contact in the index of its owner, if the index is cached.
+
+        :param user_id: int: Owner of the contact.
+        :param suggestion: Suggestion: Contact fields.
+        :return: None
+        """
+        self._changed(user_id)
+        index = self._cached(user_id)
+        if index is not None:
+            self.size -= len(index)
+            index.add(suggestion)
+            self.size += len(index)
+
+    def remove(self, user_id: int, contact_id: int) -> None:
+        """
+        Remove a contact from the index of its owner, if the index is cached.
+
+        :param user_id: int: Owner of the contact.
+        :param contact_id: int: Contact id.
+        :return: None
+        """
+        self._changed(user_id)
+        index = self._cached(user_id)
+        if index is not None:
+            self.size -= len(index)
+            index.remove(contact_id)
+            self.size += len(index)
+
+    def stats(self) -> dict:
+        """
+        Number of cached users and contacts, hit/miss and eviction counters.
+
+        :return: dict: Index statistics.
+        """
+        return {"users": len(self._indexes), "contacts": self.size, "max_contacts": self.max_contacts,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+contact_index = AutocompleteIndex(settings.AUTOCOMPLETE_MAX_CONTACTS, settings.AUTOCOMPLETE_TTL)
@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from threading import Lock
+from typing import Awaitable, BinaryIO, Callable, Protocol
+from urllib.parse import quote
+
+import cloudinary
+import cloudinary.uploader
+from fastapi import HTTPException, UploadFile, status
+
+from src.conf.config import settings
+from src.services.thumbnails import make_thumbnails, thumbnail_store
+
+logger = logging.getLogger(__name__)
+
+
+class AvatarStorage(Protocol):
+    """
+    Where avatars end up. ``save`` is blocking and is called from the avatar worker threads.
+    """
+
+    def save(self, source: Path, name: str) -> str:
+        """
+        Store a spooled avatar, resized to the avatar size.
+
+        :param source: Path: Spooled upload.
+        :param name: str: Name of the avatar, the same for every upload of a user.
+        :return: str: Public URL of the stored avatar.
+        """
+
+
+class CloudinaryStorage:
+    """
+    Avatars on Cloudinary. The image is cropped to a square of ``size`` pixels by an incoming
+    transformation, so only the resized avatar is stored.
+    """
+
+    def __init__(self, cloud_name: str, api_key: str, api_secret: str, size: int):
+        cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret, secure=True)
+        self.size = size
+
+    def save(self, source: Path, name: str) -> str:
+        image = cloudinary.uploader.upload(str(source), public_id=name, overwrite=True,
+                                           transformation=[{"width": self.size, "height": self.size,
+                                                            "crop": "fill"}])
+        return cloudinary.CloudinaryImage(name).build_url(version=image.get('version'))
+
+
+class LocalStorage:
+    """
+    Avatars in a local directory served under ``base_url``; for development and tests.
+    Images are cropped to a square of ``size`` pixels and stored as WebP by the worker thread.
+    """
+
+    def __init__(self, directory: Path, base_url: str, size: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.base_url = base_url
+        self.size = size
+
+    def save(self, source: Path, name: str) -> str:
+        filename = quote(name, safe="")
+        target = self.directory / filename
+        target.write_bytes(make_thumbnails(source, [self.size])[self.size])
+        # Версія в URL, щоб клієнти не показували закешований старий аватар
+        return f"{self.base_url}{filename}?v={target.stat().st_mtime_ns}"
+
+
+def spool(source: BinaryIO, directory: Path, max_size: int) -> Path | None:
+    """
+    Copy an upload to a file of its own that outlives the request.
+
+    :param source: BinaryIO: Uploaded file.
+    :param directory: Path: Spool directory.
+    :param max_size: int: Largest accepted upload, bytes.
+    :return: Path | None: Spooled file, None if the upload is larger than ``max_size``.
+    """
+    with tempfile.NamedTemporaryFile(dir=directory, prefix="avatar-", delete=False) as target:
+        copied = 0
+        while chunk := source.read(64 * 1024):
+            copied += len(chunk)
+            if copied > max_size:
+                break
+            target.write(chunk)
+    if copied > max_size:
+        Path(target.name).unlink()
+        return None
+    return Path(target.name)
+
+
+class AvatarPipeline:
+    """
+    Accepts avatar uploads without waiting for the storage.
+
+    An upload is spooled to a local file, then stored by one of ``workers`` threads; when the
+    storage returns the URL, ``on_saved`` (e.g. the user update) runs on the event loop. At most
+    ``max_pending`` uploads may be spooled or in progress; beyond that callers get 503.
+    """
+
+    def __init__(self, storage: AvatarStorage, spool_dir: Path, workers: int, max_pending: int, max_size: int):
+        self.storage = storage
+        self.spool_dir = Path(spool_dir)
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_size = max_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="avatar-upload")
+        self.tasks: set[asyncio.Task] = set()
+        self._lock = Lock()
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.busy_time = 0.0
+
+    async def submit(self, file: UploadFile, name: str, on_saved: Callable[[str], Awaitable]) -> None:
+        """
+        Spool an avatar upload and schedule its storing.
+
+        :param file: UploadFile: Uploaded image.
+        :param name: str: Name of the avatar in the storage.
+        :param on_saved: Callable[[str], Awaitable]: Called with the public URL once the avatar is stored.
+        :return: None
+        :raises: HTTPException: 415 if the file is not an image, 413 if it is too large,
+            503 if too many uploads are in progress.
+        """
+        if not (file.content_type or "").startswith("image/"):
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Avatar must be an image")
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many avatar uploads, try again later",
+                                headers={"Retry-After": "5"})
+        self.pending += 1
+        try:
+            source = await asyncio.to_thread(spool, file.file, self.spool_dir, self.max_size)
+        except BaseException:
+            self.pending -= 1
+            raise
+        if source is None:
+            self.pending -= 1
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                detail=f"Avatar must not be larger than {self.max_size} bytes")
+        task = asyncio.create_task(self.process(source, name, on_saved))
+        # Посилання на задачу, щоб її не прибрав збирач сміття
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def _timed_save(self, source: Path, name: str) -> str:
+        start = time.perf_counter()
+        try:
+            return self.storage.save(source, name)
+        finally:
+            with self._lock:
+                self.busy_time += time.perf_counter() - start
+
+    async def process(self, source: Path, name: str, on_saved: Callable[[str], Awaitable]) -> None:
+        """
+        Store a spooled avatar and report its URL; the spooled file is removed either way.
+
+        :param source: Path: Spooled upload.
+        :param name: str: Name of the avatar in the storage.
+        :param on_saved: Callable[[str], Awaitable]: Called with the public URL.
+        :return: None
+        """
+        try:
+            url = await asyncio.get_running_loop().run_in_executor(self.executor, self._timed_save, source, name)
+            await on_saved(url)
+            self.completed += 1
+        except Exception:
+            self.failed += 1
+            logger.exception("Avatar %s was not stored", name)
+        finally:
+            self.pending -= 1
+            source.unlink(missing_ok=True)
+
+    async def join(self) -> None:
+        """
+        Wait for the uploads in progress.
+
+        :return: None
+        """
+        while self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def close(self, timeout: float) -> None:
+        """
+        Give the uploads in progress up to ``timeout`` seconds, then stop the workers.
+
+        :param timeout: float: Seconds to wait.
+        :return: None
+        """
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("%d avatar uploads were not finished", self.pending)
+        self.executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        """
+        Pool size, uploads in progress and throughput counters.
+
+        :return: dict: Pipeline statistics.
+        """
+        return {"workers": self.workers, "pending": self.pending, "max_pending": self.max_pending,
+                "completed": self.completed, "failed": self.failed, "rejected": self.rejected,
+                "busy_seconds": round(self.busy_time, 3)}
+
+
+def storage_from_settings() -> AvatarStorage:
+    """
+    Avatar storage selected by ``AVATAR_STORAGE``.
+
+    :return: AvatarStorage: Local thumbnails, Cloudinary or local directory storage.
+    :raises: ValueError: If the storage name is unknown.
+    """
+    if settings.AVATAR_STORAGE == "thumbnails":
+        return thumbnail_store
+    if settings.AVATAR_STORAGE == "cloudinary":
+        return CloudinaryStorage(settings.CLOUDINARY_NAME, settings.CLOUDINARY_API_KEY,
+                                 settings.CLOUDINARY_API_SECRET, settings.AVATAR_SIZE)
+    if settings.AVATAR_STORAGE == "local":
+        return LocalStorage(Path(settings.AVATAR_LOCAL_DIR), settings.AVATAR_LOCAL_URL, settings.AVATAR_SIZE)
+    raise ValueError(f"Unknown avatar storage: {settings.AVATAR_STORAGE}")
+
+
+avatar_pipeline = AvatarPipeline(storage_from_settings(),
+                                 Path(settings.AVATAR_SPOOL_DIR or Path(tempfile.gettempdir()) / "avatars"),
+                                 settings.AVATAR_WORKERS, settings.AVATAR_MAX_PENDING, settings.AVATAR_MAX_SIZE)
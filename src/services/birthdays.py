@@ -0,0 +1,263 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Iterable
+
+import redis.asyncio as redis
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.conf.config import settings
+from src.database.models import Contact
+from src.schemas.schemas import ContactResponse
+from src.services.cache import ContactsCache, contacts_cache, redis_client
+
+logger = logging.getLogger(__name__)
+
+SortKey = tuple[int, int, int]
+CONTACT_ADAPTER = TypeAdapter(ContactResponse)
+
+# Змінює дайджест, лише якщо він уже побудований і відображає версію до цієї зміни: частковий дайджест
+# не повинен виглядати повним, а пропущені зміни (імпорт, аватар власника) - загубитись
+PUT_SCRIPT = """
+local version = redis.call('HGET', KEYS[1], 'version')
+if not version then
+    return 0
+end
+if version ~= ARGV[2] then
+    redis.call('DEL', KEYS[1])
+    return 0
+end
+if ARGV[4] == '' then
+    redis.call('HDEL', KEYS[1], ARGV[3])
+else
+    redis.call('HSET', KEYS[1], ARGV[3], ARGV[4])
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[1])
+return 1
+"""
+
+def seconds_until_tomorrow(now: datetime) -> float:
+    """
+    Seconds left until the next local midnight.
+
+    >>> seconds_until_tomorrow(datetime(2026, 10, 17, 23, 59, 30))
+    30.0
+
+    :param now: datetime: Current local time.
+    :return: float: Seconds until midnight.
+    """
+    return (datetime.combine(now.date() + timedelta(days=1), datetime.min.time()) - now).total_seconds()
+
+
+class BirthdayDigest:
+    """
+    Daily per-user digests of upcoming birthdays, stored in Redis.
+
+    A digest is a hash of serialized contacts by contact id, tagged with the contacts version
+    (see ContactsCache) it reflects. Digests of all users are built once a day by a background
+    job, contact edits update them in place, and a digest whose version no longer matches,
+    e.g. after an import, is treated as missing and rebuilt by the reader.
+    """
+
+    prefix = "birthdays:"
+
+    def __init__(self, client: redis.Redis, contacts: ContactsCache, ttl: int):
+        self.redis = client
+        self.contacts = contacts
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.builds = 0
+
+    def key(self, user_id: int, day: date) -> str:
+        """
+        Redis key of the digest of a user for a day.
+
+        :param user_id: int: Owner of the contacts.
+        :param day: date: First day of the window.
+        :return: str: Redis key.
+        """
+        return f"{self.prefix}{day.isoformat()}:{user_id}"
+
+    def lock_key(self, day: date) -> str:
+        """
+        Redis key that lets only one worker build the digests of a day.
+
+        :param day: date: First day of the window.
+        :return: str: Redis key.
+        """
+        return f"{self.prefix}{day.isoformat()}:lock"
+
+    @staticmethod
+    def entry(sort_key: SortKey, contact: Contact) -> bytes:
+        """
+        Serialize a digest entry: the sort key followed by the contact as ContactResponse JSON.
+
+        :param sort_key: SortKey: Key from birthday_sort_key.
+        :param contact: Contact: Contact with its owner loaded.
+        :return: bytes: Hash value.
+        """
+        body = CONTACT_ADAPTER.dump_json(CONTACT_ADAPTER.validate_python(contact, from_attributes=True))
+        return b"%d %d %d " % sort_key + body
+
+    @staticmethod
+    def parse(value: bytes) -> tuple[SortKey, bytes]:
+        """
+        Split a digest entry into its sort key and JSON body.
+
+        >>> BirthdayDigest.parse(b'0 220 1 {"id":1}')
+        ((0, 220, 1), b'{"id":1}')
+
+        :param value: bytes: Hash value.
+        :return: tuple[SortKey, bytes]: Sort key and contact JSON.
+        """
+        *key, body = value.split(b" ", 3)
+        return tuple(map(int, key)), body
+
+    @staticmethod
+    def page(entries: list[tuple[SortKey, bytes]], skip: int, limit: int,
+             after: SortKey | None = None) -> list[tuple[SortKey, bytes]]:
+        """
+        Page of sorted digest entries, like upcoming_birthdays pages rows.
+
+        >>> entries = [((0, 220, 1), b"1"), ((0, 221, 2), b"2"), ((1, 101, 3), b"3")]
+        >>> [body for _, body in BirthdayDigest.page(entries, 0, 2, after=(0, 220, 1))]
+        [b'2', b'3']
+
+        :param entries: list[tuple[SortKey, bytes]]: Entries in sort key order.
+        :param skip: int: Number of entries to skip (ignored with after).
+        :param limit: int: Maximum number of entries.
+        :param after: SortKey | None: Sort key of the last entry of the previous page.
+        :return: list[tuple[SortKey, bytes]]: Entries of the page.
+        """
+        if after is not None:
+            entries = [entry for entry in entries if entry[0] > after]
+        else:
+            entries = entries[skip:]
+        return entries[:limit]
+
+    async def get(self, user_id: int, day: date) -> list[tuple[SortKey, bytes]] | None:
+        """
+        Digest of a user, if it is built and reflects the current contacts.
+
+        :param user_id: int: Owner of the contacts.
+        :param day: date: First day of the window.
+        :return: list[tuple[SortKey, bytes]] | None: Entries in sort key order, None if missing or stale.
+        """
+        try:
+            digest = await self.redis.hgetall(self.key(user_id, day))
+        except RedisError as err:
+            logger.warning("Birthday digest read failed: %s", err)
+            return None
+        version = await self.contacts.version(user_id) if digest else None
+        if version is None or digest.get(b"version") != str(version).encode():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return sorted(self.parse(value) for field, value in digest.items() if field != b"version")
+
+    async def versions(self, user_ids: list[int]) -> dict[int, int]:
+        """
+        Current contacts versions of many users with one MGET.
+
+        :param user_ids: list[int]: Owners of the contacts.
+        :return: dict[int, int]: Versions by user id; users whose version can not be read are left out.
+        """
+        raw = await self.redis.mget([self.contacts.version_key(user_id) for user_id in user_ids])
+        versions = {}
+        for user_id, version in zip(user_ids, raw):
+            version = int(version) if version is not None else await self.contacts.version(user_id)
+            if version is not None:
+                versions[user_id] = version
+        return versions
+
+    async def store(self, user_id: int, day: date, version: int,
+                    contacts: Iterable[tuple[SortKey, Contact]]) -> list[tuple[SortKey, bytes]]:
+        """
+        Replace the digest of a user.
+
+        The version must be read before the contacts, so edits made meanwhile leave the digest stale
+        instead of silently lost.
+
+        :param user_id: int: Owner of the contacts.
+        :param day: date: First day of the window.
+        :param version: int: Contacts version read before the contacts.
+        :param contacts: Iterable[tuple[SortKey, Contact]]: Contacts in the window with their sort keys.
+        :return: list[tuple[SortKey, bytes]]: Stored entries in sort key order.
+        """
+        values = {str(contact.id): self.entry(sort_key, contact) for sort_key, contact in contacts}
+        key = self.key(user_id, day)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.delete(key)
+                pipe.hset(key, mapping=values | {"version": version})
+                pipe.expire(key, self.ttl)
+                await pipe.execute()
+        except RedisError as err:
+            logger.warning("Birthday digest write failed: %s", err)
+        self.builds += 1
+        return sorted(map(self.parse, values.values()))
+
+    async def put(self, user_id: int, day: date, version: int, contact_id: int, value: bytes = b"") -> None:
+        """
+        Add, replace or (with an empty value) remove one contact of a built digest.
+        The digest is patched only if it reflects the version just before this edit; otherwise
+        some change never reached it, so it is dropped and rebuilt on the next read.
+
+        :param user_id: int: Owner of the contact.
+        :param day: date: First day of the window.
+        :param version: int: Contacts version after the edit.
+        :param contact_id: int: Contact id.
+        :param value: bytes: Entry from :meth:`entry`, empty to remove the contact.
+        :return: None
+        """
+        try:
+            await self.redis.eval(PUT_SCRIPT, 1, self.key(user_id, day), version, version - 1, contact_id, value)
+        except RedisError as err:
+            logger.warning("Birthday digest update failed: %s", err)
+
+    async def schedule(self, session_factory: async_sessionmaker,
+                       build: Callable[[date, AsyncSession], Awaitable[int]], retry_interval: float) -> None:
+        """
+        Build the digests of all users once a day, shortly after midnight. Runs until cancelled.
+
+        Every worker runs the loop; a Redis lock per day lets only one of them build.
+
+        :param session_factory: async_sessionmaker: Factory of the session used by the build.
+        :param build: Callable[[date, AsyncSession], Awaitable[int]]: Builds all digests of a day, returns the number of users.
+        :param retry_interval: float: Seconds to wait before retrying a failed build.
+        :return: None
+        """
+        while True:
+            day = date.today()
+            locked = False
+            try:
+                locked = bool(await self.redis.set(self.lock_key(day), 1, nx=True, ex=self.ttl))
+                if locked:
+                    async with session_factory() as db:
+                        users = await build(day, db)
+                    logger.info("Built birthday digests of %d users for %s", users, day)
+            except (RedisError, SQLAlchemyError, OSError) as err:
+                logger.warning("Building birthday digests for %s failed: %s", day, err)
+                if locked:
+                    try:
+                        await self.redis.delete(self.lock_key(day))
+                    except RedisError:
+                        pass
+                await asyncio.sleep(retry_interval)
+                continue
+            await asyncio.sleep(seconds_until_tomorrow(datetime.now()))
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters of digest reads and the number of digests built by this worker.
+
+        :return: dict: Digest statistics.
+        """
+        return {"hits": self.hits, "misses": self.misses, "builds": self.builds}
+
+
+birthday_digest = BirthdayDigest(redis_client, contacts_cache, settings.BIRTHDAY_DIGEST_TTL)
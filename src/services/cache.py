@@ -0,0 +1,517 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Hashable
+
+import redis.asyncio as redis
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.database.models import User
+
+logger = logging.getLogger(__name__)
+
+# Кеш має швидко деградувати до БД, тому без повторних спроб і з короткими таймаутами
+redis_client = redis.Redis(host=settings.REDIS_DOMAIN, port=settings.REDIS_PORT, db=0,
+                           socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                           socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                           retry=Retry(NoBackoff(), 0))
+# Підписка на pub/sub чекає повідомлень необмежено довго, тому окремий клієнт без socket_timeout
+pubsub_client = redis.Redis(host=settings.REDIS_DOMAIN, port=settings.REDIS_PORT, db=0,
+                            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header with the current ETag.
+
+    >>> etag_matches('W/"a", "b"', '"a"'), etag_matches("*", '"a"'), etag_matches(None, '"a"')
+    (True, True, False)
+
+    :param if_none_match: str | None: Header value.
+    :param etag: str: Current ETag.
+    :return: bool: Whether the client copy is current.
+    """
+    if not if_none_match:
+        return False
+    return any(tag.strip().removeprefix("W/") in (etag, "*") for tag in if_none_match.split(","))
+
+
+class LRUCache:
+    """
+    Bounded in-process LRU cache with an optional per-entry time to live.
+
+    >>> cache = LRUCache(maxsize=2)
+    >>> cache.set("a", 1); cache.set("b", 2); cache.get("a")
+    1
+    >>> cache.set("c", 3); cache.get("b") is None
+    True
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: OrderedDict[Hashable, tuple[float | None, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, count=False) is not None
+
+    def get(self, key: Hashable, count: bool = True) -> Any | None:
+        """
+        Get a value and mark it as most recently used.
+
+        :param key: Hashable: Cache key.
+        :param count: bool: Whether to update the hit/miss counters.
+        :return: Any | None: Cached value, or None if missing or expired.
+        """
+        entry = self._data.get(key)
+        if entry is not None and entry[0] is not None and entry[0] <= self.clock():
+            del self._data[key]
+            entry = None
+        if entry is None:
+            self.misses += count
+            return None
+        self._data.move_to_end(key)
+        self.hits += count
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        :param key: Hashable: Cache key.
+        :param value: Any: Value to store (not None).
+        :param ttl: float | None: Time to live of this entry, defaults to the cache ttl.
+        :return: None
+        """
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (self.clock() + ttl if ttl is not None else None, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> Any | None:
+        """
+        Remove an entry.
+
+        :param key: Hashable: Cache key.
+        :return: Any | None: Removed value, if any.
+        """
+        entry = self._data.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+
+        :return: None
+        """
+        self._data.clear()
+
+    def discard_if(self, predicate: Callable[[Any], bool]) -> int:
+        """
+        Remove every entry whose value matches ``predicate``.
+
+        :param predicate: Callable[[Any], bool]: Test applied to cached values.
+        :return: int: Number of removed entries.
+        """
+        keys = [key for key, (_, value) in self._data.items() if predicate(value)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def stats(self) -> dict:
+        """
+        Size and hit/miss counters of the cache.
+
+        :return: dict: Cache statistics.
+        """
+        lookups = self.hits + self.misses
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0}
+
+
+class TokenCache:
+    """
+    Per-worker cache of already verified JWTs: SHA-256 digest of the token -> claims.
+
+    An entry lives until the token's ``exp``, so expired tokens are verified (and rejected)
+    by python-jose again. Entries of a subject are dropped when the user is invalidated,
+    e.g. when ``update_token`` rotates or revokes the refresh token.
+    """
+
+    def __init__(self, maxsize: int):
+        self.local = LRUCache(maxsize, clock=time.time)
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        """
+        Cache key of a token, so raw tokens are not kept in memory longer than needed.
+
+        :param token: str: Encoded JWT.
+        :return: bytes: SHA-256 digest of the token.
+        """
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        """
+        Get the claims of a token verified earlier.
+
+        :param token: str: Encoded JWT.
+        :return: dict | None: Claims, or None if the token was not verified yet or expired.
+        """
+        return self.local.get(self.digest(token))
+
+    def set(self, token: str, claims: dict) -> None:
+        """
+        Remember the claims of a verified token until it expires.
+
+        :param token: str: Encoded JWT.
+        :param claims: dict: Verified claims; tokens without ``exp`` are not cached.
+        :return: None
+        """
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)) and exp > time.time():
+            self.local.set(self.digest(token), claims, ttl=exp - time.time())
+
+    def evict_subject(self, subject: str) -> int:
+        """
+        Drop every cached token of a subject.
+
+        :param subject: str: Value of the ``sub`` claim (user email).
+        :return: int: Number of dropped tokens.
+        """
+        return self.local.discard_if(lambda claims: claims.get("sub") == subject)
+
+    def stats(self) -> dict:
+        """
+        Size and hit/miss counters of the cache.
+
+        :return: dict: Cache statistics.
+        """
+        return self.local.stats()
+
+
+class UserCache:
+    """
+    Two-level cache of authenticated users keyed by email (the ``sub`` of access tokens):
+    a per-worker LRU in front of Redis.
+
+    Users are stored as a compact JSON array of the fields routes read from ``current_user``;
+    the password hash and refresh token are never cached. Invalidations are published on
+    ``channel`` so every worker evicts its local copy. Redis failures are logged and
+    treated as a cache miss, so authentication falls back to the database.
+    """
+
+    prefix = "user:"
+    channel = "user-cache:invalidate"
+
+    def __init__(self, client: redis.Redis, ttl: int, local_size: int = 1024, local_ttl: float = 30,
+                 tokens: TokenCache | None = None):
+        self.redis = client
+        self.ttl = ttl
+        self.local = LRUCache(local_size, local_ttl)
+        self.tokens = tokens
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    @staticmethod
+    def dumps(user: User) -> bytes:
+        """
+        Serialize a user for the cache.
+
+        :param user: User: User to serialize.
+        :return: bytes: JSON array ``[id, username, email, created_at, avatar, confirmed]``.
+        """
+        created_at = user.created_at.isoformat() if user.created_at else None
+        return json.dumps([user.id, user.username, user.email, created_at, user.avatar, user.confirmed],
+                          separators=(",", ":")).encode()
+
+    @staticmethod
+    def loads(raw: bytes) -> User:
+        """
+        Restore a (detached) user from its cached form.
+
+        :param raw: bytes: Value produced by :meth:`dumps`.
+        :return: User: User object that is not attached to any session.
+        """
+        id_, username, email, created_at, avatar, confirmed = json.loads(raw)
+        return User(id=id_, username=username, email=email, avatar=avatar, confirmed=confirmed,
+                    created_at=datetime.fromisoformat(created_at) if created_at else None)
+
+    async def get(self, email: str) -> User | None:
+        """
+        Get a cached user, from the local LRU first and then from Redis.
+
+        :param email: str: Email of the user.
+        :return: User | None: Cached user or None on a miss.
+        """
+        # Локально тримаємо байти, щоб кожен запит отримував власний об'єкт User
+        raw = self.local.get(email)
+        if raw is None:
+            try:
+                raw = await self.redis.get(self.prefix + email)
+            except RedisError as err:
+                logger.warning("User cache read failed: %s", err)
+                return None
+            if raw is None:
+                self.redis_misses += 1
+                return None
+            self.redis_hits += 1
+            self.local.set(email, raw)
+        return self.loads(raw)
+
+    async def set(self, user: User) -> None:
+        """
+        Cache a user locally and in Redis for ``ttl`` seconds.
+
+        :param user: User: User loaded from the database.
+        :return: None
+        """
+        raw = self.dumps(user)
+        self.local.set(user.email, raw)
+        try:
+            await self.redis.set(self.prefix + user.email, raw, ex=self.ttl)
+        except RedisError as err:
+            logger.warning("User cache write failed: %s", err)
+
+    async def invalidate(self, email: str) -> None:
+        """
+        Drop a cached user after its record changed, in Redis and in every worker.
+
+        :param email: str: Email of the user.
+        :return: None
+        """
+        self.evict(email)
+        try:
+            await self.redis.delete(self.prefix + email)
+            await self.redis.publish(self.channel, email)
+        except RedisError as err:
+            logger.warning("User cache invalidation failed: %s", err)
+
+    def evict(self, email: str) -> None:
+        """
+        Drop the local copy of a user and its verified tokens; also called for invalidations
+        received from other workers.
+
+        :param email: str: Email of the user.
+        :return: None
+        """
+        self.local.pop(email)
+        if self.tokens is not None:
+            self.tokens.evict_subject(email)
+
+    async def listen(self, client: redis.Redis, reconnect_delay: float = 5) -> None:
+        """
+        Evict local entries on invalidations published by any worker. Runs until cancelled.
+
+        While Redis is unreachable the local cache is cleared, so entries can not outlive
+        invalidations that were missed.
+
+        :param client: redis.Redis: Client without a read timeout to hold the subscription.
+        :param reconnect_delay: float: Seconds to wait before resubscribing after an error.
+        :return: None
+        """
+        while True:
+            try:
+                async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self.evict(message["data"].decode())
+            except RedisError as err:
+                logger.warning("User cache invalidation channel lost: %s", err)
+                self.local.clear()
+                if self.tokens is not None:
+                    self.tokens.local.clear()
+                await asyncio.sleep(reconnect_delay)
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters of both cache levels.
+
+        :return: dict: Cache statistics.
+        """
+        return {"local": self.local.stats(), "redis": {"hits": self.redis_hits, "misses": self.redis_misses}}
+
+
+class ContactsCache:
+    """
+    Per-user version counter of contacts and Redis cache of serialized contact read responses.
+
+    Every write to a user's contacts bumps the version, so cached bodies and ETags of older
+    versions are never served again; a lost version key restarts from the current time in
+    milliseconds rather than from a number already used. Redis failures are logged and reported
+    as ``None``, so reads fall back to the database.
+
+    A bump that fails ``bump_attempts`` times deletes the version key instead, which starts a new
+    version on the next read. If Redis is unreachable for that too, the user is remembered and the
+    key is deleted before any later version read of this worker.
+    """
+
+    prefix = "contacts:"
+
+    def __init__(self, client: redis.Redis, ttl: int, bump_attempts: int = 3):
+        self.redis = client
+        self.ttl = ttl
+        self.bump_attempts = bump_attempts
+        self.stale: set[int] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def version_key(self, user_id: int) -> str:
+        """
+        Redis key of the contacts version of a user.
+
+        :param user_id: int: Owner of the contacts.
+        :return: str: Redis key.
+        """
+        return f"{self.prefix}version:{user_id}"
+
+    def body_key(self, user_id: int, version: int, key: str) -> str:
+        """
+        Redis key of a cached response body.
+
+        :param user_id: int: Owner of the contacts.
+        :param version: int: Contacts version.
+        :param key: str: Path and normalized query of the request.
+        :return: str: Redis key.
+        """
+        return f"{self.prefix}body:{user_id}:{version}:{hashlib.sha1(key.encode()).hexdigest()}"
+
+    @staticmethod
+    def etag(user_id: int, version: int, key: str) -> str:
+        """
+        Strong ETag of a response of the given contacts version.
+
+        >>> ContactsCache.etag(1, 7, "/api/contacts/?limit=10")
+        '"722b9d2216ec9672ed5c4fba1ba78812"'
+
+        :param user_id: int: Owner of the contacts.
+        :param version: int: Contacts version.
+        :param key: str: Path and normalized query of the request.
+        :return: str: Quoted ETag.
+        """
+        return '"' + hashlib.sha1(f"{user_id}:{version}:{key}".encode()).hexdigest()[:32] + '"'
+
+    async def version(self, user_id: int) -> int | None:
+        """
+        Current contacts version of a user.
+
+        :param user_id: int: Owner of the contacts.
+        :return: int | None: Version, or None if Redis is unavailable.
+        """
+        key = self.version_key(user_id)
+        try:
+            await self.drop_stale()
+            version = await self.redis.get(key)
+            if version is None:
+                await self.redis.set(key, time.time_ns() // 1_000_000, nx=True)
+                version = await self.redis.get(key)
+        except RedisError as err:
+            logger.warning("Contacts version read failed: %s", err)
+            return None
+        return int(version)
+
+    async def bump(self, user_id: int) -> int | None:
+        """
+        Mark the contacts of a user as changed.
+
+        :param user_id: int: Owner of the contacts.
+        :return: int | None: New version, or None if Redis is unavailable.
+        """
+        key = self.version_key(user_id)
+        for attempt in range(1, self.bump_attempts + 1):
+            try:
+                version = await self.redis.incr(key)
+                if version == 1:
+                    # Ключ був втрачений - не повертаємось до вже використаних версій
+                    version = time.time_ns() // 1_000_000
+                    await self.redis.set(key, version)
+                return version
+            except RedisError as err:
+                logger.warning("Contacts version bump failed (attempt %d of %d): %s",
+                               attempt, self.bump_attempts, err)
+        # Запис уже в БД: зі старою версією читання віддавали б застарілі тіла та 304 за старим ETag
+        self.stale.add(user_id)
+        try:
+            await self.drop_stale()
+        except RedisError as err:
+            logger.warning("Contacts version reset failed, retrying on the next read: %s", err)
+        return None
+
+    async def drop_stale(self) -> None:
+        """
+        Delete the version keys of users whose bump failed, so their next read starts a new version.
+
+        :return: None
+        :raises: RedisError: If Redis is unavailable; the users stay pending.
+        """
+        if not self.stale:
+            return
+        users = list(self.stale)
+        await self.redis.delete(*(self.version_key(user_id) for user_id in users))
+        self.stale.difference_update(users)
+
+    async def get(self, user_id: int, version: int, key: str) -> bytes | None:
+        """
+        Cached response body.
+
+        :param user_id: int: Owner of the contacts.
+        :param version: int: Contacts version.
+        :param key: str: Path and normalized query of the request.
+        :return: bytes | None: Cached value, or None on a miss.
+        """
+        try:
+            raw = await self.redis.get(self.body_key(user_id, version, key))
+        except RedisError as err:
+            logger.warning("Contacts cache read failed: %s", err)
+            return None
+        if raw is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return raw
+
+    async def set(self, user_id: int, version: int, key: str, raw: bytes) -> None:
+        """
+        Cache a response body for ``ttl`` seconds.
+
+        :param user_id: int: Owner of the contacts.
+        :param version: int: Contacts version the body was built from.
+        :param key: str: Path and normalized query of the request.
+        :param raw: bytes: Value to cache.
+        :return: None
+        """
+        try:
+            await self.redis.set(self.body_key(user_id, version, key), raw, ex=self.ttl)
+        except RedisError as err:
+            logger.warning("Contacts cache write failed: %s", err)
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters of cached response bodies.
+
+        :return: dict: Cache statistics.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_SIZE)
+user_cache = UserCache(redis_client, settings.USER_CACHE_TTL, settings.USER_CACHE_LOCAL_SIZE,
+                       settings.USER_CACHE_LOCAL_TTL, token_cache)
+contacts_cache = ContactsCache(redis_client, settings.CONTACTS_CACHE_TTL)
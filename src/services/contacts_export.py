@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.repository import contacts as repository_contacts
+
+EXPORT_COLUMNS = repository_contacts.EXPORT_COLUMNS
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def json_value(value):
+    """
+    Convert dates to ISO strings for JSON.
+
+    :param value: Any: Column value.
+    :return: Any: JSON-serializable value.
+    """
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def csv_chunk(rows: Sequence[Sequence], header: bool = False) -> bytes:
+    """
+    Encode rows as CSV.
+
+    >>> csv_chunk([(1, "Wade", None)], header=False)
+    b'1,Wade,\\r\\n'
+
+    :param rows: Sequence[Sequence]: Rows in EXPORT_COLUMNS order.
+    :param header: bool: Whether to start with the header row.
+    :return: bytes: CSV lines.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def ndjson_chunk(rows: Sequence[Sequence]) -> bytes:
+    """
+    Encode rows as newline-delimited JSON objects.
+
+    >>> from datetime import date
+    >>> ndjson_chunk([(1, "Wade", "Wilson", "wade@example.com", "5551234567", date(1990, 2, 20), None)])
+    b'{"id":1,"first_name":"Wade","last_name":"Wilson","email":"wade@example.com","contact_number":"5551234567","birthday":"1990-02-20","additional_information":null}\\n'
+
+    :param rows: Sequence[Sequence]: Rows in EXPORT_COLUMNS order.
+    :return: bytes: One JSON object per line.
+    """
+    return "".join(json.dumps(dict(zip(EXPORT_COLUMNS, map(json_value, row))), ensure_ascii=False,
+                              separators=(",", ":")) + "\n" for row in rows).encode()
+
+
+async def export_contacts(session_factory: async_sessionmaker, user_id: int, file_format: str,
+                          batch_size: int) -> AsyncIterator[bytes]:
+    """
+    Stream all contacts of a user as CSV or NDJSON, one chunk per fetched batch.
+
+    The session is opened here rather than taken from get_db, because the body is sent after
+    the request dependencies are closed.
+
+    :param session_factory: async_sessionmaker: Factory of database sessions.
+    :param user_id: int: Owner of the contacts.
+    :param file_format: str: ``csv`` or ``ndjson``.
+    :param batch_size: int: Number of rows fetched from the server-side cursor at a time.
+    :return: AsyncIterator[bytes]: Encoded chunks.
+    """
+    if file_format == "csv":
+        yield csv_chunk([], header=True)
+    async with session_factory() as db:
+        async for rows in repository_contacts.stream_contacts(user_id, db, batch_size):
+            yield csv_chunk(rows) if file_format == "csv" else ndjson_chunk(rows)
@@ -0,0 +1,138 @@
+import asyncio
+import csv
+import io
+import json
+import pathlib
+from itertools import islice
+from typing import BinaryIO, Iterator
+
+from fastapi import HTTPException, status
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.models import User
+from src.repository import contacts as repository_contacts
+from src.schemas.schemas import ContactModel
+
+IMPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl",
+                  "text/csv": "csv", "application/jsonl": "jsonl", "application/x-ndjson": "jsonl"}
+
+
+def import_format(filename: str | None, content_type: str | None) -> str:
+    """
+    Detect the format of an uploaded file from its extension or content type.
+
+    >>> import_format("contacts.CSV", None), import_format("dump", "application/x-ndjson")
+    ('csv', 'jsonl')
+
+    :param filename: str | None: Name of the uploaded file.
+    :param content_type: str | None: Content type of the uploaded file.
+    :return: str: ``csv`` or ``jsonl``.
+    :raises: HTTPException: If the format is not supported.
+    """
+    file_format = IMPORT_FORMATS.get(pathlib.Path(filename or "").suffix.lower()) \
+        or IMPORT_FORMATS.get((content_type or "").split(";")[0].strip())
+    if file_format is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                            detail="Upload a .csv or .jsonl file")
+    return file_format
+
+
+def iter_records(file: BinaryIO, file_format: str) -> Iterator[tuple[int, dict | str]]:
+    """
+    Lazily read records of a CSV (with a header row) or JSONL file.
+
+    >>> list(iter_records(io.BytesIO(b'{"first_name": "Wade"}\\n\\n[1]\\n'), "jsonl"))
+    [(1, {'first_name': 'Wade'}), (3, 'Expected a JSON object')]
+
+    :param file: BinaryIO: Uploaded file.
+    :param file_format: str: ``csv`` or ``jsonl``.
+    :return: Iterator[tuple[int, dict | str]]: Row number and the record, or an error message.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        for number, row in enumerate(csv.DictReader(text), 1):
+            # Порожні клітинки - відсутні значення
+            yield number, {key: value for key, value in row.items() if key is not None and value != ""}
+        return
+    for number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as err:
+            yield number, f"Invalid JSON: {err.msg}"
+            continue
+        yield number, record if isinstance(record, dict) else "Expected a JSON object"
+
+
+def validate_record(record: dict | str) -> ContactModel | str:
+    """
+    Validate a record with ContactModel.
+
+    :param record: dict | str: Record, or an error message from reading it.
+    :return: ContactModel | str: Validated contact, or an error message.
+    """
+    if isinstance(record, str):
+        return record
+    try:
+        return ContactModel.model_validate(record)
+    except ValidationError as err:
+        return "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in err.errors())
+    except HTTPException as err:
+        # Валідатори ContactModel піднімають HTTPException замість ValueError
+        return err.detail
+
+
+def read_batch(records: Iterator[tuple[int, dict | str]], size: int) -> list[tuple[int, ContactModel | str]]:
+    """
+    Read and validate the next batch of records.
+
+    :param records: Iterator[tuple[int, dict | str]]: Records from iter_records.
+    :param size: int: Maximum number of records in the batch.
+    :return: list[tuple[int, ContactModel | str]]: Row numbers with contacts or error messages.
+    """
+    return [(number, validate_record(record)) for number, record in islice(records, size)]
+
+
+async def import_contacts(file: BinaryIO, file_format: str, user: User, db: AsyncSession,
+                          batch_size: int, max_errors: int) -> dict:
+    """
+    Import contacts from a CSV or JSONL file in batches.
+
+    Every batch is parsed and validated in a worker thread, then inserted with one multi-row
+    insert that skips duplicates and committed, so memory stays bounded by the batch size.
+
+    :param file: BinaryIO: Uploaded file.
+    :param file_format: str: ``csv`` or ``jsonl``.
+    :param user: User: Owner of the imported contacts.
+    :param db: AsyncSession: Database session object.
+    :param batch_size: int: Number of rows per insert.
+    :param max_errors: int: Maximum number of row errors listed in the report.
+    :return: dict: Import report with row totals and per-row errors.
+    """
+    records = iter_records(file, file_format)
+    report = {"total": 0, "imported": 0, "failed": 0, "errors": []}
+
+    def fail(number: int, detail: str):
+        report["failed"] += 1
+        if len(report["errors"]) < max_errors:
+            report["errors"].append({"row": number, "detail": detail})
+
+    while batch := await asyncio.to_thread(read_batch, records, batch_size):
+        report["total"] += len(batch)
+        valid = []
+        for number, contact in batch:
+            if isinstance(contact, str):
+                fail(number, contact)
+            else:
+                valid.append((number, contact))
+        if not valid:
+            continue
+        inserted = await repository_contacts.bulk_create_contacts([contact for _, contact in valid], user, db)
+        for (number, _), created in zip(valid, inserted):
+            if created:
+                report["imported"] += 1
+            else:
+                fail(number, "Contact with the mentioned email or contact number already exists.")
+    return report
@@ -1,12 +1,22 @@
+import asyncio
+import logging
+from email.header import Header
+from email.message import Message
+from email.mime.text import MIMEText
+from email.utils import formataddr
 from pathlib import Path
 
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
-from fastapi_mail.errors import ConnectionErrors
+import aiosmtplib
+from fastapi_mail import ConnectionConfig
 from pydantic import EmailStr
 
 from src.services.auth import auth_service
+from src.services.mail_templates import mail_templates
+from src.services.outbox import mail_outbox
 from src.conf.config import settings
 
+logger = logging.getLogger(__name__)
+
 conf = ConnectionConfig(
     MAIL_USERNAME=settings.MAIL_USERNAME,
     MAIL_PASSWORD=settings.MAIL_PASSWORD,
@@ -14,25 +24,127 @@ conf = ConnectionConfig(
     MAIL_PORT=settings.MAIL_PORT,
     MAIL_SERVER=settings.MAIL_SERVER,
     MAIL_FROM_NAME="Desired Name",
-    MAIL_STARTTLS=False,
-    MAIL_SSL_TLS=True,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True,
+    MAIL_STARTTLS=settings.MAIL_STARTTLS,
+    MAIL_SSL_TLS=settings.MAIL_SSL_TLS,
+    USE_CREDENTIALS=settings.MAIL_USE_CREDENTIALS,
+    VALIDATE_CERTS=settings.MAIL_VALIDATE_CERTS,
     TEMPLATE_FOLDER=Path(__file__).parent / 'templates',
 )
 
+# Тема та шаблон листа кожного виду
+EMAIL_KINDS = {
+    "confirm_email": ("Confirm your email ", "email_template.html"),
+}
+
+
+def render_email(job: dict, config: ConnectionConfig = conf) -> MIMEText:
+    """
+    Build the message of an outbox job.
+        MIMEText (the compat32 policy) stores headers as given; EmailMessage parses every
+        address header and costs more than rendering the template itself.
+
+    :param job: dict: Job with ``kind``, ``email``, ``username`` and ``host``.
+    :param config: ConnectionConfig: Mail settings with the sender.
+    :return: MIMEText: Message ready to send.
+    :raises: KeyError: If the kind is unknown or a field is missing.
+    """
+    subject, template_name = EMAIL_KINDS[job["kind"]]
+    # Токен створюємо під час відправки - секрети не зберігаються в черзі
+    token = auth_service.create_email_token({"sub": job["email"]})
+    html = mail_templates.render(template_name, host=job["host"], username=job["username"], token=token)
+    message = MIMEText(html, "html", "utf-8")
+    message["Subject"] = Header(subject, "utf-8")
+    message["From"] = formataddr((config.MAIL_FROM_NAME, config.MAIL_FROM))
+    message["To"] = job["email"]
+    return message
+
+
+class SMTPPool:
+    """
+    Up to ``size`` SMTP connections kept open between messages, so a batch costs one TLS
+    handshake and login per connection instead of one per message.
+    """
+
+    def __init__(self, config: ConnectionConfig, size: int):
+        self.config = config
+        self.size = size
+        self.idle: list[aiosmtplib.SMTP] = []
+        self.slots = asyncio.Semaphore(size)
+        self.connects = 0
+
+    async def connect(self) -> aiosmtplib.SMTP:
+        """
+        Open and authenticate a new connection.
+
+        :return: aiosmtplib.SMTP: Connected client.
+        """
+        smtp = aiosmtplib.SMTP(hostname=self.config.MAIL_SERVER, port=self.config.MAIL_PORT,
+                               use_tls=self.config.MAIL_SSL_TLS, start_tls=self.config.MAIL_STARTTLS,
+                               validate_certs=self.config.VALIDATE_CERTS, timeout=self.config.TIMEOUT)
+        await smtp.connect()
+        if self.config.USE_CREDENTIALS:
+            await smtp.login(self.config.MAIL_USERNAME, self.config.MAIL_PASSWORD.get_secret_value())
+        self.connects += 1
+        return smtp
+
+    @staticmethod
+    def discard(smtp: aiosmtplib.SMTP) -> None:
+        """
+        Drop a connection in an unknown state.
+
+        :param smtp: aiosmtplib.SMTP: Client.
+        :return: None
+        """
+        if smtp.is_connected:
+            smtp.close()
+
+    async def send(self, message: Message) -> None:
+        """
+        Send a message through an idle or a new connection.
+
+        :param message: Message: Message to send.
+        :return: None
+        """
+        async with self.slots:
+            smtp = self.idle.pop() if self.idle else None
+            try:
+                if smtp is None or not smtp.is_connected:
+                    smtp = await self.connect()
+                    await smtp.send_message(message)
+                else:
+                    try:
+                        await smtp.send_message(message)
+                    except aiosmtplib.SMTPServerDisconnected:
+                        # Сервер закрив з'єднання, що простоювало - одна спроба через нове
+                        smtp = await self.connect()
+                        await smtp.send_message(message)
+            except BaseException:
+                if smtp is not None:
+                    self.discard(smtp)
+                raise
+            self.idle.append(smtp)
+
+    async def close(self) -> None:
+        """
+        Close all idle connections.
+
+        :return: None
+        """
+        idle, self.idle = self.idle, []
+        for smtp in idle:
+            try:
+                await smtp.quit()
+            except aiosmtplib.SMTPException:
+                self.discard(smtp)
+
 
 async def send_email(email: EmailStr, username: str, host: str):
-    try:
-        token_verification = auth_service.create_email_token({"sub": email})
-        message = MessageSchema(
-            subject="Confirm your email ",
-            recipients=[email],
-            template_body={"host": host, "username": username, "token": token_verification},
-            subtype=MessageType.html
-        )
-
-        fm = FastMail(conf)
-        await fm.send_message(message, template_name="email_template.html")
-    except ConnectionErrors as err:
-        print(err)
\ No newline at end of file
+    """
+    Queue the email confirmation letter; the mail worker sends it.
+
+    :param email: EmailStr: Recipient.
+    :param username: str: Name used in the letter.
+    :param host: str: Base URL for the confirmation link.
+    :return: None
+    """
+    await mail_outbox.enqueue("confirm_email", email=str(email), username=username, host=str(host))
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from libgravatar import Gravatar
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def gravatar_url(email: str) -> str:
+    """
+    Default avatar of an email: its Gravatar image URL, built from the email hash without a request.
+
+    >>> gravatar_url(" User@Example.com ")
+    'https://www.gravatar.com/avatar/b58996c504c5638798eb6b511e6f49af'
+
+    :param email: str: Email of the user.
+    :return: str: Image URL.
+    """
+    return Gravatar(email).get_image()
+
+
+class DefaultAvatars:
+    """
+    Sets the default avatars of new users in the background, many users per UPDATE.
+
+    Signup only wakes the job; after ``delay`` seconds, so that concurrent signups end up in one
+    batch, the job resolves users without an avatar ``batch_size`` at a time. Every ``interval``
+    seconds it also looks for users left over by other workers or by failed runs.
+    """
+
+    def __init__(self, batch_size: int, delay: float, interval: float):
+        self.batch_size = batch_size
+        self.delay = delay
+        self.interval = interval
+        self.wakeup = asyncio.Event()
+        self.resolved = 0
+        self.batches = 0
+
+    def wake(self) -> None:
+        """
+        Ask the job to run soon, e.g. after a signup.
+
+        :return: None
+        """
+        self.wakeup.set()
+
+    async def run_once(self, session_factory: async_sessionmaker,
+                       resolve: Callable[[AsyncSession, int], Awaitable[int]]) -> int:
+        """
+        Resolve all users without an avatar.
+
+        :param session_factory: async_sessionmaker: Factory of the session used by ``resolve``.
+        :param resolve: Callable[[AsyncSession, int], Awaitable[int]]: Resolves up to the given number
+            of users, returns how many it resolved.
+        :return: int: Number of resolved users.
+        """
+        total = 0
+        async with session_factory() as db:
+            while True:
+                resolved = await resolve(db, self.batch_size)
+                if resolved:
+                    self.batches += 1
+                    self.resolved += resolved
+                    total += resolved
+                if resolved < self.batch_size:
+                    return total
+
+    async def schedule(self, session_factory: async_sessionmaker,
+                       resolve: Callable[[AsyncSession, int], Awaitable[int]]) -> None:
+        """
+        Run the job on every wakeup and at least every ``interval`` seconds. Runs until cancelled.
+
+        :param session_factory: async_sessionmaker: Factory of the session used by ``resolve``.
+        :param resolve: Callable[[AsyncSession, int], Awaitable[int]]: See :meth:`run_once`.
+        :return: None
+        """
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.interval)
+                await asyncio.sleep(self.delay)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            try:
+                await self.run_once(session_factory, resolve)
+            except (SQLAlchemyError, OSError) as err:
+                logger.warning("Resolving default avatars failed: %s", err)
+
+    def stats(self) -> dict:
+        """
+        Number of resolved users and of UPDATE batches run by this worker.
+
+        :return: dict: Job statistics.
+        """
+        return {"resolved": self.resolved, "batches": self.batches, "pending_wakeup": self.wakeup.is_set()}
+
+
+default_avatars = DefaultAvatars(settings.DEFAULT_AVATAR_BATCH_SIZE, settings.DEFAULT_AVATAR_DELAY,
+                                 settings.DEFAULT_AVATAR_INTERVAL)
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from src.conf.config import settings
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a dedicated thread pool, off the event loop.
+
+    bcrypt releases the GIL, so ``workers`` threads hash in parallel. At most ``max_pending``
+    calls may be running or queued; beyond that callers get 503 instead of piling up.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, max_pending: int):
+        self.context = context
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        self._lock = Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.busy_time = 0.0
+
+    def _timed(self, func, *args):
+        with self._lock:
+            self.running += 1
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.busy_time += time.perf_counter() - start
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many authentication requests, try again later",
+                                headers={"Retry-After": "1"})
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self._timed, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password with the configured bcrypt cost.
+
+        :param password: str: Plain password.
+        :return: str: bcrypt hash.
+        """
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Check a password against a stored hash.
+
+        :param plain_password: str: Plain password.
+        :param hashed_password: str: Stored bcrypt hash.
+        :return: bool: Whether the password matches.
+        """
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """
+        Pool size, queue depth and throughput counters.
+
+        :return: dict: Hasher statistics.
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self.running,
+                "queued": max(self.pending - self.running, 0),
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": round(self.busy_time / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+password_hasher = PasswordHasher(pwd_context, settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from ipaddress import IPv4Address, IPv4Network, IPv6Address, IPv6Network, ip_address, ip_network
+from pathlib import Path
+from typing import Iterable
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+
+class NetworkSet:
+    """
+    Immutable set of IPv4/IPv6 networks with longest-prefix lookups.
+
+    Networks are kept as one hash set of prefixes per prefix length, so a lookup costs one
+    shift and one set probe per distinct prefix length (at most 33 for IPv4, 129 for IPv6),
+    independent of the number of networks.
+
+    >>> networks = NetworkSet(["10.0.0.0/8", "192.168.1.1", "2001:db8::/32"])
+    >>> "10.20.30.40" in networks, "192.168.1.2" in networks, "2001:db8::1" in networks
+    (True, False, True)
+    >>> str(networks.match("::ffff:10.1.1.1"))
+    '10.0.0.0/8'
+    """
+
+    def __init__(self, networks: Iterable = ()):
+        tables: dict[int, dict[int, set[int]]] = {4: {}, 6: {}}
+        size = 0
+        for network in networks:
+            network = ip_network(network, strict=False)
+            prefixes = tables[network.version].setdefault(network.prefixlen, set())
+            prefix = int(network.network_address) >> (network.max_prefixlen - network.prefixlen)
+            if prefix not in prefixes:
+                prefixes.add(prefix)
+                size += 1
+        # Довші префікси першими - match повертає найточнішу мережу
+        self._tables = {version: [(prefixlen, (32 if version == 4 else 128) - prefixlen, prefixes)
+                                  for prefixlen, prefixes in sorted(table.items(), reverse=True)]
+                        for version, table in tables.items()}
+        self._size = size
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str], source: str = "list") -> "NetworkSet":
+        """
+        Build a set from text lines with one address or CIDR network each.
+
+        Blank lines and ``#`` comments are ignored, invalid entries are logged and skipped.
+
+        :param lines: Iterable[str]: Lines to parse.
+        :param source: str: Name of the source for log messages.
+        :return: NetworkSet: Parsed networks.
+        """
+        networks = []
+        for number, line in enumerate(lines, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            try:
+                networks.append(ip_network(line, strict=False))
+            except ValueError:
+                logger.warning("Skipping invalid network %r at %s:%d", line, source, number)
+        return cls(networks)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, address) -> bool:
+        return self.match(address) is not None
+
+    def match(self, address):
+        """
+        Find the most specific network containing an address.
+
+        :param address: str | IPv4Address | IPv6Address | None: Address to look up.
+        :return: IPv4Network | IPv6Network | None: Matching network, None if none or the address is invalid.
+        """
+        if address is None:
+            return None
+        if not isinstance(address, (IPv4Address, IPv6Address)):
+            try:
+                address = ip_address(address)
+            except ValueError:
+                return None
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        value = int(address)
+        for prefixlen, shift, prefixes in self._tables[address.version]:
+            if value >> shift in prefixes:
+                network = IPv4Network if address.version == 4 else IPv6Network
+                return network((value >> shift << shift, prefixlen))
+        return None
+
+
+class IPList:
+    """
+    Named allow/deny list that can be reloaded from a file and a Redis set while serving.
+
+    The active ``NetworkSet`` is replaced by a single reference assignment, so requests in
+    flight see either the old or the new list, never a partially loaded one.
+    """
+
+    def __init__(self, name: str, defaults: Iterable[str] = (), path: str | None = None,
+                 redis_key: str | None = None):
+        self.name = name
+        self.defaults = list(defaults)
+        self.path = path
+        self.redis_key = redis_key
+        self.networks = NetworkSet(self.defaults)
+        self.loaded_at: float | None = None
+
+    def __contains__(self, address) -> bool:
+        return address in self.networks
+
+    def __len__(self) -> int:
+        return len(self.networks)
+
+    def swap(self, networks: NetworkSet) -> None:
+        """
+        Atomically replace the active networks.
+
+        :param networks: NetworkSet: New list.
+        :return: None
+        """
+        self.networks = networks
+        self.loaded_at = time.time()
+
+    async def read_redis(self, client: redis.Redis) -> list[str]:
+        """
+        Read all members of the Redis set of this list, in batches.
+
+        :param client: redis.Redis: Redis client.
+        :return: list[str]: Set members.
+        """
+        return [member.decode() if isinstance(member, bytes) else member
+                async for member in client.sscan_iter(self.redis_key, count=10000)]
+
+    def read_file(self) -> list[str]:
+        """
+        Read the lines of the list file.
+
+        :return: list[str]: File lines.
+        """
+        return Path(self.path).read_text().splitlines()
+
+    async def reload(self, client: redis.Redis | None = None) -> bool:
+        """
+        Rebuild the list from defaults, the file and the Redis set, then swap it in.
+
+        If a source can not be read the current list stays active.
+
+        :param client: redis.Redis | None: Redis client, the Redis set is skipped if None.
+        :return: bool: Whether the list was replaced.
+        """
+        lines = list(self.defaults)
+        try:
+            if self.path:
+                lines += await asyncio.to_thread(self.read_file)
+            if client is not None and self.redis_key:
+                lines += await self.read_redis(client)
+        except (OSError, RedisError) as err:
+            logger.warning("Keeping the current %s, reload failed: %s", self.name, err)
+            return False
+        # Розбір сотень тисяч мереж не повинен блокувати цикл подій
+        self.swap(await asyncio.to_thread(NetworkSet.from_lines, lines, self.name))
+        return True
+
+    async def watch(self, client: redis.Redis | None, interval: float) -> None:
+        """
+        Reload the list every ``interval`` seconds. Runs until cancelled.
+
+        :param client: redis.Redis | None: Redis client.
+        :param interval: float: Seconds between reloads.
+        :return: None
+        """
+        while True:
+            await self.reload(client)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> dict:
+        """
+        Size and load time of the active list.
+
+        :return: dict: List statistics.
+        """
+        return {"networks": len(self.networks), "loaded_at": self.loaded_at}
@@ -0,0 +1,88 @@
+from pathlib import Path
+from typing import Iterable
+
+from jinja2 import BytecodeCache, Environment, FileSystemBytecodeCache, FileSystemLoader, nodes, select_autoescape
+from markupsafe import escape
+
+from src.conf.config import settings
+
+
+def skeleton(template: nodes.Template) -> list[str] | None:
+    """
+    Split a template that only substitutes variables into static text and variable names.
+
+    >>> env = Environment()
+    >>> skeleton(env.parse("<p>Hi {{ username }}!</p>"))
+    ['<p>Hi ', 'username', '!</p>']
+    >>> skeleton(env.parse("{% if username %}Hi{% endif %}")) is None
+    True
+
+    :param template: nodes.Template: Parsed template.
+    :return: list[str] | None: Static parts at even and names at odd positions, None if the
+        template has tags, filters or expressions.
+    """
+    parts = [""]
+    for output in template.body:
+        if not isinstance(output, nodes.Output):
+            return None
+        for node in output.nodes:
+            if isinstance(node, nodes.TemplateData):
+                parts[-1] += node.data
+            elif isinstance(node, nodes.Name) and node.ctx == "load":
+                parts += [node.name, ""]
+            else:
+                return None
+    return parts
+
+
+class MailTemplates:
+    """
+    Shared Jinja2 environment of the letter templates.
+
+    Templates are compiled once and kept for the life of the process (no reload checks), and
+    their compiled bytecode is cached on disk for the next worker start. Templates that only
+    substitute variables are also split into their static HTML and variable slots, so a letter
+    is rendered by joining the static parts with the escaped values.
+    """
+
+    def __init__(self, folder: Path, bytecode_cache: BytecodeCache | None = None):
+        self.env = Environment(loader=FileSystemLoader(folder), autoescape=select_autoescape(["html"]),
+                               auto_reload=False, cache_size=-1, bytecode_cache=bytecode_cache)
+        self.skeletons: dict[str, list[str] | None] = {}
+
+    def load(self, names: Iterable[str]) -> None:
+        """
+        Compile templates ahead of the first letter.
+
+        :param names: Iterable[str]: Template file names.
+        :return: None
+        """
+        for name in names:
+            self.env.get_template(name)
+            source = self.env.loader.get_source(self.env, name)[0]
+            # Каркас завжди екранує значення, тож годиться лише для шаблонів з автоекрануванням
+            self.skeletons[name] = skeleton(self.env.parse(source)) if self.env.autoescape(name) else None
+
+    def render(self, name: str, **values) -> str:
+        """
+        Render a template.
+
+        :param name: str: Template file name.
+        :param values: Template variables.
+        :return: str: Rendered HTML.
+        """
+        if name not in self.skeletons:
+            self.load([name])
+        parts = self.skeletons[name]
+        if parts is None:
+            return self.env.get_template(name).render(**values)
+        rendered = parts[:]
+        for position in range(1, len(parts), 2):
+            variable = parts[position]
+            # Як і Jinja2: відсутня змінна - порожній рядок
+            rendered[position] = escape(values[variable]) if variable in values else ""
+        return "".join(rendered)
+
+
+mail_templates = MailTemplates(Path(__file__).parent / 'templates',
+                               FileSystemBytecodeCache(settings.MAIL_TEMPLATE_CACHE_DIR))
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Awaitable, Callable
+
+import redis.asyncio as redis
+from aiosmtplib import SMTPAuthenticationError, SMTPRecipientsRefused, SMTPResponseException
+from redis.exceptions import RedisError, ResponseError
+
+from src.conf.config import settings
+from src.services.cache import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Переносить due-записи з KEYS[1] (sorted set) у потік KEYS[2] атомарно: запис не губиться між ZREM і XADD
+PROMOTE_SCRIPT = """
+local members = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, member in ipairs(members) do
+    local fields = {}
+    for key, value in pairs(cjson.decode(member)) do
+        table.insert(fields, key)
+        table.insert(fields, tostring(value))
+    end
+    redis.call('ZREM', KEYS[1], member)
+    redis.call('XADD', KEYS[2], '*', unpack(fields))
+end
+return #members
+"""
+
+
+def retry_delay(attempt: int, base: float, maximum: float) -> float:
+    """
+    Exponential backoff before the next delivery attempt.
+
+    >>> [retry_delay(attempt, 5, 60) for attempt in range(1, 6)]
+    [5, 10, 20, 40, 60]
+
+    :param attempt: int: Number of failed attempts so far, from 1.
+    :param base: float: Delay after the first failure, seconds.
+    :param maximum: float: Upper bound of the delay, seconds.
+    :return: float: Seconds to wait.
+    """
+    return min(maximum, base * 2 ** (attempt - 1))
+
+
+def permanent_failure(err: BaseException) -> bool:
+    """
+    Whether retrying a message can not help: a 5xx answer about the message itself or a bad job.
+
+    Authentication failures are retried, they are a configuration problem of all messages.
+
+    :param err: BaseException: Error of a delivery attempt.
+    :return: bool: True if the message should go straight to the dead letters.
+    """
+    if isinstance(err, SMTPRecipientsRefused):
+        return all(recipient.code >= 500 for recipient in err.recipients)
+    if isinstance(err, SMTPResponseException):
+        return err.code >= 500 and not isinstance(err, SMTPAuthenticationError)
+    return isinstance(err, (KeyError, ValueError))
+
+
+class MailOutbox:
+    """
+    Persistent mail queue on a Redis stream read by a consumer group.
+
+    Jobs are small dicts of strings (kind and template data). Failed jobs wait in a sorted set
+    scored by their due time and are moved back to the stream when due; jobs that failed
+    ``max_attempts`` times or can not be delivered at all go to a dead letter stream.
+
+    The job stream is never trimmed, handled jobs are deleted by ``ack``; only the dead letter
+    stream is capped at about ``maxlen`` entries.
+    """
+
+    group = "mailers"
+
+    def __init__(self, client: redis.Redis, stream: str, maxlen: int):
+        self.redis = client
+        self.stream = stream
+        self.retry_key = f"{stream}:retry"
+        self.dead_stream = f"{stream}:dead"
+        self.maxlen = maxlen
+
+    async def enqueue(self, kind: str, **fields: str) -> bool:
+        """
+        Add a job to the outbox.
+
+        :param kind: str: Kind of the email, e.g. ``confirm_email``.
+        :param fields: str: Template data of the email.
+        :return: bool: Whether the job was stored.
+        """
+        try:
+            await self.redis.xadd(self.stream, {"kind": kind, "attempt": 0, **fields})
+        except RedisError as err:
+            logger.error("Mail %s to %s was not queued: %s", kind, fields.get("email"), err)
+            return False
+        return True
+
+    async def ensure_group(self) -> None:
+        """
+        Create the stream and its consumer group if they do not exist.
+
+        :return: None
+        """
+        try:
+            await self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as err:
+            if "BUSYGROUP" not in str(err):
+                raise
+
+    @staticmethod
+    def decode(entries) -> list[tuple[str, dict]]:
+        """
+        Decode stream entries.
+
+        >>> MailOutbox.decode([(b"1-0", {b"kind": b"confirm_email", b"attempt": b"0"})])
+        [('1-0', {'kind': 'confirm_email', 'attempt': '0'})]
+
+        :param entries: Entries returned by XREADGROUP or XAUTOCLAIM.
+        :return: list[tuple[str, dict]]: Entry ids and jobs.
+        """
+        return [(entry_id.decode(), {key.decode(): value.decode() for key, value in fields.items()})
+                for entry_id, fields in entries if fields]
+
+    async def read(self, consumer: str, count: int, block: int) -> list[tuple[str, dict]]:
+        """
+        Read new jobs for a consumer.
+
+        :param consumer: str: Name of the worker.
+        :param count: int: Maximum number of jobs.
+        :param block: int: Milliseconds to wait for jobs.
+        :return: list[tuple[str, dict]]: Entry ids and jobs.
+        """
+        response = await self.redis.xreadgroup(self.group, consumer, {self.stream: ">"}, count=count, block=block)
+        return self.decode(response[0][1]) if response else []
+
+    async def claim_stale(self, consumer: str, min_idle: int, count: int) -> list[tuple[str, dict]]:
+        """
+        Take over jobs read but never acknowledged by a worker that stopped.
+
+        :param consumer: str: Name of the worker.
+        :param min_idle: int: Milliseconds since the jobs were read.
+        :param count: int: Maximum number of jobs.
+        :return: list[tuple[str, dict]]: Entry ids and jobs.
+        """
+        response = await self.redis.xautoclaim(self.stream, self.group, consumer, min_idle, "0-0", count=count)
+        return self.decode(response[1])
+
+    async def ack(self, entry_ids: list[str]) -> None:
+        """
+        Remove handled jobs from the stream.
+
+        :param entry_ids: list[str]: Entry ids.
+        :return: None
+        """
+        if entry_ids:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.xack(self.stream, self.group, *entry_ids)
+                pipe.xdel(self.stream, *entry_ids)
+                await pipe.execute()
+
+    async def retry(self, job: dict, delay: float) -> None:
+        """
+        Schedule another attempt of a job.
+
+        :param job: dict: Job with the updated attempt counter.
+        :param delay: float: Seconds until the attempt.
+        :return: None
+        """
+        await self.redis.zadd(self.retry_key, {json.dumps(job, sort_keys=True): time.time() + delay})
+
+    async def dead(self, job: dict, error: str) -> None:
+        """
+        Give up on a job and keep it for inspection.
+
+        :param job: dict: Job.
+        :param error: str: Last delivery error.
+        :return: None
+        """
+        await self.redis.xadd(self.dead_stream, {**job, "error": error}, maxlen=self.maxlen, approximate=True)
+
+    async def promote_due(self, count: int = 100) -> int:
+        """
+        Move jobs whose retry is due back to the stream.
+
+        :param count: int: Maximum number of jobs to move.
+        :return: int: Number of moved jobs.
+        """
+        return await self.redis.eval(PROMOTE_SCRIPT, 2, self.retry_key, self.stream, time.time(), count)
+
+    async def stats(self) -> dict:
+        """
+        Number of queued, waiting for retry and dead jobs.
+
+        :return: dict: Outbox statistics.
+        """
+        return {"queued": await self.redis.xlen(self.stream), "retrying": await self.redis.zcard(self.retry_key),
+                "dead": await self.redis.xlen(self.dead_stream)}
+
+
+class MailWorker:
+    """
+    Drains the outbox in batches: every batch is rendered and sent concurrently through
+    ``send``, which is expected to reuse pooled SMTP connections.
+    """
+
+    def __init__(self, outbox: MailOutbox, render: Callable, send: Callable[..., Awaitable], consumer: str,
+                 batch_size: int, max_attempts: int, base_delay: float, max_delay: float):
+        self.outbox = outbox
+        self.render = render
+        self.send = send
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sent = 0
+        self.failed = 0
+
+    async def deliver(self, job: dict) -> None:
+        """
+        Render and send one job.
+
+        :param job: dict: Job from the outbox.
+        :return: None
+        """
+        await self.send(self.render(job))
+
+    async def handle(self, entries: list[tuple[str, dict]]) -> None:
+        """
+        Deliver a batch of jobs, then acknowledge all of them; failed jobs are rescheduled or dropped
+        to the dead letters first, so no job is lost between the two.
+
+        :param entries: list[tuple[str, dict]]: Entry ids and jobs.
+        :return: None
+        """
+        results = await asyncio.gather(*(self.deliver(job) for _, job in entries), return_exceptions=True)
+        for (_, job), result in zip(entries, results):
+            if result is None:
+                self.sent += 1
+                continue
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            self.failed += 1
+            attempt = int(job.get("attempt", 0)) + 1
+            if permanent_failure(result) or attempt >= self.max_attempts:
+                logger.error("Giving up on mail %s to %s after %d attempts: %r",
+                             job.get("kind"), job.get("email"), attempt, result)
+                await self.outbox.dead(job, repr(result))
+            else:
+                logger.warning("Mail %s to %s failed, attempt %d: %r", job.get("kind"), job.get("email"),
+                               attempt, result)
+                await self.outbox.retry(job | {"attempt": str(attempt)},
+                                        retry_delay(attempt, self.base_delay, self.max_delay))
+        await self.outbox.ack([entry_id for entry_id, _ in entries])
+
+    async def run(self, block: int = 5000, claim_idle: int = 60000) -> None:
+        """
+        Process the outbox until cancelled.
+
+        :param block: int: Milliseconds to wait for new jobs, also the retry polling interval.
+        :param claim_idle: int: Milliseconds after which unacknowledged jobs of other workers are taken over.
+        :return: None
+        """
+        await self.outbox.ensure_group()
+        while True:
+            try:
+                await self.outbox.promote_due()
+                entries = (await self.outbox.claim_stale(self.consumer, claim_idle, self.batch_size)
+                           or await self.outbox.read(self.consumer, self.batch_size, block))
+                if entries:
+                    await self.handle(entries)
+            except RedisError as err:
+                logger.warning("Mail outbox unavailable: %s", err)
+                await asyncio.sleep(block / 1000)
+
+
+mail_outbox = MailOutbox(redis_client, settings.MAIL_OUTBOX_STREAM, settings.MAIL_OUTBOX_MAXLEN)
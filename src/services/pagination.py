@@ -0,0 +1,70 @@
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException, Response, status
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: int) -> str:
+    """
+    Pack the sort key of the last returned row into an opaque cursor.
+
+    >>> encode_cursor(42)
+    'WzQyXQ'
+    >>> decode_cursor(encode_cursor(0, 1231, 7), 3)
+    [0, 1231, 7]
+
+    :param values: int: Values of the sort key, in ``ORDER BY`` order.
+    :return: str: URL-safe cursor.
+    """
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, length: int) -> list[int]:
+    """
+    Unpack a cursor produced by :func:`encode_cursor`.
+
+    :param cursor: str: Cursor received from the client.
+    :param length: int: Expected number of values in the sort key.
+    :return: list[int]: Values of the sort key.
+    :raises: HTTPException: If the cursor is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        values = None
+    if not isinstance(values, list) or len(values) != length or not all(type(v) is int for v in values):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+def next_cursor(rows: list, limit: int, key) -> str | None:
+    """
+    Cursor of the next page when the page is full, i.e. more rows may follow.
+
+    :param rows: list: Rows of the current page.
+    :param limit: int: Requested page size.
+    :param key: Callable returning the sort key values of a row.
+    :return: str | None: Cursor, or None on the last page.
+    """
+    if rows and len(rows) >= limit:
+        return encode_cursor(*key(rows[-1]))
+    return None
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, key) -> None:
+    """
+    Add the ``X-Next-Cursor`` header when the page is full, i.e. more rows may follow.
+
+    :param response: Response: Response of the current request.
+    :param rows: list: Rows of the current page.
+    :param limit: int: Requested page size.
+    :param key: Callable returning the sort key values of a row.
+    :return: None
+    """
+    cursor = next_cursor(rows, limit, key)
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
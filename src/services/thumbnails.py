@@ -0,0 +1,294 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from threading import Lock
+
+from PIL import Image, ImageOps
+
+from src.conf.config import settings
+
+MEDIA_TYPE = "image/webp"
+
+
+def is_key(key: str) -> bool:
+    """
+    Whether a string looks like a content key, so it is safe to use in a path.
+
+    >>> is_key("0" * 64), is_key("../avatars"), is_key("A" * 64)
+    (True, False, False)
+
+    :param key: str: Key from a URL.
+    :return: bool: True for 64 lowercase hex digits.
+    """
+    return len(key) == 64 and all(char in "0123456789abcdef" for char in key)
+
+
+def make_thumbnails(source: Path, sizes: list[int]) -> dict[int, bytes]:
+    """
+    Square WebP thumbnails of an image, cropped around the center.
+
+    :param source: Path: Image file.
+    :param sizes: list[int]: Side lengths in pixels.
+    :return: dict[int, bytes]: Encoded thumbnails by size.
+    :raises: PIL.UnidentifiedImageError: If the file is not an image.
+    """
+    with Image.open(source) as image:
+        # Фото з телефонів зберігають поворот в EXIF
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        thumbnails = {}
+        for size in sizes:
+            output = BytesIO()
+            ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS).save(output, "WEBP", quality=85)
+            thumbnails[size] = output.getvalue()
+    return thumbnails
+
+
+class ThumbnailStore:
+    """
+    Avatar thumbnails of fixed sizes on local disk, addressed by the SHA-256 of the uploaded image.
+
+    The uploaded images are kept under ``originals`` and their thumbnails under ``thumbnails``;
+    together they take at most ``max_bytes``. Over the limit the least recently served images
+    lose their thumbnails first, which are generated again from the original on the next request;
+    only when no other thumbnails are left do the least recently served originals go, and such
+    avatars are no longer served. Serving refreshes the modification time of an image's thumbnail
+    directory, which orders the cache again after a restart.
+
+    Nothing touches the disk until the first ``open``, ``save`` or ``get``.
+
+    Implements AvatarStorage: ``save`` returns the URL of the ``default_size`` thumbnail.
+    """
+
+    def __init__(self, root: Path, base_url: str, sizes: list[int], default_size: int, max_bytes: int):
+        if default_size not in sizes:
+            raise ValueError(f"Default avatar size {default_size} is not one of {sizes}")
+        self.originals = Path(root) / "originals"
+        self.thumbnails = Path(root) / "thumbnails"
+        self.base_url = base_url
+        self.sizes = sorted(sizes)
+        self.default_size = default_size
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._opened = False
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._originals: OrderedDict[str, int] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.original_evictions = 0
+
+    def open(self) -> None:
+        """
+        Create the directories and load the stored images; later calls do nothing. Blocking.
+
+        :return: None
+        """
+        with self._lock:
+            if self._opened:
+                return
+            self.originals.mkdir(parents=True, exist_ok=True)
+            self.thumbnails.mkdir(parents=True, exist_ok=True)
+            self._load()
+            self._opened = True
+
+    def _load(self) -> None:
+        # Викликається під self._lock
+        directories = []
+        for path in self.thumbnails.iterdir():
+            if is_key(path.name):
+                directories.append(path)
+            else:
+                # Залишки побудов, перерваних зупинкою процесу
+                shutil.rmtree(path, ignore_errors=True)
+        originals = []
+        for path in self.originals.iterdir():
+            if is_key(path.name):
+                originals.append(path)
+            else:
+                path.unlink(missing_ok=True)
+
+        def last_served(original: Path) -> float:
+            thumbnails = self.thumbnails / original.name
+            return thumbnails.stat().st_mtime if thumbnails.is_dir() else original.stat().st_mtime
+
+        for original in sorted(originals, key=last_served):
+            self._adopt_original(original.name)
+        for directory in sorted(directories, key=lambda path: path.stat().st_mtime):
+            self._adopt(directory.name)
+
+    def url(self, key: str, size: int) -> str:
+        """
+        Public URL of a thumbnail.
+
+        :param key: str: Content key of the image.
+        :param size: int: Thumbnail size.
+        :return: str: URL.
+        """
+        return f"{self.base_url}{key}/{size}.webp"
+
+    def path(self, key: str, size: int) -> Path:
+        """
+        File of a thumbnail.
+
+        :param key: str: Content key of the image.
+        :param size: int: Thumbnail size.
+        :return: Path: Thumbnail file, which may be missing.
+        """
+        return self.thumbnails / key / f"{size}.webp"
+
+    @staticmethod
+    def etag(key: str, size: int) -> str:
+        """
+        ETag of a thumbnail; content-addressed thumbnails never change.
+
+        :param key: str: Content key of the image.
+        :param size: int: Thumbnail size.
+        :return: str: Strong ETag.
+        """
+        return f'"{key}-{size}"'
+
+    def _adopt(self, key: str) -> bool:
+        # Викликається під self._lock
+        if key in self._entries:
+            return True
+        directory = self.thumbnails / key
+        if not directory.is_dir():
+            return False
+        size = sum(file.stat().st_size for file in directory.iterdir())
+        self._entries[key] = size
+        self.size += size
+        self._evict(keep=key)
+        return True
+
+    def _adopt_original(self, key: str) -> None:
+        # Викликається під self._lock
+        if key in self._originals:
+            return
+        size = (self.originals / key).stat().st_size
+        self._originals[key] = size
+        self.size += size
+        self._evict(keep=key)
+
+    def _forget(self, key: str) -> None:
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is not None:
+                self.size -= size
+
+    def _build(self, key: str, source: Path | None = None) -> bool:
+        with self._lock:
+            # Мініатюри могли вже побудувати інші воркери
+            if self._adopt(key):
+                return True
+        source = source or self.originals / key
+        if not source.exists():
+            return False
+        thumbnails = make_thumbnails(source, self.sizes)
+        staging = Path(tempfile.mkdtemp(dir=self.thumbnails, prefix=".staging-"))
+        for size, data in thumbnails.items():
+            (staging / f"{size}.webp").write_bytes(data)
+        with self._lock:
+            try:
+                # Каталог з'являється цілком, тож читачі не бачать частини розмірів
+                os.replace(staging, self.thumbnails / key)
+            except OSError:
+                shutil.rmtree(staging, ignore_errors=True)
+            return self._adopt(key)
+
+    def _evict(self, keep: str | None = None) -> None:
+        # Викликається під self._lock. Спершу мініатюри, які можна відновити, і лише потім оригінали
+        for key in list(self._entries):
+            if self.size <= self.max_bytes:
+                return
+            if key != keep:
+                shutil.rmtree(self.thumbnails / key, ignore_errors=True)
+                self.size -= self._entries.pop(key)
+                self.evictions += 1
+        for key in list(self._originals):
+            if self.size <= self.max_bytes:
+                return
+            if key != keep and key not in self._entries:
+                (self.originals / key).unlink(missing_ok=True)
+                self.size -= self._originals.pop(key)
+                self.original_evictions += 1
+
+    def save(self, source: Path, name: str) -> str:
+        """
+        Keep an uploaded image and generate its thumbnails, unless the same image is already stored.
+
+        :param source: Path: Spooled upload.
+        :param name: str: Name of the avatar; unused, images are addressed by their content.
+        :return: str: URL of the default size thumbnail.
+        :raises: PIL.UnidentifiedImageError: If the upload is not an image.
+        """
+        self.open()
+        digest = hashlib.sha256()
+        with open(source, "rb") as file:
+            while chunk := file.read(64 * 1024):
+                digest.update(chunk)
+        key = digest.hexdigest()
+        # Мініатюри будуються першими: файл, що не є зображенням, не потрапить до оригіналів
+        self._build(key, source)
+        original = self.originals / key
+        if not original.exists():
+            staged = original.with_name(f".{key}.tmp")
+            shutil.copyfile(source, staged)
+            os.replace(staged, original)
+        with self._lock:
+            self._adopt_original(key)
+        return self.url(key, self.default_size)
+
+    def get(self, key: str, size: int) -> Path | None:
+        """
+        File of a thumbnail, generated from the original if it was evicted. Blocking.
+
+        :param key: str: Content key of the image.
+        :param size: int: Thumbnail size.
+        :return: Path | None: Thumbnail file, None if the size or the image is unknown.
+        """
+        if size not in self.sizes or not is_key(key):
+            return None
+        self.open()
+        with self._lock:
+            if key in self._originals:
+                self._originals.move_to_end(key)
+            cached = key in self._entries
+            if cached:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        path = self.path(key, size)
+        if cached and path.exists():
+            try:
+                os.utime(path.parent)
+            except FileNotFoundError:
+                pass
+            return path
+        if cached:
+            # Каталог видалив інший воркер
+            self._forget(key)
+        if not self._build(key):
+            return None
+        return path if path.exists() else None
+
+    def stats(self) -> dict:
+        """
+        Number of cached thumbnail sets and of originals, their total size, hit/miss and eviction counters.
+
+        :return: dict: Thumbnail cache statistics.
+        """
+        return {"images": len(self._entries), "originals": len(self._originals), "bytes": self.size,
+                "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "original_evictions": self.original_evictions}
+
+
+thumbnail_store = ThumbnailStore(Path(settings.AVATAR_THUMBNAIL_DIR), settings.AVATAR_THUMBNAIL_URL,
+                                 settings.AVATAR_THUMBNAIL_SIZES, settings.AVATAR_SIZE,
+                                 settings.AVATAR_THUMBNAIL_CACHE_BYTES)
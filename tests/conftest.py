@@ -1,20 +1,27 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from main import app
 from src.database.models import Base
-from src.database.db import get_db
+from src.database.db import get_db, get_session_factory
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+SQLALCHEMY_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# TestClient запускає кожен запит у власному event loop, тому без пулу з'єднань
+async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=NullPool)
+AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 
 @pytest.fixture(scope="module")
 def session():
@@ -34,17 +41,16 @@ def session():
 def client(session):
     # Dependency override
 
-    def override_get_db():
-        try:
-            yield session
-        finally:
-            session.close()
+    async def override_get_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: AsyncTestingSessionLocal
 
     yield TestClient(app)
 
 
 @pytest.fixture(scope="module")
 def user():
-    return {"username": "deadpool", "email": "deadpool@example.com", "password": "123456789"}
\ No newline at end of file
+    return {"username": "deadpool", "email": "deadpool@example.com", "password": "123456789"}
@@ -0,0 +1,52 @@
+import unittest
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.database.pool import InstrumentedQueuePool, instrument_pool, pool_metrics
+
+
+class TestPoolMetrics(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=InstrumentedQueuePool,
+                                          pool_size=1, max_overflow=0, pool_timeout=0.05)
+        instrument_pool(self.engine.sync_engine)
+        pool_metrics.reset()
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    def test_observe_wait_histogram(self):
+        pool_metrics.observe_wait(0.0005)
+        pool_metrics.observe_wait(0.003)
+        pool_metrics.observe_wait(60)
+        stats = pool_metrics.snapshot()
+        self.assertEqual(stats["wait"]["count"], 3)
+        self.assertEqual(stats["wait"]["histogram"]["le_1ms"], 1)
+        self.assertEqual(stats["wait"]["histogram"]["le_5ms"], 1)
+        self.assertEqual(stats["wait"]["histogram"]["inf"], 1)
+        self.assertEqual(stats["wait"]["max_ms"], 60000)
+
+    async def test_checkout_and_timeout(self):
+        async with self.engine.connect() as conn:
+            await conn.execute(text("select 1"))
+            stats = pool_metrics.snapshot(self.engine.pool)
+            self.assertEqual(stats["checked_out"], 1)
+            self.assertEqual(stats["max_connections"], 1)
+
+            with self.assertRaises(exc.TimeoutError):
+                async with self.engine.connect() as other:
+                    await other.execute(text("select 1"))
+
+        stats = pool_metrics.snapshot(self.engine.pool)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertEqual(stats["connects"], 1)
+        self.assertEqual(stats["checkouts"], 1)
+        self.assertEqual(stats["checkins"], 1)
+        self.assertEqual(stats["checked_out"], 0)
+        self.assertEqual(stats["wait"]["count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
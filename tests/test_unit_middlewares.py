@@ -0,0 +1,143 @@
+import asyncio
+import re
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI, status
+from fastapi.responses import PlainTextResponse
+
+from middlewares import (USER_AGENT_BAN, BlackListMiddleware, CustomHeaderMiddleware, UserAgentBanMiddleware,
+                         UserAgentMatcher, WhiteListMiddleware)
+from src.services.ip_lists import IPList
+
+ALLOWED_CLIENT = ("172.16.0.0", 50000)
+BROWSER_UA = b"Mozilla/5.0 (X11; Linux x86_64) Chrome/124.0"
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    def read_root():
+        return PlainTextResponse("Hello World")
+
+    return app
+
+
+def stack(app, *layers):
+    for layer in reversed(layers):
+        app = layer(app)
+    return app
+
+
+async def call(app, client=ALLOWED_CLIENT, user_agent=BROWSER_UA) -> tuple[int, dict, bytes]:
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": "/", "raw_path": b"/", "root_path": "", "query_string": b"",
+             "headers": [(b"host", b"testserver")] + ([(b"user-agent", user_agent)] if user_agent else []),
+             "client": client, "server": ("testserver", 80)}
+    messages = []
+    incoming = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if incoming:
+            return incoming.pop()
+        # Як і сервер, тримаємо receive до розриву з'єднання
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    headers = {key.decode(): value.decode() for key, value in start["headers"]}
+    return start["status"], headers, b"".join(message.get("body", b"") for message in messages[1:])
+
+
+class TestMiddlewares(unittest.IsolatedAsyncioTestCase):
+
+    async def test_custom_headers(self):
+        status_code, headers, body = await call(CustomHeaderMiddleware(make_app()))
+        self.assertEqual((status_code, body), (200, b"Hello World"))
+        self.assertEqual(headers["custom"], "Example")
+        self.assertGreaterEqual(float(headers["x-process-time"]), 0)
+
+    async def test_blacklist(self):
+        app = BlackListMiddleware(make_app())
+        self.assertEqual((await call(app, client=("192.168.1.1", 1)))[0], status.HTTP_403_FORBIDDEN)
+        self.assertEqual((await call(app))[0], status.HTTP_200_OK)
+
+    async def test_blacklist_networks(self):
+        app = BlackListMiddleware(make_app(), networks=IPList("blacklist", ["10.0.0.0/8", "2001:db8::/32"]))
+        self.assertEqual((await call(app, client=("10.20.30.40", 1)))[0], status.HTTP_403_FORBIDDEN)
+        self.assertEqual((await call(app, client=("2001:db8::1", 1)))[0], status.HTTP_403_FORBIDDEN)
+        self.assertEqual((await call(app))[0], status.HTTP_200_OK)
+
+    async def test_whitelist(self):
+        app = WhiteListMiddleware(make_app())
+        self.assertEqual((await call(app, client=("10.0.0.1", 1)))[0], status.HTTP_403_FORBIDDEN)
+        self.assertEqual((await call(app, client=None))[0], status.HTTP_403_FORBIDDEN)
+        self.assertEqual((await call(app))[0], status.HTTP_200_OK)
+
+    async def test_user_agent_ban(self):
+        app = UserAgentBanMiddleware(make_app())
+        banned = await call(app, user_agent=b"Mozilla/5.0 Gecko/20100101 Firefox/125.0")
+        self.assertEqual(banned[0], status.HTTP_403_FORBIDDEN)
+        self.assertEqual((await call(app))[0], status.HTTP_200_OK)
+
+    async def test_user_agent_missing(self):
+        app = UserAgentBanMiddleware(make_app())
+        self.assertEqual((await call(app, user_agent=None))[0], status.HTTP_200_OK)
+
+    async def test_full_stack(self):
+        app = stack(make_app(), CustomHeaderMiddleware, BlackListMiddleware,
+                    WhiteListMiddleware, UserAgentBanMiddleware)
+        status_code, headers, body = await call(app)
+        self.assertEqual((status_code, headers["custom"], body), (200, "Example", b"Hello World"))
+        banned = await call(app, user_agent=b"Python-urllib/3.11")
+        self.assertEqual((banned[0], "custom" in banned[1]), (status.HTTP_403_FORBIDDEN, True))
+
+
+class TestUserAgentMatcher(unittest.TestCase):
+
+    def test_literals_and_expressions(self):
+        matcher = UserAgentMatcher(["bot", "botnet", "curl", r"^Wget/\d+"], cache_size=8)
+        self.assertTrue(matcher("Googlebot/2.1"))
+        self.assertTrue(matcher("curl/8.4.0"))
+        self.assertTrue(matcher("Wget/1.21"))
+        self.assertFalse(matcher("GNU Wget/1.21"))
+        self.assertFalse(matcher(BROWSER_UA.decode()))
+        self.assertFalse(UserAgentMatcher([], cache_size=8)("curl/8.4.0"))
+
+    def test_groups_and_inline_flags(self):
+        matcher = UserAgentMatcher(["curl", "(?i)python-urllib", r"(a)\1", r"(b)\1", r"(?i:wget)"], cache_size=8)
+        self.assertTrue(matcher("Python-urllib/3.11"))
+        self.assertTrue(matcher("aa"))
+        self.assertTrue(matcher("bb"))
+        self.assertTrue(matcher("WGET/1.21"))
+        self.assertFalse(matcher("ab"))
+        self.assertEqual(len(matcher.separate), 3)
+
+    def test_invalid_pattern_fails_at_startup(self):
+        with self.assertRaises(re.error):
+            UserAgentMatcher(["(unclosed"], cache_size=8)
+
+    def test_verdicts_are_memoized(self):
+        matcher = UserAgentMatcher(USER_AGENT_BAN, cache_size=8)
+        for _ in range(3):
+            matcher("Python-urllib/3.11")
+        self.assertEqual((matcher.cache.stats()["hits"], matcher.cache.stats()["misses"]), (2, 1))
+
+    def test_thousands_of_patterns(self):
+        patterns = [f"scanner-{number:05d}" for number in range(5000)]
+        # Усі шаблони - один вираз, скомпільований при створенні; перевірка його не перекомпільовує
+        with patch("middlewares.re.compile", wraps=re.compile) as compile_:
+            matcher = UserAgentMatcher(patterns, cache_size=8)
+            self.assertTrue(matcher("Mozilla/5.0 scanner-04999"))
+            self.assertFalse(matcher(BROWSER_UA.decode()))
+            self.assertFalse(matcher("curl/8.4.0"))
+        compile_.assert_called_once()
+        self.assertIsInstance(matcher.pattern, re.Pattern)
+
+
+if __name__ == '__main__':
+    unittest.main()
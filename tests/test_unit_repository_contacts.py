@@ -1,9 +1,11 @@
 import unittest
 from datetime import date, timedelta
 
-from unittest.mock import MagicMock
-from sqlalchemy.orm import Session
-from src.database.models import Contact, User
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from src.database.models import Base, Contact, User
 
 from src.schemas.schemas import ContactModel
 
@@ -16,14 +18,27 @@ from src.repository.contacts import (
     find_contact_by_first_name,
     find_contact_by_last_name,
     find_contact_by_email,
+    find_contact_by_contact_number,
+    search_contacts,
     upcoming_birthdays,
+    birthday_sort_key,
+    build_birthday_digests,
+    rebuild_birthday_digest,
 )
 
 class TestContacts(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = MagicMock(spec=AsyncSession)
         self.user = User(id=1)
+        patcher = patch('src.repository.contacts.contacts_cache')
+        self.contacts_cache = patcher.start()
+        self.contacts_cache.bump = AsyncMock(return_value=2)
+        self.addCleanup(patcher.stop)
+        patcher = patch('src.repository.contacts.birthday_digest')
+        self.birthday_digest = patcher.start()
+        self.birthday_digest.put = AsyncMock()
+        self.addCleanup(patcher.stop)
 
     async def test_get_contacts(self):
         limit = 10
@@ -48,8 +63,10 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
                 user=self.user
             )
         ]
-        self.session.query().filter().offset().limit().all.return_value = contacts
-        result = await get_contacts(limit, offset, self.user, self.session)
+        mocked_contacts = MagicMock()
+        mocked_contacts.scalars.return_value.all.return_value = contacts
+        self.session.execute.return_value = mocked_contacts
+        result = await get_contacts(offset, limit, self.user, self.session)
         self.assertEqual(result, contacts)
 
     async def test_get_contact(self):
@@ -62,7 +79,9 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
             birthday=date(2000, 4, 15),
             user=self.user
         )
-        self.session.query().filter().first.return_value = contact
+        mocked_contact = MagicMock()
+        mocked_contact.scalar_one_or_none.return_value = contact
+        self.session.execute.return_value = mocked_contact
         result = await get_contact(1, self.user, self.session)
         self.assertEqual(result, contact)
     
@@ -76,6 +95,8 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
             birthday=date(2000, 4, 15),
             user=self.user)
         result = await create_contact(body, self.user, self.session)
+        self.session.commit.assert_awaited_once()
+        self.contacts_cache.bump.assert_awaited_once_with(self.user.id)
         self.assertIsInstance(result, Contact)
         self.assertEqual(result.first_name, body.first_name)
         self.assertEqual(result.last_name, body.last_name)
@@ -102,8 +123,12 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
             birthday=date(2000, 4, 15),
             user=self.user
         )
-        self.session.query().filter().first.return_value = mocked_contact
+        mocked_result = MagicMock()
+        mocked_result.scalar_one_or_none.return_value = mocked_contact
+        self.session.execute.return_value = mocked_result
         result = await update_contact(1, body, self.user, self.session)
+        self.session.commit.assert_awaited_once()
+        self.contacts_cache.bump.assert_awaited_once_with(self.user.id)
         self.assertIsInstance(result, Contact)
 
     async def test_remove_contact(self):
@@ -117,10 +142,14 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
             user=self.user
         )
 
-        self.session.query().filter().first.return_value = contact
-
+        mocked_contact = MagicMock()
+        mocked_contact.scalar_one_or_none.return_value = contact
+        self.session.execute.return_value = mocked_contact
 
         result = await remove_contact(1, self.user, self.session)
+        self.session.delete.assert_awaited_once_with(contact)
+        self.contacts_cache.bump.assert_awaited_once_with(self.user.id)
+        self.birthday_digest.put.assert_awaited_once_with(contact.user_id, date.today(), 2, 1, b"")
         self.assertIsInstance(result, Contact)
 
     async def test_find_contact_by_first_name(self):
@@ -135,7 +164,6 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         mocked_contacts = MagicMock()
         mocked_contacts.scalars.return_value.all.return_value = contacts
         self.session.execute.return_value = mocked_contacts
-        self.session.query().filter().all.return_value = contacts
 
         result = await find_contact_by_first_name('test_first_name', self.user, self.session)
         self.assertEqual(result, contacts)
@@ -152,7 +180,6 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
         mocked_contacts = MagicMock()
         mocked_contacts.scalars.return_value.all.return_value = contacts
         self.session.execute.return_value = mocked_contacts
-        self.session.query().filter().all.return_value = contacts
 
         result = await find_contact_by_last_name('test_last_name', self.user, self.session)
         self.assertEqual(result, contacts)
@@ -168,53 +195,187 @@ class TestContacts(unittest.IsolatedAsyncioTestCase):
             birthday=date(2000, 4, 15),
             user=self.user
         )
-        # Mocking the db.query(...).filter(...).first() call to return the contact object directly
-        self.session.query().filter().first.return_value = contact
+        # Mocking the db.execute(...).scalars().all() call to return the contact list directly
+        mocked_contact = MagicMock()
+        mocked_contact.scalars.return_value.all.return_value = [contact]
+        self.session.execute.return_value = mocked_contact
 
         # Calling the function under test
         result = await find_contact_by_email('test@test.com', self.user, self.session)
 
         # Asserting the result
-        self.assertEqual(result, contact)
+        self.assertEqual(result, [contact])
 
     async def test_upcoming_birthdays(self):
         current_date = date.today()
         to_date = current_date + timedelta(days=7)
-        skip = 0
-        limit = 10
-        expected_result = []
-
-        print(f"CURRENT DATE: {current_date}")
-        print(f"TO DATE: {to_date}")
-
         contacts = [Contact(
             id=1,
             first_name='test_first_name_1',
             last_name='test_last_name_1',
             email="test@test.com",
             contact_number="111-111-1111",
-                            birthday=date(2000, 4, 16),
-                            user_id=self.user),
-                    Contact(id=2,
-            first_name='test_first_name_2',
-            last_name='test_last_name_2',
-            email="test@test.com",
-            contact_number="222-222-2222",
-            birthday=date(2000, 4, 14),
-            user_id=self.user)]
+            birthday=date(2000, 4, 16),
+            user_id=self.user.id)]
 
-        for contact in contacts:
+        mocked_contacts = MagicMock()
+        mocked_contacts.scalars.return_value.all.return_value = contacts
+        self.session.execute.return_value = mocked_contacts
+        result = await upcoming_birthdays(current_date, to_date, 0, 10, self.user, self.session)
 
-            contact_birthday_month_day = (contact.birthday.month, contact.birthday.day)
-            current_date_month_day = (current_date.month, current_date.day)
-            to_date_month_day = (to_date.month, to_date.day)
+        self.assertEqual(result, contacts)
 
-            if current_date_month_day < contact_birthday_month_day <= to_date_month_day:
-                expected_result.append(contact)
 
-        mocked_contacts = MagicMock()
-        mocked_contacts.scalars.return_value = contacts
-        self.session.execute.return_value = mocked_contacts
-        result = await upcoming_birthdays(current_date, to_date, skip, limit, self.user, self.session)
+class TestUpcomingBirthdaysQuery(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        patcher = patch('src.repository.contacts.contacts_cache')
+        self.contacts_cache = patcher.start()
+        self.contacts_cache.bump = AsyncMock(return_value=None)
+        self.addCleanup(patcher.stop)
+        patcher = patch('src.repository.contacts.birthday_digest')
+        self.birthday_digest = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session = AsyncSession(self.engine, expire_on_commit=False)
+        self.user = User(id=1, username="username", email="user@example.com", password="password")
+        birthdays = [date(1990, 12, 30), date(1985, 1, 2), date(2000, 12, 27), date(1999, 1, 10), date(1970, 6, 1)]
+        self.session.add(self.user)
+        self.session.add_all([Contact(first_name=f"name_{i}", last_name="last", email=f"{i}@test.com",
+                                      contact_number=f"{i:010}", contact_number_digits=f"{i:010}",
+                                      birthday=birthday, user_id=self.user.id)
+                              for i, birthday in enumerate(birthdays)])
+        await self.session.commit()
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def test_window_crosses_new_year(self):
+        result = await upcoming_birthdays(date(2023, 12, 27), date(2024, 1, 3), 0, 10, self.user, self.session)
+        self.assertEqual([contact.birthday for contact in result], [date(1990, 12, 30), date(1985, 1, 2)])
+
+    async def test_pagination_after_filtering(self):
+        result = await upcoming_birthdays(date(2023, 12, 27), date(2024, 1, 3), 1, 10, self.user, self.session)
+        self.assertEqual([contact.birthday for contact in result], [date(1985, 1, 2)])
+
+    async def test_window_inside_year(self):
+        result = await upcoming_birthdays(date(2024, 5, 28), date(2024, 6, 4), 0, 10, self.user, self.session)
+        self.assertEqual([contact.birthday for contact in result], [date(1970, 6, 1)])
+
+    async def test_keyset_continues_after_sort_key(self):
+        current_date = date(2023, 12, 27)
+        first_page = await upcoming_birthdays(current_date, date(2024, 1, 3), 0, 1, self.user, self.session)
+        after = birthday_sort_key(first_page[-1], current_date)
+        result = await upcoming_birthdays(current_date, date(2024, 1, 3), 0, 10, self.user, self.session, after)
+        self.assertEqual([contact.birthday for contact in result], [date(1985, 1, 2)])
+
+    async def test_build_birthday_digests(self):
+        self.birthday_digest.versions = AsyncMock(return_value={self.user.id: 5})
+        self.birthday_digest.store = AsyncMock()
+        built = await build_birthday_digests(date(2023, 12, 27), self.session, batch_size=10)
+        self.assertEqual(built, 1)
+        user_id, day, version, contacts = self.birthday_digest.store.await_args.args
+        self.assertEqual((user_id, day, version), (self.user.id, date(2023, 12, 27), 5))
+        self.assertEqual([contact.birthday for _, contact in sorted(contacts, key=lambda entry: entry[0])],
+                         [date(1990, 12, 30), date(1985, 1, 2)])
+
+    async def test_rebuild_birthday_digest_without_redis(self):
+        self.contacts_cache.version = AsyncMock(return_value=None)
+        self.birthday_digest.store = AsyncMock()
+        self.assertIsNone(await rebuild_birthday_digest(self.user, date(2023, 12, 27), date(2024, 1, 3),
+                                                        self.session))
+        self.birthday_digest.store.assert_not_awaited()
+
+
+class TestContactUniqueness(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        patcher = patch('src.repository.contacts.contacts_cache')
+        self.contacts_cache = patcher.start()
+        self.contacts_cache.bump = AsyncMock(return_value=None)
+        self.addCleanup(patcher.stop)
+        patcher = patch('src.repository.contacts.birthday_digest')
+        self.birthday_digest = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.engine = create_async_engine("sqlite+aiosqlite://")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session = AsyncSession(self.engine, expire_on_commit=False)
+        self.user = User(id=1, username="username", email="user@example.com", password="password")
+        self.other_user = User(id=2, username="other", email="other@example.com", password="password")
+        self.session.add_all([self.user, self.other_user])
+        await self.session.commit()
+        # Як і в маршрутах, користувач не прив'язаний до сесії, тож rollback його не скидає
+        self.session.expunge_all()
+        self.body = ContactModel(first_name="Wade", last_name="Wilson", email="wade@example.com",
+                                 contact_number="555-123-4567", birthday=date(1990, 2, 20))
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.engine.dispose()
+
+    async def test_create_duplicate_email_and_number(self):
+        contact = await create_contact(self.body, self.user, self.session)
+        self.assertEqual(contact.user.id, self.user.id)
+        with self.assertRaises(HTTPException) as err:
+            await create_contact(self.body.model_copy(update={"contact_number": "5550000000"}), self.user,
+                                 self.session)
+        self.assertEqual((err.exception.status_code, err.exception.detail),
+                         (409, "Contact with the mentioned email already exists."))
+        with self.assertRaises(HTTPException) as err:
+            await create_contact(self.body.model_copy(update={"email": "deadpool@example.com"}), self.user,
+                                 self.session)
+        self.assertEqual(err.exception.detail, "Contact with the mentioned contact number already exists.")
+
+    async def test_duplicate_number_in_other_format(self):
+        await create_contact(self.body, self.user, self.session)
+        with self.assertRaises(HTTPException) as err:
+            await create_contact(self.body.model_copy(update={"email": "deadpool@example.com",
+                                                              "contact_number": "(555) 123 45 67"}),
+                                 self.user, self.session)
+        self.assertEqual(err.exception.status_code, 409)
+
+    async def test_find_by_contact_number_in_any_format(self):
+        contact = await create_contact(self.body, self.user, self.session)
+        self.assertEqual(contact.contact_number_digits, "5551234567")
+        result = await find_contact_by_contact_number("(555) 123-4567", self.user, self.session)
+        self.assertEqual([found.id for found in result], [contact.id])
+        self.assertEqual(await find_contact_by_contact_number("555-123-4567", self.other_user, self.session), [])
+
+    async def test_search_contacts(self):
+        wade = await create_contact(self.body.model_copy(update={"additional_information": "Merc with 100% mouth"}),
+                                    self.user, self.session)
+        await create_contact(self.body, self.other_user, self.session)
+        for query in ("WILSON", "wade@ex", "5551234", "100% m"):
+            self.assertEqual([(contact.id, rank) for contact, rank in
+                              await search_contacts(query, self.user, self.session, 10)], [(wade.id, 0)], query)
+        self.assertEqual(await search_contacts("0_m", self.user, self.session, 10), [])
+
+    async def test_same_contact_for_different_users(self):
+        await create_contact(self.body, self.user, self.session)
+        contact = await create_contact(self.body, self.other_user, self.session)
+        self.assertEqual(contact.user_id, self.other_user.id)
+
+    async def test_update_keeps_own_email(self):
+        contact = await create_contact(self.body, self.user, self.session)
+        result = await update_contact(contact.id, self.body.model_copy(update={"last_name": "Winston"}), self.user,
+                                      self.session)
+        self.assertEqual((result.last_name, result.email, result.user.id), ("Winston", self.body.email, self.user.id))
+
+    async def test_update_to_taken_email(self):
+        await create_contact(self.body, self.user, self.session)
+        other = await create_contact(self.body.model_copy(update={"email": "vanessa@example.com",
+                                                                  "contact_number": "5550000000"}),
+                                     self.user, self.session)
+        with self.assertRaises(HTTPException) as err:
+            await update_contact(other.id, self.body.model_copy(update={"contact_number": "5550000000"}), self.user,
+                                 self.session)
+        self.assertEqual(err.exception.status_code, 409)
+
+    async def test_update_other_users_contact(self):
+        contact = await create_contact(self.body, self.user, self.session)
+        self.assertIsNone(await update_contact(contact.id, self.body, self.other_user, self.session))
 
-        self.assertCountEqual(result, expected_result)
@@ -1,7 +1,7 @@
 import unittest
-from unittest.mock import MagicMock, Mock, patch
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.models import User
 from src.schemas.users import UserModel
@@ -10,15 +10,27 @@ from src.repository.users import (
     create_user,
     update_token,
     update_avatar,
-    confirmed_email
+    confirmed_email,
+    resolve_default_avatars
 )
 
 
 class TestAsyncUsers(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
-        self.session = MagicMock(spec=Session)
-        self.user = User(id=1)
+        self.session = MagicMock(spec=AsyncSession)
+        self.user = User(id=1, email='user@example.com')
+        patcher = patch('src.repository.users.user_cache')
+        self.user_cache = patcher.start()
+        self.user_cache.invalidate = AsyncMock()
+        self.addCleanup(patcher.stop)
+        patcher = patch('src.repository.users.contacts_cache')
+        self.contacts_cache = patcher.start()
+        self.contacts_cache.bump = AsyncMock()
+        self.addCleanup(patcher.stop)
+        patcher = patch('src.repository.users.default_avatars')
+        self.default_avatars = patcher.start()
+        self.addCleanup(patcher.stop)
 
     async def test_get_user_by_email(self):
         user = UserModel(id=1,
@@ -29,7 +41,6 @@ class TestAsyncUsers(unittest.IsolatedAsyncioTestCase):
         mocked_user = MagicMock()
         mocked_user.scalar_one_or_none.return_value = user
         self.session.execute.return_value = mocked_user
-        self.session.query().filter().first.return_value = user
 
         result = await get_user_by_email(user.email, self.session)
         self.assertEqual(result, user)
@@ -40,6 +51,10 @@ class TestAsyncUsers(unittest.IsolatedAsyncioTestCase):
                          password="password")
 
         result = await create_user(body, self.session)
+        self.session.commit.assert_awaited_once()
+        self.session.refresh.assert_not_awaited()
+        self.default_avatars.wake.assert_called_once()
+        self.assertIsNone(result.avatar)
         self.assertIsInstance(result, User)
         self.assertEqual(result.username, body.username)
         self.assertEqual(result.email, body.email)
@@ -49,7 +64,8 @@ class TestAsyncUsers(unittest.IsolatedAsyncioTestCase):
         refresh_token = None
         with patch.object(self.session, 'commit') as mock_db_commit:
             result = await update_token(self.user, refresh_token, self.session)
-            mock_db_commit.assert_called_once()
+            mock_db_commit.assert_awaited_once()
+            self.user_cache.invalidate.assert_awaited_once_with(self.user.email)
             self.assertEqual(result, refresh_token)
 
     async def test_confirmed_email(self):
@@ -61,13 +77,13 @@ class TestAsyncUsers(unittest.IsolatedAsyncioTestCase):
         with patch('src.repository.users.get_user_by_email') as mock_get_user_by_email:
             mock_get_user_by_email.return_value = user
 
-            mock_session_commit = MagicMock()
+            mock_session_commit = AsyncMock()
             self.session.commit = mock_session_commit
 
             result = await confirmed_email(user.email, self.session)
 
             mock_get_user_by_email.assert_called_once_with(user.email, self.session)
-            mock_session_commit.assert_called_once()
+            mock_session_commit.assert_awaited_once()
             self.assertIsNone(result)
 
     async def test_update_avatar(self):
@@ -79,14 +95,41 @@ class TestAsyncUsers(unittest.IsolatedAsyncioTestCase):
         with patch('src.repository.users.get_user_by_email') as mock_get_user_by_email:
             mock_get_user_by_email.return_value = user
 
-            mock_session_commit = MagicMock()
+            mock_session_commit = AsyncMock()
             self.session.commit = mock_session_commit
 
             result = await update_avatar(user.email, "another_avatar", self.session)
 
             mock_get_user_by_email.assert_called_once_with(user.email, self.session)
-            mock_session_commit.assert_called_once()
+            mock_session_commit.assert_awaited_once()
+            self.user_cache.invalidate.assert_awaited_once_with(user.email)
+            self.contacts_cache.bump.assert_awaited_once_with(user.id)
             self.assertEqual(result.avatar, "another_avatar")
 
+    async def test_resolve_default_avatars(self):
+        selected = MagicMock()
+        selected.all.return_value = [(1, "user@example.com"), (2, "other@example.com")]
+        self.session.execute.side_effect = [selected, MagicMock()]
+
+        result = await resolve_default_avatars(self.session, 100)
+
+        self.assertEqual(result, 2)
+        self.assertEqual(self.session.execute.await_count, 2)
+        params = self.session.execute.await_args.args[1]
+        self.assertEqual([param["id"] for param in params], [1, 2])
+        self.assertTrue(params[0]["avatar"].startswith("https://www.gravatar.com/avatar/"))
+        self.session.commit.assert_awaited_once()
+        self.assertEqual(self.user_cache.invalidate.await_count, 2)
+        self.contacts_cache.bump.assert_any_await(2)
+
+    async def test_resolve_default_avatars_nothing_to_do(self):
+        selected = MagicMock()
+        selected.all.return_value = []
+        self.session.execute.return_value = selected
+
+        self.assertEqual(await resolve_default_avatars(self.session, 100), 0)
+        self.session.execute.assert_awaited_once()
+        self.session.commit.assert_not_awaited()
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
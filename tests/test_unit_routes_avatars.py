@@ -0,0 +1,30 @@
+from PIL import Image
+import pytest
+
+from src.services.thumbnails import ThumbnailStore
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch):
+    store = ThumbnailStore(tmp_path / "avatars", "/api/avatars/", [64, 250], 250, max_bytes=10 ** 6)
+    monkeypatch.setattr("src.routes.avatars.thumbnail_store", store)
+    return store
+
+
+def test_get_avatar(client, store, tmp_path):
+    source = tmp_path / "avatar.png"
+    Image.new("RGB", (300, 300), "red").save(source, "PNG")
+    url = store.save(source, "avatar")
+
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "image/webp"
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    etag = response.headers["etag"]
+
+    not_modified = client.get(url, headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+
+    assert client.get(url.replace("250.webp", "100.webp")).status_code == 404
+    assert client.get(f"/api/avatars/{'0' * 64}/250.webp").status_code == 404
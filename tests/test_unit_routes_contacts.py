@@ -0,0 +1,274 @@
+import csv
+import io
+import json
+import unittest
+
+import pytest
+
+from main import app
+from src.database.models import User
+from src.services.auth import auth_service
+from src.services.cache import ContactsCache
+
+
+@pytest.fixture(scope="module")
+def current_user(client, session, user):
+    current_user = User(username=user.get("username"), email=user.get("email"), password="hashed",
+                        avatar="avatar_url", confirmed=True)
+    session.add(current_user)
+    session.commit()
+    session.refresh(current_user)
+    session.expunge(current_user)
+
+    app.dependency_overrides[auth_service.get_current_user] = lambda: current_user
+    yield current_user
+    app.dependency_overrides.pop(auth_service.get_current_user)
+
+
+class FakeRedis:
+    """In-memory stand-in for the few Redis commands ContactsCache uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+
+@pytest.fixture
+def contacts_cache(monkeypatch):
+    cache = ContactsCache(FakeRedis(), ttl=60)
+    monkeypatch.setattr("src.routes.contacts.contacts_cache", cache)
+    monkeypatch.setattr("src.repository.contacts.contacts_cache", cache)
+    return cache
+
+
+@pytest.fixture(scope="module")
+def contact():
+    return {
+        "first_name": "Wade",
+        "last_name": "Wilson",
+        "email": "wade@example.com",
+        "contact_number": "(555) 123-4567",
+        "birthday": "1990-02-20",
+        "additional_information": "Merc with a mouth",
+    }
+
+
+def test_create_contact(client, current_user, contact):
+    response = client.post("/api/contacts/", json=contact)
+    assert response.status_code == 201, response.text
+    data = response.json()
+    assert data["email"] == contact.get("email")
+    assert data["user"]["id"] == current_user.id
+    assert "id" in data
+
+
+def test_repeat_create_contact(client, current_user, contact):
+    response = client.post("/api/contacts/", json=contact)
+    assert response.status_code == 409, response.text
+
+
+def test_get_contacts(client, current_user, contact):
+    response = client.get("/api/contacts/")
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [item["email"] for item in data] == [contact.get("email")]
+
+
+def test_get_contact(client, current_user, contact):
+    response = client.get("/api/contacts/1")
+    assert response.status_code == 200, response.text
+    assert response.json()["first_name"] == contact.get("first_name")
+
+
+def test_get_contact_not_found(client, current_user):
+    response = client.get("/api/contacts/999")
+    assert response.status_code == 404, response.text
+
+
+def test_conditional_get(client, current_user, contact, contacts_cache):
+    response = client.get("/api/contacts/")
+    assert response.status_code == 200, response.text
+    etag = response.headers["ETag"]
+
+    not_modified = client.get("/api/contacts/", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+
+    cached = client.get("/api/contacts/")
+    assert cached.json() == response.json()
+    assert contacts_cache.stats() == {"hits": 1, "misses": 1}
+
+    client.put("/api/contacts/1", json=contact)
+    changed = client.get("/api/contacts/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200, changed.text
+    assert changed.headers["ETag"] != etag
+
+    single = client.get("/api/contacts/1")
+    assert client.get("/api/contacts/1", headers={"If-None-Match": single.headers["ETag"]}).status_code == 304
+
+
+def test_get_contacts_cursor(client, current_user):
+    for i in range(2, 6):
+        response = client.post("/api/contacts/", json={
+            "first_name": "Wade", "last_name": f"Wilson{i}", "email": f"wade{i}@example.com",
+            "contact_number": f"555-000-000{i}", "birthday": "1990-02-20"})
+        assert response.status_code == 201, response.text
+
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        response = client.get("/api/contacts/", params=params)
+        assert response.status_code == 200, response.text
+        ids += [item["id"] for item in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert ids == [1, 2, 3, 4, 5]
+
+
+def test_search_cursor(client, current_user):
+    response = client.get("/api/contacts/search/", params={"contact_first_name": "Wade", "limit": 3})
+    assert [item["id"] for item in response.json()] == [1, 2, 3]
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get("/api/contacts/search/", params={"contact_first_name": "Wade", "limit": 3,
+                                                           "cursor": cursor})
+    assert [item["id"] for item in response.json()] == [4, 5]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_search_by_contact_number(client, current_user):
+    response = client.get("/api/contacts/search/", params={"contact_number": "(555) 000 0003"})
+    assert response.status_code == 200, response.text
+    assert [item["email"] for item in response.json()] == ["wade3@example.com"]
+
+
+def test_search_no_matches(client, current_user):
+    response = client.get("/api/contacts/search/", params={"contact_last_name": "Nobody"})
+    assert response.status_code == 200, response.text
+    assert response.json() == []
+
+
+def test_fuzzy_search(client, current_user):
+    response = client.get("/api/contacts/search/fuzzy/", params={"q": "wilson", "limit": 3})
+    assert response.status_code == 200, response.text
+    first_page = [item["id"] for item in response.json()]
+    assert len(first_page) == 3
+    response = client.get("/api/contacts/search/fuzzy/", params={"q": "wilson", "limit": 3,
+                                                                 "cursor": response.headers["X-Next-Cursor"]})
+    assert first_page + [item["id"] for item in response.json()] == [1, 2, 3, 4, 5]
+
+
+def test_autocomplete(client, current_user):
+    response = client.get("/api/contacts/autocomplete/", params={"q": "wade w", "limit": 2})
+    assert response.status_code == 200, response.text
+    assert [item["email"] for item in response.json()] == ["wade@example.com", "wade2@example.com"]
+
+    client.put("/api/contacts/2", json={"first_name": "Deadpool", "last_name": "Wilson2", "email": "wade2@example.com",
+                                        "contact_number": "555-000-0002", "birthday": "1990-02-20"})
+    response = client.get("/api/contacts/autocomplete/", params={"q": "dead"})
+    assert [item["id"] for item in response.json()] == [2]
+
+
+def test_invalid_cursor(client, current_user):
+    response = client.get("/api/contacts/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400, response.text
+
+
+def test_remove_contact(client, current_user):
+    response = client.delete("/api/contacts/1")
+    assert response.status_code == 204, response.text
+    response = client.get("/api/contacts/1")
+    assert response.status_code == 404, response.text
+
+
+def test_import_contacts_csv(client, current_user):
+    content = ("first_name,last_name,email,contact_number,birthday,additional_information\n"
+               "Peter,Parker,peter@example.com,555-100-0001,2001-08-10,\n"
+               "Mary,Watson,mary@example.com,555-100-0002,2001-06-01,\"Lives next door,\nwith aunt Anna\"\n"
+               "Bad,Email,not-an-email,555-100-0003,2001-06-01,\n"
+               "Copy,Cat,wade2@example.com,555-100-0004,2001-06-01,\n"
+               "Twin,Peter,peter@example.com,555-100-0005,2001-06-01,\n")
+    response = client.post("/api/contacts/import/", files={"file": ("contacts.csv", content, "text/csv")})
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["total"], report["imported"], report["failed"]) == (5, 2, 3)
+    assert [error["row"] for error in report["errors"]] == [3, 4, 5]
+    assert report["errors"][0]["detail"].startswith("email:")
+
+    response = client.get("/api/contacts/search/", params={"contact_email": "mary@example.com"})
+    assert response.json()[0]["additional_information"] == "Lives next door,\nwith aunt Anna"
+
+
+def test_import_contacts_jsonl(client, current_user):
+    content = ('{"first_name": "Miles", "last_name": "Morales", "email": "miles@example.com", '
+               '"contact_number": "5551000006", "birthday": "2003-03-01"}\n'
+               '{"first_name": "Gwen"\n'
+               '{"first_name": "Gwen", "last_name": "Stacy", "email": "gwen@example.com", '
+               '"contact_number": "123", "birthday": "2003-03-01"}\n')
+    response = client.post("/api/contacts/import/", files={"file": ("contacts.jsonl", content)})
+    assert response.status_code == 200, response.text
+    assert response.json() == {"total": 3, "imported": 1, "failed": 2, "errors": [
+        {"row": 2, "detail": "Invalid JSON: Expecting ',' delimiter"},
+        {"row": 3, "detail": "Invalid contact number"}]}
+
+
+def test_import_contacts_overlong_fields(client, current_user):
+    content = ('{"first_name": "Ben", "last_name": "Reilly", "email": "ben@example.com", '
+               '"contact_number": "5551000008", "birthday": "1995-03-01", "additional_information": "%s"}\n'
+               '{"first_name": "Kaine", "last_name": "Parker", "email": "kaine@example.com", '
+               '"contact_number": "(555)   100   -   0009", "birthday": "1995-03-01"}\n') % ("x" * 251)
+    response = client.post("/api/contacts/import/", files={"file": ("contacts.jsonl", content)})
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["imported"], report["failed"]) == (0, 2)
+    assert report["errors"][0]["detail"].startswith("additional_information:")
+    assert report["errors"][1]["detail"].startswith("contact_number:")
+
+
+def test_import_contacts_unsupported_format(client, current_user):
+    response = client.post("/api/contacts/import/", files={"file": ("contacts.xlsx", b"", "application/octet-stream")})
+    assert response.status_code == 415, response.text
+
+
+def test_export_contacts_csv(client, current_user):
+    response = client.get("/api/contacts/export/")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="contacts.csv"'
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    ids = [int(row["id"]) for row in rows]
+    assert ids == sorted(ids) and len(ids) == len(client.get("/api/contacts/", params={"limit": 1000}).json())
+    mary = next(row for row in rows if row["email"] == "mary@example.com")
+    assert mary["additional_information"] == "Lives next door,\nwith aunt Anna"
+    assert mary["birthday"] == "2001-06-01"
+
+
+def test_export_contacts_ndjson(client, current_user):
+    response = client.get("/api/contacts/export/", params={"format": "ndjson"})
+    assert response.status_code == 200, response.text
+    contacts = [json.loads(line) for line in response.text.splitlines()]
+    listed = client.get("/api/contacts/", params={"limit": 1000}).json()
+    assert [contact["email"] for contact in contacts] == [contact["email"] for contact in listed]
+    assert set(contacts[0]) == {"id", "first_name", "last_name", "email", "contact_number", "birthday",
+                                "additional_information"}
+
+
+def test_export_contacts_unknown_format(client, current_user):
+    response = client.get("/api/contacts/export/", params={"format": "xml"})
+    assert response.status_code == 422, response.text
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import pytest
+
+from src.conf.config import settings
+
+
+@pytest.fixture()
+def metrics_token(monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "metrics-secret")
+    return "metrics-secret"
+
+
+def test_metrics_disabled_without_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    response = client.get("/api/metrics/hashing", headers={"Authorization": "Bearer anything"})
+    assert response.status_code == 403, response.text
+
+
+def test_metrics_require_token(client, metrics_token):
+    response = client.get("/api/metrics/hashing")
+    assert response.status_code == 401, response.text
+    assert response.headers["www-authenticate"] == "Bearer"
+
+    response = client.get("/api/metrics/hashing", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401, response.text
+
+
+def test_metrics_with_token(client, metrics_token):
+    response = client.get("/api/metrics/hashing", headers={"Authorization": f"Bearer {metrics_token}"})
+    assert response.status_code == 200, response.text
+    assert "workers" in response.json()
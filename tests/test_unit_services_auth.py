@@ -0,0 +1,40 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import HTTPException
+from jose import jwt
+
+from src.services.auth import Auth
+from src.services.cache import token_cache
+
+
+class TestAuthTokens(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.auth = Auth()
+        self.auth.SECRET_KEY = "secret"
+        self.auth.ALGORITHM = "HS256"
+        token_cache.local.clear()
+
+    async def test_decode_token_verifies_once(self):
+        token = await self.auth.create_access_token(data={"sub": "user@example.com"})
+        with patch("src.services.auth.jwt.decode", wraps=jwt.decode) as mock_decode:
+            first = self.auth.decode_token(token)
+            second = self.auth.decode_token(token)
+        mock_decode.assert_called_once()
+        self.assertEqual(first, second)
+        self.assertEqual(first["scope"], "access_token")
+
+    async def test_expired_token_is_rejected(self):
+        token = await self.auth.create_refresh_token(data={"sub": "user@example.com"}, expires_delta=-1)
+        with self.assertRaises(HTTPException):
+            await self.auth.decode_refresh_token(token)
+
+    async def test_tokens_expire_from_creation_time(self):
+        token = await self.auth.create_access_token(data={"sub": "user@example.com"}, expires_delta=60)
+        claims = self.auth.decode_token(token)
+        self.assertEqual(claims["exp"] - claims["iat"], 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import time
+import unittest
+
+from src.services.autocomplete import AutocompleteIndex, ContactPrefixIndex, Suggestion
+
+WADE = Suggestion(1, "Wade", "Wilson", "wade@example.com")
+VANESSA = Suggestion(2, "Vanessa", "Carlysle", "vanessa@example.com")
+WEASEL = Suggestion(3, "Jack", "Hammer", "weasel@example.com")
+
+
+class TestContactPrefixIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ContactPrefixIndex([WADE, VANESSA, WEASEL])
+
+    def test_prefixes_of_all_terms(self):
+        self.assertEqual(self.index.search("w"), [WADE, WEASEL])
+        self.assertEqual(self.index.search("Wade Wi"), [WADE])
+        self.assertEqual(self.index.search("vanessa@"), [VANESSA])
+        self.assertEqual(self.index.search("ham"), [WEASEL])
+        self.assertEqual(self.index.search("x"), [])
+        self.assertEqual(self.index.search("w", limit=1), [WADE])
+
+    def test_update_and_remove(self):
+        self.index.add(WADE._replace(first_name="Deadpool"))
+        self.assertEqual([suggestion.id for suggestion in self.index.search("dead")], [1])
+        self.assertEqual([suggestion.id for suggestion in self.index.search("wade w")], [])
+        self.index.remove(1)
+        self.assertEqual(self.index.search("wilson"), [])
+        self.assertEqual(len(self.index.terms), 8)
+
+    def test_large_index_latency(self):
+        index = ContactPrefixIndex(Suggestion(i, f"first{i}", f"last{i}", f"contact{i}@example.com")
+                                   for i in range(100_000))
+        start = time.perf_counter()
+        for _ in range(1000):
+            index.search("first9999", 10)
+        self.assertLess((time.perf_counter() - start) / 1000, 1e-3)
+        self.assertEqual(len(index.search("first9999", 10)), 10)
+
+
+class TestAutocompleteIndex(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.index = AutocompleteIndex(max_contacts=3, ttl=60, clock=lambda: self.now)
+        self.loads = 0
+
+    def loader(self, *suggestions):
+        async def load():
+            self.loads += 1
+            return list(suggestions)
+        return load
+
+    async def test_builds_once_and_updates_incrementally(self):
+        await self.index.get(1, self.loader(WADE))
+        self.index.add(1, VANESSA)
+        index = await self.index.get(1, self.loader())
+        self.assertEqual(index.search("van"), [VANESSA])
+        self.index.remove(1, 1)
+        self.assertEqual(index.search("wade"), [])
+        self.assertEqual((self.loads, self.index.stats()["contacts"]), (1, 1))
+
+    async def test_evicts_least_recently_used_users(self):
+        await self.index.get(1, self.loader(WADE, VANESSA))
+        await self.index.get(2, self.loader(WEASEL))
+        await self.index.get(1, self.loader())
+        await self.index.get(3, self.loader(WEASEL))
+        self.assertEqual(list(self.index._indexes), [1, 3])
+        self.assertEqual(self.index.stats()["evictions"], 1)
+
+    async def test_expires(self):
+        await self.index.get(1, self.loader(WADE))
+        self.now = 61
+        await self.index.get(1, self.loader(WADE))
+        self.assertEqual(self.loads, 2)
+
+    async def test_change_during_build_is_not_cached(self):
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_load():
+            started.set()
+            await release.wait()
+            return [WADE]
+
+        build = asyncio.create_task(self.index.get(1, slow_load))
+        await started.wait()
+        self.index.add(1, VANESSA)
+        release.set()
+        await build
+        self.assertNotIn(1, self.index._indexes)
+
+
+if __name__ == '__main__':
+    unittest.main()
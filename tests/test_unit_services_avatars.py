@@ -0,0 +1,96 @@
+import asyncio
+import tempfile
+import unittest
+from io import BytesIO
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from starlette.datastructures import Headers
+
+from src.services.avatars import AvatarPipeline, LocalStorage
+
+
+def png(width: int, height: int) -> bytes:
+    output = BytesIO()
+    Image.new("RGB", (width, height), "red").save(output, "PNG")
+    return output.getvalue()
+
+
+IMAGE = png(300, 200)
+
+
+def upload(data: bytes, content_type: str = "image/png") -> UploadFile:
+    return UploadFile(BytesIO(data), filename="avatar.png", headers=Headers({"content-type": content_type}))
+
+
+class BrokenStorage:
+
+    def save(self, source: Path, name: str) -> str:
+        raise OSError("storage unavailable")
+
+
+class TestAvatarPipeline(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        root = Path(self.directory.name)
+        self.storage = LocalStorage(root / "avatars", "/static/avatars/", size=50)
+        self.spool_dir = root / "spool"
+        self.pipeline = AvatarPipeline(self.storage, self.spool_dir, workers=2, max_pending=2, max_size=4096)
+
+    def tearDown(self):
+        self.pipeline.executor.shutdown()
+        self.directory.cleanup()
+
+    async def test_stores_in_background(self):
+        on_saved = AsyncMock()
+        await self.pipeline.submit(upload(IMAGE), "Application/test@example.com", on_saved)
+        await self.pipeline.join()
+        url = on_saved.await_args.args[0]
+        self.assertTrue(url.startswith("/static/avatars/Application%2Ftest%40example.com?v="))
+        with Image.open(self.storage.directory / "Application%2Ftest%40example.com") as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (50, 50)))
+        self.assertEqual(list(self.spool_dir.iterdir()), [])
+        stats = self.pipeline.stats()
+        self.assertEqual((stats["completed"], stats["failed"], stats["pending"]), (1, 0, 0))
+
+    async def test_storage_failure_is_logged(self):
+        self.pipeline.storage = BrokenStorage()
+        on_saved = AsyncMock()
+        with self.assertLogs("src.services.avatars", level="ERROR"):
+            await self.pipeline.submit(upload(IMAGE), "avatar", on_saved)
+            await self.pipeline.join()
+        on_saved.assert_not_awaited()
+        self.assertEqual(list(self.spool_dir.iterdir()), [])
+        self.assertEqual(self.pipeline.stats()["failed"], 1)
+
+    async def test_rejects_invalid_uploads(self):
+        with self.assertRaises(HTTPException) as err:
+            await self.pipeline.submit(upload(b"text", "text/plain"), "avatar", AsyncMock())
+        self.assertEqual(err.exception.status_code, 415)
+        with self.assertRaises(HTTPException) as err:
+            await self.pipeline.submit(upload(b"x" * 4097), "avatar", AsyncMock())
+        self.assertEqual(err.exception.status_code, 413)
+        self.assertEqual(list(self.spool_dir.iterdir()), [])
+        self.assertEqual(self.pipeline.pending, 0)
+
+    async def test_rejects_when_queue_is_full(self):
+        release = asyncio.Event()
+
+        async def on_saved(url):
+            await release.wait()
+
+        for _ in range(2):
+            await self.pipeline.submit(upload(IMAGE), "avatar", on_saved)
+        with self.assertRaises(HTTPException) as err:
+            await self.pipeline.submit(upload(IMAGE), "avatar", on_saved)
+        self.assertEqual(err.exception.status_code, 503)
+        release.set()
+        await self.pipeline.join()
+        self.assertEqual(self.pipeline.stats()["rejected"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
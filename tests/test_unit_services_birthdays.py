@@ -0,0 +1,137 @@
+import asyncio
+import unittest
+from datetime import date, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fakeredis import FakeAsyncRedis
+from redis.exceptions import ConnectionError
+from sqlalchemy.exc import OperationalError
+
+from src.database.models import Contact, User
+from src.services.birthdays import PUT_SCRIPT, BirthdayDigest
+from src.services.cache import ContactsCache
+
+
+def make_contact(contact_id: int, birthday: date) -> Contact:
+    user = User(id=1, username="deadpool", email="deadpool@example.com", created_at=datetime(2024, 1, 1),
+                avatar="avatar_url")
+    return Contact(id=contact_id, first_name="Wade", last_name="Wilson", email=f"wade{contact_id}@example.com",
+                   contact_number=f"555000000{contact_id}", birthday=birthday, user_id=user.id, user=user)
+
+
+class TestBirthdayDigest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+        self.contacts = MagicMock()
+        self.contacts.version = AsyncMock(return_value=5)
+        self.digest = BirthdayDigest(self.redis, self.contacts, ttl=60)
+        self.day = date(2026, 2, 18)
+
+    async def test_get_current_digest(self):
+        self.redis.hgetall.return_value = {b"version": b"5", b"2": b'0 221 2 {"id":2}', b"1": b'0 220 1 {"id":1}'}
+        self.assertEqual(await self.digest.get(1, self.day),
+                         [((0, 220, 1), b'{"id":1}'), ((0, 221, 2), b'{"id":2}')])
+        self.redis.hgetall.assert_awaited_once_with("birthdays:2026-02-18:1")
+
+    async def test_stale_or_missing_digest_is_a_miss(self):
+        self.redis.hgetall.return_value = {b"version": b"4"}
+        self.assertIsNone(await self.digest.get(1, self.day))
+        self.redis.hgetall.return_value = {}
+        self.assertIsNone(await self.digest.get(1, self.day))
+        self.redis.hgetall.side_effect = ConnectionError()
+        self.assertIsNone(await self.digest.get(1, self.day))
+        self.assertEqual(self.digest.stats()["misses"], 2)
+
+    async def test_store_replaces_digest(self):
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        self.redis.pipeline = MagicMock()
+        self.redis.pipeline.return_value.__aenter__.return_value = pipe
+        contact = make_contact(1, date(1990, 2, 20))
+        entries = await self.digest.store(1, self.day, 5, [((0, 220, 1), contact)])
+        self.assertEqual(entries[0][0], (0, 220, 1))
+        pipe.delete.assert_called_once_with("birthdays:2026-02-18:1")
+        self.assertEqual(pipe.hset.call_args.kwargs["mapping"]["version"], 5)
+        pipe.expire.assert_called_once_with("birthdays:2026-02-18:1", 60)
+        pipe.execute.assert_awaited_once()
+
+    async def test_put_updates_built_digest_only(self):
+        value = BirthdayDigest.entry((0, 220, 1), make_contact(1, date(1990, 2, 20)))
+        await self.digest.put(1, self.day, 6, 1, value)
+        self.redis.eval.assert_awaited_once_with(PUT_SCRIPT, 1, "birthdays:2026-02-18:1", 6, 5, 1, value)
+
+    async def test_versions_with_one_mget(self):
+        self.redis.mget.return_value = [b"3", None]
+        self.assertEqual(await self.digest.versions([1, 2]), {1: 3, 2: 5})
+        self.contacts.version.assert_awaited_once_with(2)
+
+
+class TestBirthdayDigestScript(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = FakeAsyncRedis()
+        self.contacts = ContactsCache(self.redis, ttl=60)
+        self.digest = BirthdayDigest(self.redis, self.contacts, ttl=60)
+        self.day = date(2026, 2, 18)
+        first = make_contact(1, date(1990, 2, 20))
+        await self.digest.store(1, self.day, await self.contacts.version(1), [((0, 220, 1), first)])
+        self.entry = BirthdayDigest.entry((0, 221, 2), make_contact(2, date(1990, 2, 21)))
+
+    async def asyncTearDown(self):
+        await self.redis.aclose()
+
+    async def test_single_edit_patches_current_digest(self):
+        await self.digest.put(1, self.day, await self.contacts.bump(1), 2, self.entry)
+        entries = await self.digest.get(1, self.day)
+        self.assertEqual([sort_key for sort_key, _ in entries], [(0, 220, 1), (0, 221, 2)])
+
+    async def test_bulk_import_then_single_edit_drops_digest(self):
+        # Імпорт змінює версію, не чіпаючи дайджест
+        await self.contacts.bump(1)
+        await self.digest.put(1, self.day, await self.contacts.bump(1), 2, self.entry)
+        self.assertFalse(await self.redis.exists(self.digest.key(1, self.day)))
+        self.assertIsNone(await self.digest.get(1, self.day))
+
+    async def test_missing_digest_is_not_created(self):
+        await self.redis.delete(self.digest.key(1, self.day))
+        await self.digest.put(1, self.day, await self.contacts.bump(1), 2, self.entry)
+        self.assertFalse(await self.redis.exists(self.digest.key(1, self.day)))
+
+
+class TestBirthdayDigestSchedule(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+        self.digest = BirthdayDigest(self.redis, MagicMock(), ttl=60)
+        self.session_factory = MagicMock()
+
+    async def run_once(self, build):
+        with patch("src.services.birthdays.asyncio.sleep", AsyncMock(side_effect=asyncio.CancelledError)) as sleep:
+            with self.assertRaises(asyncio.CancelledError):
+                await self.digest.schedule(self.session_factory, build, retry_interval=5)
+        return sleep
+
+    async def test_builds_with_lock(self):
+        self.redis.set.return_value = True
+        build = AsyncMock(return_value=3)
+        await self.run_once(build)
+        build.assert_awaited_once()
+        self.assertTrue(self.redis.set.await_args.kwargs["nx"])
+
+    async def test_other_worker_holds_lock(self):
+        self.redis.set.return_value = None
+        build = AsyncMock()
+        await self.run_once(build)
+        build.assert_not_awaited()
+
+    async def test_failed_build_releases_lock_and_retries(self):
+        self.redis.set.return_value = True
+        build = AsyncMock(side_effect=OperationalError("SELECT", {}, Exception("db down")))
+        sleep = await self.run_once(build)
+        self.redis.delete.assert_awaited_once_with(self.digest.lock_key(date.today()))
+        sleep.assert_awaited_once_with(5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+from redis.exceptions import ConnectionError
+
+from src.database.models import User
+from src.services.cache import ContactsCache, LRUCache, TokenCache, UserCache
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+        self.cache = UserCache(self.redis, ttl=60)
+        self.user = User(id=1, username="username", email="user@example.com", password="hash",
+                         refresh_token="token", avatar="avatar_url", confirmed=True,
+                         created_at=datetime(2024, 4, 20, 19, 55))
+
+    def test_roundtrip_skips_secrets(self):
+        user = UserCache.loads(UserCache.dumps(self.user))
+        self.assertEqual((user.id, user.username, user.email, user.avatar, user.confirmed, user.created_at),
+                         (1, "username", "user@example.com", "avatar_url", True, datetime(2024, 4, 20, 19, 55)))
+        self.assertIsNone(user.password)
+        self.assertIsNone(user.refresh_token)
+
+    async def test_set_uses_ttl(self):
+        await self.cache.set(self.user)
+        self.redis.set.assert_awaited_once_with("user:user@example.com", UserCache.dumps(self.user), ex=60)
+
+    async def test_get_hit(self):
+        self.redis.get.return_value = UserCache.dumps(self.user)
+        user = await self.cache.get("user@example.com")
+        self.assertEqual(user.id, 1)
+
+    async def test_get_miss_on_redis_error(self):
+        self.redis.get.side_effect = ConnectionError()
+        self.assertIsNone(await self.cache.get("user@example.com"))
+
+    async def test_local_hit_skips_redis(self):
+        await self.cache.set(self.user)
+        user = await self.cache.get("user@example.com")
+        self.assertEqual(user.email, "user@example.com")
+        self.redis.get.assert_not_awaited()
+        self.assertEqual(self.cache.stats()["local"]["hits"], 1)
+
+    async def test_redis_hit_fills_local(self):
+        self.redis.get.return_value = UserCache.dumps(self.user)
+        await self.cache.get("user@example.com")
+        await self.cache.get("user@example.com")
+        self.redis.get.assert_awaited_once()
+        self.assertEqual(self.cache.stats()["redis"], {"hits": 1, "misses": 0})
+
+    async def test_invalidate(self):
+        await self.cache.set(self.user)
+        await self.cache.invalidate("user@example.com")
+        self.redis.delete.assert_awaited_once_with("user:user@example.com")
+        self.redis.publish.assert_awaited_once_with(UserCache.channel, "user@example.com")
+        self.assertNotIn("user@example.com", self.cache.local)
+
+    async def test_evict_from_other_worker(self):
+        await self.cache.set(self.user)
+        self.cache.evict("user@example.com")
+        self.redis.get.return_value = None
+        self.assertIsNone(await self.cache.get("user@example.com"))
+
+    async def test_invalidate_drops_verified_tokens(self):
+        self.cache.tokens = TokenCache(10)
+        self.cache.tokens.set("token", {"sub": "user@example.com", "exp": time.time() + 60})
+        await self.cache.invalidate("user@example.com")
+        self.assertIsNone(self.cache.tokens.get("token"))
+
+
+class TestContactsCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+        self.cache = ContactsCache(self.redis, ttl=300)
+
+    async def test_version(self):
+        self.redis.get.return_value = b"7"
+        self.assertEqual(await self.cache.version(1), 7)
+        self.redis.set.assert_not_awaited()
+
+    async def test_missing_version_starts_from_time(self):
+        self.redis.get.side_effect = [None, b"1700000000000"]
+        self.assertEqual(await self.cache.version(1), 1700000000000)
+        self.assertTrue(self.redis.set.await_args.kwargs["nx"])
+
+    async def test_bump_after_lost_key_skips_used_versions(self):
+        self.redis.incr.return_value = 1
+        await self.cache.bump(1)
+        self.redis.incr.assert_awaited_once_with("contacts:version:1")
+        self.assertGreater(self.redis.set.await_args.args[1], 1)
+
+    async def test_redis_errors(self):
+        self.redis.get.side_effect = ConnectionError()
+        self.redis.incr.side_effect = ConnectionError()
+        self.assertIsNone(await self.cache.version(1))
+        self.assertIsNone(await self.cache.get(1, 7, "/api/contacts/"))
+        await self.cache.bump(1)
+
+    async def test_bump_is_retried(self):
+        self.redis.incr.side_effect = [ConnectionError(), 8]
+        self.assertEqual(await self.cache.bump(1), 8)
+        self.redis.delete.assert_not_awaited()
+
+    async def test_failed_bump_deletes_version(self):
+        self.redis.incr.side_effect = ConnectionError()
+        self.assertIsNone(await self.cache.bump(1))
+        self.assertEqual(self.redis.incr.await_count, 3)
+        self.redis.delete.assert_awaited_once_with("contacts:version:1")
+        self.assertEqual(self.cache.stale, set())
+
+    async def test_version_reset_waits_for_redis(self):
+        self.redis.incr.side_effect = ConnectionError()
+        self.redis.delete.side_effect = ConnectionError()
+        await self.cache.bump(1)
+        self.assertEqual(self.cache.stale, {1})
+
+        self.redis.delete.side_effect = None
+        self.redis.get.return_value = b"1700000000000"
+        await self.cache.version(2)
+        self.redis.delete.assert_awaited_with("contacts:version:1")
+        self.assertEqual(self.cache.stale, set())
+
+    async def test_body_keys_and_etags_depend_on_version(self):
+        await self.cache.set(1, 7, "/api/contacts/", b"[]")
+        self.redis.set.assert_awaited_once_with(self.cache.body_key(1, 7, "/api/contacts/"), b"[]", ex=300)
+        self.assertNotEqual(self.cache.body_key(1, 7, "/api/contacts/"), self.cache.body_key(1, 8, "/api/contacts/"))
+        self.assertNotEqual(ContactsCache.etag(1, 7, "/api/contacts/"), ContactsCache.etag(2, 7, "/api/contacts/"))
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = TokenCache(10)
+
+    def test_caches_until_exp(self):
+        claims = {"sub": "user@example.com", "exp": time.time() + 60}
+        self.cache.set("token", claims)
+        self.assertEqual(self.cache.get("token"), claims)
+        self.assertIsNone(self.cache.get("other"))
+
+    def test_skips_expired_and_without_exp(self):
+        self.cache.set("expired", {"sub": "user@example.com", "exp": time.time() - 1})
+        self.cache.set("no_exp", {"sub": "user@example.com"})
+        self.assertEqual(len(self.cache.local), 0)
+
+    def test_evict_subject(self):
+        self.cache.set("a", {"sub": "a@example.com", "exp": time.time() + 60})
+        self.cache.set("b", {"sub": "b@example.com", "exp": time.time() + 60})
+        self.assertEqual(self.cache.evict_subject("a@example.com"), 1)
+        self.assertIsNone(self.cache.get("a"))
+        self.assertIsNotNone(self.cache.get("b"))
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.cache = LRUCache(maxsize=2, ttl=10, clock=lambda: self.now)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+        self.assertEqual((self.cache.get("a"), self.cache.get("b"), self.cache.get("c")), (1, None, 3))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_entries_expire(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2, ttl=30)
+        self.now = 10
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.get("b"), 2)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_counters(self):
+        self.cache.set("a", 1)
+        self.cache.get("a")
+        self.cache.get("b")
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_ratio"]), (1, 1, 0.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
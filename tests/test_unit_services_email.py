@@ -0,0 +1,127 @@
+import asyncio
+import unittest
+from email import message_from_bytes
+from email.policy import default
+from unittest.mock import patch
+
+from fastapi_mail import ConnectionConfig
+
+from src.services.email import SMTPPool, render_email
+
+
+class SMTPStub:
+    """Local SMTP server that accepts every message and keeps it in memory."""
+
+    def __init__(self):
+        self.messages: list[bytes] = []
+        self.connections = 0
+        self.writers: list[asyncio.StreamWriter] = []
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.drop_connections()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def drop_connections(self):
+        for writer in self.writers:
+            writer.close()
+        self.writers.clear()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self.writers.append(writer)
+        writer.write(b"220 stub ESMTP\r\n")
+        data = None
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+            if data is not None:
+                if line == b".\r\n":
+                    self.messages.append(b"".join(data))
+                    data = None
+                    writer.write(b"250 OK\r\n")
+                else:
+                    data.append(line)
+                    continue
+            elif command.startswith(("EHLO", "HELO")):
+                writer.write(b"250 stub\r\n")
+            elif command.startswith("DATA"):
+                data = []
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+            elif command.startswith("QUIT"):
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+
+def stub_config(port: int) -> ConnectionConfig:
+    return ConnectionConfig(MAIL_USERNAME="user", MAIL_PASSWORD="password", MAIL_FROM="noreply@example.com",
+                            MAIL_PORT=port, MAIL_SERVER="127.0.0.1", MAIL_STARTTLS=False, MAIL_SSL_TLS=False,
+                            USE_CREDENTIALS=False, VALIDATE_CERTS=False)
+
+
+# Токен не залежить від налаштувань JWT середовища
+stub_token = patch("src.services.email.auth_service.create_email_token", return_value="email-token")
+
+JOB = {"kind": "confirm_email", "email": "deadpool@example.com", "username": "deadpool",
+       "host": "http://testserver/", "attempt": "0"}
+
+
+@stub_token
+class TestSMTPPool(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.stub = SMTPStub()
+        self.config = stub_config(await self.stub.start())
+        self.pool = SMTPPool(self.config, size=2)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+        await self.stub.stop()
+
+    async def test_batch_reuses_connections(self, create_email_token):
+        await asyncio.gather(*(self.pool.send(render_email(JOB | {"email": f"user{number}@example.com"},
+                                                           self.config))
+                               for number in range(10)))
+        self.assertEqual(len(self.stub.messages), 10)
+        self.assertLessEqual(self.stub.connections, 2)
+        self.assertEqual(self.pool.connects, self.stub.connections)
+
+    async def test_reconnects_after_server_closed_connection(self, create_email_token):
+        await self.pool.send(render_email(JOB, self.config))
+        self.stub.drop_connections()
+        await asyncio.sleep(0.05)
+        await self.pool.send(render_email(JOB, self.config))
+        self.assertEqual((len(self.stub.messages), self.stub.connections), (2, 2))
+
+
+class TestRenderEmail(unittest.TestCase):
+
+    @stub_token
+    def test_confirmation_letter(self, create_email_token):
+        message = message_from_bytes(render_email(JOB, stub_config(25)).as_bytes(), policy=default)
+        self.assertEqual((message["To"], message["Subject"].strip()), ("deadpool@example.com", "Confirm your email"))
+        self.assertEqual(message.get_content_type(), "text/html")
+        self.assertIn("http://testserver/api/auth/confirmed_email/email-token", message.get_content())
+        create_email_token.assert_called_once_with({"sub": "deadpool@example.com"})
+
+    @stub_token
+    def test_values_are_escaped(self, create_email_token):
+        message = message_from_bytes(render_email(JOB | {"username": "<b>deadpool</b>"}, stub_config(25)).as_bytes(),
+                                     policy=default)
+        self.assertIn("Hi &lt;b&gt;deadpool&lt;/b&gt;,", message.get_content())
+
+    def test_unknown_kind(self):
+        with self.assertRaises(KeyError):
+            render_email(JOB | {"kind": "newsletter"}, stub_config(25))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import asyncio
+import unittest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+
+from src.services.gravatar import DefaultAvatars
+
+
+@asynccontextmanager
+async def session_factory():
+    yield "session"
+
+
+class TestDefaultAvatars(unittest.IsolatedAsyncioTestCase):
+
+    async def test_run_once_resolves_in_batches(self):
+        job = DefaultAvatars(batch_size=2, delay=0, interval=60)
+        resolve = AsyncMock(side_effect=[2, 2, 1])
+
+        self.assertEqual(await job.run_once(session_factory, resolve), 5)
+        self.assertEqual(resolve.await_count, 3)
+        resolve.assert_awaited_with("session", 2)
+        self.assertEqual(job.stats(), {"resolved": 5, "batches": 3, "pending_wakeup": False})
+
+    async def test_schedule_runs_on_wakeup(self):
+        job = DefaultAvatars(batch_size=10, delay=0, interval=60)
+        resolved = asyncio.Event()
+
+        async def resolve(db, batch_size):
+            resolved.set()
+            return 1
+
+        task = asyncio.create_task(job.schedule(session_factory, resolve))
+        try:
+            job.wake()
+            await asyncio.wait_for(resolved.wait(), 1)
+        finally:
+            task.cancel()
+        self.assertEqual(job.stats()["resolved"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
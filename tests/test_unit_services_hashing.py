@@ -0,0 +1,38 @@
+import asyncio
+import unittest
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from src.services.hashing import PasswordHasher
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+        self.hasher = PasswordHasher(context, workers=2, max_pending=2)
+
+    def tearDown(self):
+        self.hasher.executor.shutdown()
+
+    async def test_hash_and_verify(self):
+        hashed = await self.hasher.hash("password")
+        self.assertTrue(hashed.startswith("$2b$04$"))
+        self.assertTrue(await self.hasher.verify("password", hashed))
+        self.assertFalse(await self.hasher.verify("wrong", hashed))
+        stats = self.hasher.stats()
+        self.assertEqual((stats["completed"], stats["running"], stats["queued"]), (3, 0, 0))
+
+    async def test_rejects_when_queue_is_full(self):
+        hashed = await self.hasher.hash("password")
+        results = await asyncio.gather(*(self.hasher.verify("password", hashed) for _ in range(3)),
+                                       return_exceptions=True)
+        rejected = [result for result in results if isinstance(result, HTTPException)]
+        self.assertEqual(len(rejected), 1)
+        self.assertEqual(rejected[0].status_code, 503)
+        self.assertEqual(self.hasher.stats()["rejected"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
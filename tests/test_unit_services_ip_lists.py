@@ -0,0 +1,97 @@
+import tempfile
+import time
+import unittest
+from ipaddress import ip_address, ip_network
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from redis.exceptions import ConnectionError
+
+from src.services.ip_lists import IPList, NetworkSet
+
+
+def sscan_iter(*members, error=None):
+    async def iterate(key, count):
+        for member in members:
+            yield member
+        if error is not None:
+            raise error
+    return iterate
+
+
+class TestNetworkSet(unittest.TestCase):
+
+    def test_match_most_specific_network(self):
+        networks = NetworkSet(["10.0.0.0/8", "10.1.0.0/16", "10.1.2.3"])
+        self.assertEqual(networks.match("10.1.2.3"), ip_network("10.1.2.3/32"))
+        self.assertEqual(networks.match("10.1.9.9"), ip_network("10.1.0.0/16"))
+        self.assertEqual(networks.match(ip_address("10.200.0.1")), ip_network("10.0.0.0/8"))
+        self.assertIsNone(networks.match("11.0.0.1"))
+
+    def test_ipv6_and_mapped_ipv4(self):
+        networks = NetworkSet(["2001:db8::/32", "::1", "192.168.0.0/24"])
+        self.assertIn("2001:db8:1::5", networks)
+        self.assertEqual(networks.match("::1"), ip_network("::1/128"))
+        self.assertIn("::ffff:192.168.0.7", networks)
+        self.assertNotIn("2001:db9::1", networks)
+
+    def test_invalid_and_missing_addresses(self):
+        networks = NetworkSet(["0.0.0.0/0"])
+        self.assertIn("8.8.8.8", networks)
+        self.assertNotIn("testclient", networks)
+        self.assertNotIn(None, networks)
+
+    def test_from_lines(self):
+        networks = NetworkSet.from_lines(["# abuse list", "", "198.51.100.0/24  # spam", "not-an-ip",
+                                          "198.51.100.7", "203.0.113.5/24"])
+        self.assertEqual(len(networks), 3)
+        self.assertIn("203.0.113.200", networks)
+
+    def test_large_list_lookup(self):
+        networks = NetworkSet(f"{a}.{b}.{c}.0/24" for a in range(1, 5) for b in range(256) for c in range(256))
+        self.assertEqual(len(networks), 4 * 256 * 256)
+        start = time.perf_counter()
+        for _ in range(10000):
+            "3.200.17.1" in networks
+        self.assertIn("3.200.17.1", networks)
+        self.assertNotIn("5.0.0.1", networks)
+        self.assertLess(time.perf_counter() - start, 1)
+
+
+class TestIPList(unittest.IsolatedAsyncioTestCase):
+
+    async def test_reload_from_file_and_redis(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "blacklist.txt"
+            path.write_text("10.0.0.0/8\n")
+            ip_list = IPList("blacklist", ["127.0.0.1"], str(path), "ip:blacklist")
+            client = MagicMock()
+            client.sscan_iter = sscan_iter(b"172.16.0.0/12")
+
+            self.assertTrue(await ip_list.reload(client))
+
+        self.assertEqual(len(ip_list), 3)
+        self.assertIn("10.1.1.1", ip_list)
+        self.assertIn("172.20.0.1", ip_list)
+        self.assertIn("127.0.0.1", ip_list)
+        self.assertIsNotNone(ip_list.stats()["loaded_at"])
+
+    async def test_keeps_current_list_on_redis_error(self):
+        ip_list = IPList("blacklist", redis_key="ip:blacklist")
+        client = MagicMock()
+        client.sscan_iter = sscan_iter(b"10.0.0.0/8")
+        await ip_list.reload(client)
+
+        client.sscan_iter = sscan_iter(b"192.168.0.0/16", error=ConnectionError())
+        self.assertFalse(await ip_list.reload(client))
+        self.assertIn("10.1.1.1", ip_list)
+        self.assertNotIn("192.168.0.1", ip_list)
+
+    async def test_keeps_current_list_on_missing_file(self):
+        ip_list = IPList("whitelist", ["127.0.0.1"], "/nonexistent/whitelist.txt")
+        self.assertFalse(await ip_list.reload())
+        self.assertIn("127.0.0.1", ip_list)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from jinja2 import FileSystemBytecodeCache
+
+from src.services.email import conf
+from src.services.mail_templates import MailTemplates
+
+
+class TestMailTemplates(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.path = Path(self.folder.name)
+
+    def test_skeleton_matches_jinja(self):
+        templates = MailTemplates(conf.TEMPLATE_FOLDER)
+        templates.load(["email_template.html"])
+        self.assertIsNotNone(templates.skeletons["email_template.html"])
+        values = {"host": "http://testserver/", "username": "Wade & <Vanessa>", "token": "a.b.c"}
+        self.assertEqual(templates.render("email_template.html", **values),
+                         templates.env.get_template("email_template.html").render(**values))
+
+    def test_missing_and_none_values_like_jinja(self):
+        (self.path / "letter.html").write_text("<p>{{ first }} {{ second }}</p>\n")
+        templates = MailTemplates(self.path)
+        self.assertEqual(templates.render("letter.html", second=None),
+                         templates.env.get_template("letter.html").render(second=None))
+
+    def test_templates_with_logic_are_rendered_by_jinja(self):
+        (self.path / "letter.html").write_text("{% if username %}<p>Hi {{ username|title }}</p>{% endif %}")
+        templates = MailTemplates(self.path)
+        self.assertEqual(templates.render("letter.html", username="wade"), "<p>Hi Wade</p>")
+        self.assertIsNone(templates.skeletons["letter.html"])
+
+    def test_bytecode_is_cached_on_disk(self):
+        (self.path / "letter.html").write_text("<p>Hi {{ username }}</p>")
+        cache = tempfile.TemporaryDirectory()
+        self.addCleanup(cache.cleanup)
+        MailTemplates(self.path, FileSystemBytecodeCache(cache.name)).load(["letter.html"])
+        self.assertEqual(len(list(Path(cache.name).iterdir())), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
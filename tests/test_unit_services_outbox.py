@@ -0,0 +1,94 @@
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from aiosmtplib import SMTPRecipientsRefused, SMTPRecipientRefused, SMTPServerDisconnected
+from fakeredis import FakeAsyncRedis
+from redis.exceptions import ConnectionError
+
+from src.services.outbox import MailOutbox, MailWorker
+
+
+class TestMailOutbox(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.redis = AsyncMock()
+        self.outbox = MailOutbox(self.redis, "mail:outbox", maxlen=1000)
+
+    async def test_enqueue(self):
+        self.assertTrue(await self.outbox.enqueue("confirm_email", email="deadpool@example.com"))
+        self.redis.xadd.assert_awaited_once_with(
+            "mail:outbox", {"kind": "confirm_email", "attempt": 0, "email": "deadpool@example.com"})
+
+    async def test_enqueue_without_redis(self):
+        self.redis.xadd.side_effect = ConnectionError()
+        self.assertFalse(await self.outbox.enqueue("confirm_email", email="deadpool@example.com"))
+
+    async def test_dead_letters_are_capped(self):
+        await self.outbox.dead({"kind": "confirm_email"}, "error")
+        self.redis.xadd.assert_awaited_once_with("mail:outbox:dead", {"kind": "confirm_email", "error": "error"},
+                                                 maxlen=1000, approximate=True)
+
+
+class TestMailOutboxScripts(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.redis = FakeAsyncRedis()
+        self.outbox = MailOutbox(self.redis, "mail:outbox", maxlen=2)
+
+    async def test_promote_due_moves_jobs_once(self):
+        job = {"kind": "confirm_email", "email": "a@example.com", "attempt": "1"}
+        await self.outbox.retry(job, 0)
+        await self.outbox.retry(job | {"email": "b@example.com"}, 3600)
+        self.assertEqual(await self.outbox.promote_due(), 1)
+        self.assertEqual(await self.outbox.promote_due(), 0)
+        entries = MailOutbox.decode(await self.redis.xrange("mail:outbox"))
+        self.assertEqual([fields for _, fields in entries], [job])
+        self.assertEqual(await self.redis.zcard("mail:outbox:retry"), 1)
+
+    async def test_backlog_is_not_trimmed(self):
+        for number in range(500):
+            await self.outbox.enqueue("confirm_email", email=f"user{number}@example.com")
+        self.assertEqual(await self.redis.xlen("mail:outbox"), 500)
+
+
+class TestMailWorker(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.outbox = MagicMock()
+        for method in ("ack", "retry", "dead"):
+            setattr(self.outbox, method, AsyncMock())
+        self.send = AsyncMock()
+        self.worker = MailWorker(self.outbox, lambda job: job["email"], self.send, "worker-1", batch_size=10,
+                                 max_attempts=3, base_delay=30, max_delay=3600)
+
+    async def test_batch_is_sent_and_acknowledged(self):
+        entries = [("1-0", {"kind": "confirm_email", "email": "a@example.com", "attempt": "0"}),
+                   ("2-0", {"kind": "confirm_email", "email": "b@example.com", "attempt": "0"})]
+        await self.worker.handle(entries)
+        self.assertEqual([call.args[0] for call in self.send.await_args_list], ["a@example.com", "b@example.com"])
+        self.outbox.ack.assert_awaited_once_with(["1-0", "2-0"])
+        self.outbox.retry.assert_not_awaited()
+
+    async def test_transient_failure_is_retried_with_backoff(self):
+        self.send.side_effect = SMTPServerDisconnected("gone")
+        job = {"kind": "confirm_email", "email": "a@example.com", "attempt": "1"}
+        await self.worker.handle([("1-0", job)])
+        self.outbox.retry.assert_awaited_once_with(job | {"attempt": "2"}, 60)
+        self.outbox.ack.assert_awaited_once_with(["1-0"])
+
+    async def test_last_attempt_goes_to_dead_letters(self):
+        self.send.side_effect = SMTPServerDisconnected("gone")
+        await self.worker.handle([("1-0", {"kind": "confirm_email", "email": "a@example.com", "attempt": "2"})])
+        self.outbox.dead.assert_awaited_once()
+        self.outbox.retry.assert_not_awaited()
+
+    async def test_refused_recipient_is_not_retried(self):
+        self.send.side_effect = SMTPRecipientsRefused([SMTPRecipientRefused(550, "No such user", "a@example.com")])
+        await self.worker.handle([("1-0", {"kind": "confirm_email", "email": "a@example.com", "attempt": "0"})])
+        self.outbox.dead.assert_awaited_once()
+        self.assertEqual(self.worker.failed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
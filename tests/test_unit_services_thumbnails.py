@@ -0,0 +1,91 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image, UnidentifiedImageError
+
+from src.services.thumbnails import ThumbnailStore
+
+
+def image_file(directory: Path, name: str, color: str, size=(400, 300)) -> Path:
+    path = directory / name
+    Image.new("RGB", size, color).save(path, "PNG")
+    return path
+
+
+class TestThumbnailStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.store = ThumbnailStore(self.root / "avatars", "/api/avatars/", [64, 250], 250, max_bytes=10 ** 6)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_save_generates_square_thumbnails(self):
+        url = self.store.save(image_file(self.root, "red.png", "red"), "Application/test@example.com")
+        key = url.split("/")[3]
+        self.assertEqual(url, f"/api/avatars/{key}/250.webp")
+        for size in (64, 250):
+            with Image.open(self.store.get(key, size)) as thumbnail:
+                self.assertEqual((thumbnail.format, thumbnail.size), ("WEBP", (size, size)))
+        self.assertIsNone(self.store.get(key, 100))
+        self.assertIsNone(self.store.get("0" * 64, 250))
+        self.assertIsNone(self.store.get("../originals", 250))
+
+    def test_same_image_is_stored_once(self):
+        first = self.store.save(image_file(self.root, "a.png", "red"), "a")
+        second = self.store.save(image_file(self.root, "b.png", "red"), "b")
+        self.assertEqual(first, second)
+        self.assertEqual(self.store.stats()["images"], 1)
+        self.assertEqual(len(list(self.store.originals.iterdir())), 1)
+
+    def test_rejects_non_images(self):
+        source = self.root / "avatar.png"
+        source.write_bytes(b"not an image")
+        with self.assertRaises(UnidentifiedImageError):
+            self.store.save(source, "avatar")
+        self.assertEqual(list(self.store.originals.iterdir()), [])
+        self.assertEqual(list(self.store.thumbnails.iterdir()), [])
+
+    def test_evicts_least_recently_used(self):
+        red = self.store.save(image_file(self.root, "red.png", "red"), "red").split("/")[3]
+        # Місце для обох оригіналів, але для мініатюр лише одного зображення
+        self.store.max_bytes = self.store.size + (self.store.originals / red).stat().st_size + 1
+        blue = self.store.save(image_file(self.root, "blue.png", "blue"), "blue").split("/")[3]
+        self.assertFalse((self.store.thumbnails / red).exists())
+        self.assertTrue((self.store.thumbnails / blue).exists())
+        self.assertEqual(self.store.stats()["evictions"], 1)
+
+        # Витіснені мініатюри відновлюються з оригіналу
+        self.assertTrue(self.store.get(red, 64).exists())
+        self.assertFalse((self.store.thumbnails / blue).exists())
+        self.assertEqual(self.store.stats()["original_evictions"], 0)
+
+    def test_originals_count_against_limit(self):
+        red = self.store.save(image_file(self.root, "red.png", "red"), "red").split("/")[3]
+        self.store.max_bytes = self.store.size + 1
+        blue = self.store.save(image_file(self.root, "blue.png", "blue"), "blue").split("/")[3]
+        self.assertEqual([path.name for path in self.store.originals.iterdir()], [blue])
+        self.assertLessEqual(self.store.size, self.store.max_bytes)
+        self.assertEqual(self.store.stats()["original_evictions"], 1)
+        self.assertIsNone(self.store.get(red, 64))
+
+    def test_disk_is_untouched_until_used(self):
+        store = ThumbnailStore(self.root / "lazy", "/api/avatars/", [64, 250], 250, max_bytes=10 ** 6)
+        self.assertFalse((self.root / "lazy").exists())
+        self.assertIsNone(store.get("0" * 64, 64))
+        self.assertTrue(store.thumbnails.is_dir())
+
+    def test_restart_keeps_cache(self):
+        key = self.store.save(image_file(self.root, "red.png", "red"), "red").split("/")[3]
+        (self.store.thumbnails / ".staging-leftover").mkdir()
+        store = ThumbnailStore(self.root / "avatars", "/api/avatars/", [64, 250], 250, max_bytes=10 ** 6)
+        store.open()
+        self.assertEqual((store.stats()["images"], store.stats()["originals"], store.size), (1, 1, self.store.size))
+        self.assertEqual([path.name for path in store.thumbnails.iterdir()], [key])
+
+
+if __name__ == '__main__':
+    unittest.main()